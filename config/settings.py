@@ -95,6 +95,21 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {"default": env.db("DATABASE_URL")}
 
+# read only copies of the default database, the listings read the replicated models from them
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    DATABASE_REPLICAS.append(f"replica_{index}")
+    DATABASES[f"replica_{index}"] = {**env.db_url_config(url), "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICA_MODELS = ["scraper.tweet", "scraper.tweetaccount", "scraper.tweethashtag", "scraper.tweethashtagindex"]
+DATABASE_ROUTERS = ["twitter_scraper.infrastructure.db_routers.ReplicaRouter"]
+# seconds the listings of a query read from the default database after it was refreshed
+DATABASE_READ_YOUR_WRITES_WINDOW = env.float("DATABASE_READ_YOUR_WRITES_WINDOW", 5)
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -192,6 +207,20 @@ STATICFILES_FINDERS = [
 AUTH_USER_MODEL = "users.User"
 
 TWEET_LISTING_DEFAULT_LIMIT = env.int("TWEET_LISTING_DEFAULT_LIMIT", 30)
+# total of the listings: exact, cached (for TWEET_LISTING_COUNT_TIMEOUT seconds) or none
+TWEET_LISTING_COUNT = env.str("TWEET_LISTING_COUNT", "exact")
+TWEET_LISTING_COUNT_TIMEOUT = env.int("TWEET_LISTING_COUNT_TIMEOUT", 60)
+# seconds a rendered listing page is cached (0 to disable), pages change their key with the ingest version
+TWEET_PAGE_CACHE_TIMEOUT = env.int("TWEET_PAGE_CACHE_TIMEOUT", 3600)
+# rows read from the database cursor and serialized at a time by the exports
+TWEET_EXPORT_CHUNK_SIZE = env.int("TWEET_EXPORT_CHUNK_SIZE", 2000)
+TWEET_IDENTITY_CACHE_SIZE = env.int("TWEET_IDENTITY_CACHE_SIZE", 10000)
+TWEET_ID_FILTER_CAPACITY = env.int("TWEET_ID_FILTER_CAPACITY", 1000000)
+# warm the filter from the database when the WSGI/ASGI application starts
+TWEET_ID_FILTER_WARM_UP = env.bool("TWEET_ID_FILTER_WARM_UP", True)
+# days the tweets are kept by the prune_tweets command, 0 keeps them forever
+TWEET_RETENTION_DAYS = env.int("TWEET_RETENTION_DAYS", 0)
+TWEET_ARCHIVE_DIR = env.str("TWEET_ARCHIVE_DIR", "")
 
 NOSE_ARGS = [
     "--nocapture",
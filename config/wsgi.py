@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# only the servers load this module, not the migrations, the tests or the other commands
+from twitter_scraper.scraper.services import (  # noqa: E402
+    start_warming_stored_tweet_ids,
+)
+
+start_warming_stored_tweet_ids()
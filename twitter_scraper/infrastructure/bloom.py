@@ -0,0 +1,46 @@
+import hashlib
+import math
+from threading import Lock
+
+
+class BloomFilter:
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        """
+        Set membership test without false negatives: `in` is False only for
+        keys never added, and True for others with `error_rate` chance of being
+        wrong once `capacity` keys are added.
+        :param capacity: expected number of keys
+        :param error_rate: false positive rate at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self.lock = Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        self.add_many([key])
+
+    def add_many(self, keys):
+        positions = [self._positions(key) for key in keys]
+        with self.lock:
+            for key_positions in positions:
+                for position in key_positions:
+                    self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += len(positions)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self):
+        with self.lock:
+            self._bits = bytearray(len(self._bits))
+            self.count = 0
@@ -0,0 +1,67 @@
+import hashlib
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ReplicaRouter:
+    def __init__(self, replicas=None, models=None):
+        """
+        Sends the reads of the replicated models to a random replica, every
+        other query goes to the primary (default) database. Reads inside a
+        transaction of the primary stay on it, so the ingestion doesn't read
+        rows the replicas haven't received yet.
+        :param replicas: aliases of the replica databases, settings.DATABASE_REPLICAS by default
+        :param models: "app_label.modelname" of the replicated models, settings.DATABASE_REPLICA_MODELS by default
+        """
+        self.replicas = list(settings.DATABASE_REPLICAS if replicas is None else replicas)
+        self.models = set(settings.DATABASE_REPLICA_MODELS if models is None else models)
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # related objects are read from the database of the instance
+            return instance._state.db
+        if not self.replicas or model._meta.label_lower not in self.models:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive the schema from the primary
+        return False if db in self.replicas else None
+
+
+class PrimaryPins:
+    def __init__(self, cache, window=5, primary=DEFAULT_DB_ALIAS, key_prefix="primary-pin"):
+        """
+        Remembers the keys written in the last `window` seconds, their reads go
+        to the primary database until the replicas catch up.
+        :param cache: Django cache backend shared by the processes
+        :param window: seconds a key stays pinned after a write, more than the replication lag
+        :param primary: alias of the primary database
+        """
+        self.cache = cache
+        self.window = window
+        self.primary = primary
+        self.key_prefix = key_prefix
+
+    def _cache_key(self, key):
+        return f"{self.key_prefix}:{hashlib.md5(str(key).encode()).hexdigest()}"
+
+    def pin(self, key):
+        self.cache.set(self._cache_key(key), True, timeout=self.window)
+
+    def is_pinned(self, key):
+        return self.cache.get(self._cache_key(key)) is not None
@@ -1,8 +1,5 @@
 import functools
 import logging
-import time
-import traceback
-from threading import RLock
 from types import GeneratorType
 from typing import Iterator
 
@@ -15,70 +12,6 @@ from twitter_scraper.infrastructure.utils import enforce_sequence
 logger = logging.getLogger(__name__)
 
 
-class RateLimitDecorator(object):
-    def __init__(
-        self,
-        wait_period=900,
-        clock=time.monotonic,
-        on_exception=Exception,
-        default_return_value=None,
-    ):
-        """
-        Instantiate a RateLimitDecorator with some sensible defaults. By
-        default the Twitter rate limiting window is respected (15 calls every
-        15 minutes).
-        :param wait_period: An upper bound time period (in seconds) before the rate
-        limit resets.
-        :param clock: An optional function retuning the current time.
-        :param on_exception: the exception triggers the rate limit event
-        :param default_return_value: returning value while the rate limit in progress
-        """
-        self.wait_period = wait_period
-        self.clock = clock
-        self.on_exception = on_exception
-        self.default_return_value = default_return_value
-        self.last_reset = 0
-
-        # Add thread safety.
-        self.lock = RLock()
-
-    def __call__(self, func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            period_remaining = self._period_remaining()
-            with self.lock:
-                if self.last_reset == 0 or period_remaining <= 0:
-                    try:
-                        return func(*args, **kwargs)
-                    except self.on_exception:
-                        self.last_reset = self.clock()
-                        logger.debug(
-                            f"Rate limit on exception: \n{traceback.format_exc()}"
-                            f"\nwill return default value until: {period_remaining}"
-                            f" seconds."
-                        )
-                        return self.default_return_value
-                logger.debug(
-                    f"Rate limit in progress. Will return default value until: " f"{period_remaining} seconds."
-                )
-            logger.debug(
-                f"Rate limit in progress. Lock not released yet. "
-                f"Will return default value until: {period_remaining} seconds."
-            )
-            return self.default_return_value
-
-        return wrapper
-
-    def _period_remaining(self):
-        """
-        Return the period remaining for the current rate limit window.
-        :return: The remaining period.
-        :rtype: float
-        """
-        elapsed = self.clock() - self.last_reset
-        return self.wait_period - elapsed
-
-
 class Memoizer(DjangoMemoizer):
     def memoize_generator(self, timeout=DEFAULT_TIMEOUT, make_name=None, unless=None, max_allowed_cache_items=10000):
         """
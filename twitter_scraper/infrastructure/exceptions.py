@@ -28,3 +28,7 @@ class CanNotBuildError(ObjectFactoryError):
     Args:
         Error ([type]): [description]
     """
+
+
+class PrefetchTimeout(Error):
+    """The next page of a prefetching paginator didn't arrive in time."""
@@ -0,0 +1,31 @@
+from enum import Enum
+
+
+class Freshness(Enum):
+    fresh = "fresh"
+    stale = "stale"
+    expired = "expired"
+
+
+class FreshnessPolicy:
+    def __init__(self, fresh_for, stale_for):
+        """
+        Stale-while-revalidate windows measured from the last refresh.
+        :param fresh_for: seconds the data is served as is
+        :param stale_for: seconds the data is served while it is refreshed in the background,
+        past them the data has to be refreshed before it is served
+        """
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+
+    def __call__(self, age):
+        """
+        :param age: seconds since the last refresh, None if it was never refreshed
+        """
+        if age is None:
+            return Freshness.expired
+        if age < self.fresh_for:
+            return Freshness.fresh
+        if age < self.stale_for:
+            return Freshness.stale
+        return Freshness.expired
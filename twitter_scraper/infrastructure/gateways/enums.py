@@ -3,3 +3,4 @@ from enum import Enum
 
 class SearchTweetsAPIType(Enum):
     v1_1 = "v1_1"
+    v1_1_async = "v1_1_async"
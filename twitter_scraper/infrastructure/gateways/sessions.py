@@ -0,0 +1,111 @@
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SessionPool:
+    def __init__(
+        self,
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=0,
+        backoff_factor=0,
+        keep_alive=True,
+        retry_statuses=(500, 502, 503, 504),
+    ):
+        """
+        Keeps one keep-alive requests.Session per thread so consecutive requests
+        made by the same worker reuse the already open TCP/TLS connections.
+        :param pool_connections: number of host pools cached by each session
+        :param pool_maxsize: max number of connections kept open per host pool
+        :param max_retries: retry count for connection errors and retry_statuses
+        :param backoff_factor: backoff factor applied between retries
+        :param keep_alive: close the connection after every request when False
+        :param retry_statuses: response statuses that trigger a retry
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.keep_alive = keep_alive
+        self.retry_statuses = retry_statuses
+        self._local = threading.local()
+        self._adapters = []
+        self._sockets = weakref.WeakSet()
+        self._connections = 0
+        self._requests = 0
+        self._reused = 0
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._build_session()
+            self._local.session = session
+        return session
+
+    def _build_retry(self):
+        return Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_statuses,
+            raise_on_status=False,
+        )
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self._build_retry(),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        session.hooks["response"].append(self._count_connection)
+
+        with self._lock:
+            self._adapters.append(adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method=method, url=url, **kwargs)
+
+    def _count_connection(self, response, *args, **kwargs):
+        connection = getattr(response.raw, "_connection", None)
+        sock = getattr(connection, "sock", None)
+        with self._lock:
+            self._requests += 1
+            if sock is None:
+                return
+            if sock in self._sockets:
+                self._reused += 1
+            else:
+                self._sockets.add(sock)
+                self._connections += 1
+
+    def stats(self):
+        """
+        Return connection counters of all sessions created by this pool.
+        `reused` is the number of requests served by an already open connection.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._adapters),
+                "connections": self._connections,
+                "requests": self._requests,
+                "reused": self._reused,
+            }
+
+    def close(self):
+        with self._lock:
+            adapters, self._adapters = self._adapters, []
+        for adapter in adapters:
+            adapter.close()
+        self._local = threading.local()
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+def build_status(tweet_id, screen_name="stub"):
+    return {
+        "created_at": "Thu Jun 10 23:13:35 +0000 2021",
+        "id": tweet_id,
+        "text": f"stub tweet {tweet_id}",
+        "entities": {"hashtags": [{"text": "stub"}]},
+        "user": {"id": 1, "name": "Stub Account", "screen_name": screen_name},
+        "retweet_count": 1,
+        "favorite_count": 2,
+    }
+
+
+class StubSearchTweetsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.requests.append(params)
+            server.authorizations.append(self.headers.get("Authorization", ""))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if server.delay:
+                time.sleep(server.delay)
+            status, body, headers = server.build_response(params)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if self.headers.get("Connection", "").lower() == "close":
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubSearchTweetsServer(ThreadingHTTPServer):
+    """Local stand-in for the search/tweets.json endpoint serving `pages` pages
+    of `page_size` statuses each, walking down from `top_id` via max_id."""
+
+    daemon_threads = True
+
+    def __init__(self, pages=3, page_size=10, top_id=1000, delay=0, status=200, headers=None):
+        super().__init__(("127.0.0.1", 0), StubSearchTweetsHandler)
+        self.pages = pages
+        self.page_size = page_size
+        self.top_id = top_id
+        self.delay = delay
+        self.status = status
+        self.headers = headers or {}
+        self.requests = []
+        self.authorizations = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/1.1/"
+
+    def build_response(self, params):
+        if self.status != 200:
+            return self.status, {"errors": [{"code": self.status}]}, self.headers
+
+        bottom_id = self.top_id - self.pages * self.page_size
+        max_id = int(params.get("max_id", self.top_id))
+        since_id = int(params.get("since_id", bottom_id))
+        count = int(params.get("count", self.page_size))
+        ids = [i for i in range(max_id, max(since_id, bottom_id), -1)][: min(count, self.page_size)]
+
+        screen_name = params.get("q", "").split(":")[-1].lstrip("#")
+        metadata = {"count": count, "query": params.get("q", "")}
+        if ids and ids[-1] - 1 > max(since_id, bottom_id):
+            metadata["next_results"] = "?" + urlencode(
+                {
+                    "max_id": ids[-1] - 1,
+                    "q": params.get("q", ""),
+                    "count": count,
+                    "include_entities": params.get("include_entities", 1),
+                    "result_type": params.get("result_type", "recent"),
+                }
+            )
+        body = {"statuses": [build_status(i, screen_name=screen_name) for i in ids], "search_metadata": metadata}
+        return 200, body, self.headers
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
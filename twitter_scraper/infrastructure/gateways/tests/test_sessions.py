@@ -0,0 +1,47 @@
+import threading
+
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.gateways.sessions import SessionPool
+from twitter_scraper.infrastructure.gateways.tests.stubs import StubSearchTweetsServer
+
+
+class SessionPoolTestCase(TestCase):
+    def test_session_per_thread(self):
+        pool = SessionPool()
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(pool.session))
+        thread.start()
+        thread.join()
+
+        self.assertIs(pool.session, pool.session)
+        self.assertIsNot(pool.session, sessions[0])
+        self.assertEqual(pool.stats()["sessions"], 2)
+
+    def test_keep_alive_reuses_connection(self):
+        pool = SessionPool()
+        with StubSearchTweetsServer() as server:
+            for _ in range(3):
+                pool.request("GET", server.base_url + "search/tweets.json").close()
+
+        stats = pool.stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 2)
+
+    def test_keep_alive_disabled(self):
+        pool = SessionPool(keep_alive=False)
+        with StubSearchTweetsServer() as server:
+            for _ in range(2):
+                pool.request("GET", server.base_url + "search/tweets.json").close()
+
+        stats = pool.stats()
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["reused"], 0)
+
+    def test_close(self):
+        pool = SessionPool()
+        session = pool.session
+        pool.close()
+        self.assertIsNot(pool.session, session)
+        self.assertEqual(pool.stats()["sessions"], 1)
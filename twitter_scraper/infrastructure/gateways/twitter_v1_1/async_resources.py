@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from requests.structures import CaseInsensitiveDict
+
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
+    TwitterBaseError,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.resources import (
+    SearchTweetsResource,
+    SearchTweetsResult,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _run(coroutine):
+    """
+    Runs the coroutine to completion from synchronous code, also when it's
+    called inside a running event loop (asyncio.run() can't be nested there).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # on a loop of its own in a worker thread, blocking the caller like any synchronous call
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class AsyncSearchTweetsResource(SearchTweetsResource):
+    def __init__(
+        self,
+        config,
+        response_class=None,
+        max_concurrency=10,
+        timeout=10.0,
+        rate_limiter=None,
+        credential_pool=None,
+    ):
+        super().__init__(
+            config=config,
+            response_class=response_class,
+            rate_limiter=rate_limiter,
+            credential_pool=credential_pool,
+        )
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    @staticmethod
+    def _to_requests_response(_response):
+        response = requests.Response()
+        response.status_code = _response.status_code
+        response.headers = CaseInsensitiveDict(_response.headers)
+        response.url = str(_response.url)
+        response.encoding = _response.encoding
+        response._content = _response.content
+        response._content_consumed = True
+        return response
+
+    def _build_client(self):
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        return httpx.AsyncClient(limits=limits, timeout=self.timeout)
+
+    @staticmethod
+    async def _off_loop(func, *args, **kwargs):
+        # the stores of the rate limits may be a database or a file, they're synchronous and blocking
+        return await sync_to_async(func, thread_sensitive=True)(*args, **kwargs)
+
+    async def _aacquire(self, key, poll=0.05):
+        # like HeaderRateLimiter.acquire, without blocking the other searches of the loop
+        timeout = self.rate_limiter.probe_window
+        deadline = time.monotonic() + timeout
+        while not await self._off_loop(self.rate_limiter.try_acquire, key):
+            retry_in = await self._off_loop(self.rate_limiter.retry_in, key)
+            if retry_in > timeout or time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll)
+        return True
+
+    async def _arequest(self, client, url, payload, auth=None, response_class=None, method="GET"):
+        auth = auth or self.session_auth
+        response_class = response_class or self.response_class
+        rate_limit_key = self._rate_limit_key(url=url, auth=auth)
+        if not await self._aacquire(rate_limit_key):
+            logger.debug(f"Rate limit budget of {rate_limit_key} is exhausted. Request is not sent.")
+            return self._empty_response(response_class, auth)
+
+        try:
+            signed_url, headers, _ = auth.client.sign(str(httpx.URL(url, params=payload)), http_method=method)
+            _response = await client.request(method=method, url=signed_url, headers=headers)
+            await self._off_loop(self.rate_limiter.update, rate_limit_key, _response.headers)
+            response = response_class(response=self._to_requests_response(_response))
+            response.validate(raise_exception=True)
+        except TwitterBaseError as exc:
+            await self._off_loop(self._handle_error, exc, rate_limit_key, _response.headers)
+            return self._empty_response(response_class, auth)
+        except httpx.HTTPError as exc:
+            logger.exception(exc)
+            return self._empty_response(response_class, auth)
+
+        await self._off_loop(self.credential_pool.mark_success, rate_limit_key[1])
+        response.auth = auth
+        response.since_id = payload.get("since_id")
+        return response
+
+    async def aget(self, client, limit=30, result=None, **params):
+        payload = self._build_request_data(limit=limit, **params)
+        credential = await self._off_loop(self.credential_pool.select, endpoint=self._endpoint)
+        response = await self._arequest(client=client, url=self._request_url, payload=payload, auth=credential.auth)
+        objects = []
+
+        while True:
+            if result is not None:
+                result.last_response = response
+            for obj in self._iter_response_objects(response=response):
+                if limit is not None and len(objects) >= limit:
+                    return objects
+                objects.append(obj)
+
+            if limit is not None and len(objects) >= limit:
+                return objects
+
+            if not self._has_next_page(response):
+                return objects
+
+            payload = self._next_page_payload(response)
+            response = await self._arequest(client=client, url=self._request_url, payload=payload, auth=credential.auth)
+
+    async def aget_many(self, queries, limit=30):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._build_client() as client:
+
+            async def _search(query):
+                query = dict(query)
+                query_limit = query.pop("limit", limit)
+                async with semaphore:
+                    return await self.aget(client, limit=query_limit, **query)
+
+            results = await asyncio.gather(*(_search(query) for query in queries), return_exceptions=True)
+
+        for query, result in zip(queries, results):
+            if isinstance(result, TwitterBaseError):
+                logger.error(f"Search failed for {query}: {result!r}")
+            elif isinstance(result, BaseException):
+                # not an upstream failure, a bug shouldn't look like an empty search
+                raise result
+        return [[] if isinstance(result, TwitterBaseError) else result for result in results]
+
+    async def _aget_one(self, limit=30, **params):
+        async with self._build_client() as client:
+            return await self.aget(client, limit=limit, **params)
+
+    def get_many(self, queries, limit=30):
+        return _run(self.aget_many(queries=queries, limit=limit))
+
+    def search(self, limit=30, **params):
+        result = SearchTweetsResult()
+        result.objects = iter(_run(self._aget_one(limit=limit, result=result, **params)))
+        return result
+
+    def get(self, limit=30, **params):
+        return self.search(limit=limit, **params).objects
@@ -1,4 +1,13 @@
-from pydantic import BaseSettings, HttpUrl
+from typing import List, Optional
+
+from pydantic import BaseModel, BaseSettings, HttpUrl
+
+
+class SearchTweetsCredentialConfig(BaseModel):
+    consumer_key: str
+    consumer_secret: str
+    access_token: str
+    access_token_secret: str
 
 
 class SearchTweetsConfig(BaseSettings):
@@ -8,6 +17,18 @@ class SearchTweetsConfig(BaseSettings):
     consumer_secret: str
     access_token: str
     access_token_secret: str
+    # extra credential sets as a JSON list, i.e. [{"consumer_key": ..., "access_token": ...}]
+    credentials: List[SearchTweetsCredentialConfig] = []
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    max_retries: int = 2
+    backoff_factor: float = 0.3
+    keep_alive: bool = True
+    max_concurrency: int = 10
+    max_in_flight: Optional[int] = None
+    prefetch_depth: int = 0
+    stream_responses: bool = False
+    timeout: float = 10.0
 
     class Config:
         env_prefix = "search_tweets_api_v1_1_"
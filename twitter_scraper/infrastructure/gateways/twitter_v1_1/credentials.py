@@ -0,0 +1,124 @@
+import functools
+import itertools
+import logging
+import math
+import time
+from threading import Lock
+
+from requests_oauthlib import OAuth1
+
+logger = logging.getLogger(__name__)
+
+
+class Credential:
+    def __init__(self, consumer_key, consumer_secret, access_token, access_token_secret):
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.access_token = access_token
+        self.access_token_secret = access_token_secret
+        self.unhealthy_until = 0
+        self.failures = 0
+        self.last_selected = 0
+
+    @property
+    def key(self):
+        return self.access_token
+
+    @functools.cached_property
+    def auth(self):
+        return OAuth1(
+            self.consumer_key,
+            client_secret=self.consumer_secret,
+            resource_owner_key=self.access_token,
+            resource_owner_secret=self.access_token_secret,
+            decoding=None,
+        )
+
+
+class CredentialPool:
+    def __init__(self, credentials, rate_limiter, unhealthy_period=900, clock=time.monotonic):
+        """
+        Routes each search to the healthy credential with the most remaining
+        rate limit budget.
+        :param credentials: list of Credential objects, the first one is the default
+        :param rate_limiter: HeaderRateLimiter keeping the budget of the credentials
+        :param unhealthy_period: seconds to skip a credential after an authorization failure
+        :param clock: An optional function returning the current time.
+        """
+        if not credentials:
+            raise ValueError("Credential pool needs at least one credential.")
+        self.credentials = list(credentials)
+        self.rate_limiter = rate_limiter
+        self.unhealthy_period = unhealthy_period
+        self.clock = clock
+        self._by_key = {credential.key: credential for credential in self.credentials}
+        self._counter = itertools.count(1)
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, config, rate_limiter, **kwargs):
+        credentials = [
+            Credential(
+                consumer_key=config.consumer_key,
+                consumer_secret=config.consumer_secret,
+                access_token=config.access_token,
+                access_token_secret=config.access_token_secret,
+            )
+        ]
+        for credential_config in getattr(config, "credentials", []):
+            if credential_config.access_token in {credential.key for credential in credentials}:
+                continue
+            credentials.append(Credential(**credential_config.dict()))
+        return cls(credentials=credentials, rate_limiter=rate_limiter, **kwargs)
+
+    @property
+    def default(self):
+        return self.credentials[0]
+
+    def _budget(self, endpoint, credential):
+        remaining = self.rate_limiter.remaining((endpoint, credential.key))
+        return math.inf if remaining is None else remaining
+
+    def select(self, endpoint):
+        with self.lock:
+            now = self.clock()
+            candidates = [credential for credential in self.credentials if credential.unhealthy_until <= now]
+            candidates = candidates or self.credentials
+            credential = max(
+                candidates,
+                key=lambda candidate: (self._budget(endpoint, candidate), -candidate.last_selected),
+            )
+            credential.last_selected = next(self._counter)
+            return credential
+
+    def get(self, key):
+        return self._by_key.get(key)
+
+    def mark_failure(self, key):
+        credential = self.get(key)
+        if credential is None:
+            return
+        with self.lock:
+            credential.failures += 1
+            credential.unhealthy_until = self.clock() + self.unhealthy_period
+        logger.warning(f"Credential {key[:6]}... is unhealthy for {self.unhealthy_period} seconds.")
+
+    def mark_success(self, key):
+        credential = self.get(key)
+        if credential is None or not credential.failures:
+            return
+        with self.lock:
+            credential.failures = 0
+            credential.unhealthy_until = 0
+
+    def stats(self, endpoint):
+        now = self.clock()
+        return [
+            {
+                "credential": f"{credential.key[:6]}...",
+                "healthy": credential.unhealthy_until <= now,
+                "failures": credential.failures,
+                **self.rate_limiter.key_stats((endpoint, credential.key)),
+            }
+            for credential in self.credentials
+        ]
@@ -1,12 +1,18 @@
+import functools
 import logging
-from urllib.parse import urljoin
+import threading
+from urllib.parse import urljoin, urlparse
 
 import requests
 from requests import RequestException
-from requests_oauthlib import OAuth1
 
-from twitter_scraper.infrastructure.decorators import RateLimitDecorator
+from twitter_scraper.infrastructure.gateways.sessions import SessionPool
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.credentials import (
+    CredentialPool,
+)
 from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
+    TwitterAccessForbidden,
+    TwitterAuthorization,
     TwitterBaseError,
     TwitterInvalidFilters,
     TwitterRateLimit,
@@ -14,35 +20,87 @@ from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
 from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
     BaseSearchTweetsResponse,
 )
-from twitter_scraper.infrastructure.services import RequestPaginator
+from twitter_scraper.infrastructure.rate_limits import HeaderRateLimiter
+from twitter_scraper.infrastructure.services import (
+    PrefetchingRequestPaginator,
+    RequestPaginator,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class SearchTweetsResult:
+    """Objects of a single search, `complete` tells whether it ran to its last page."""
+
+    def __init__(self):
+        self.objects = iter(())
+        self.last_response = None
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def track(self, request_func):
+        @functools.wraps(request_func)
+        def _tracked(*args, **kwargs):
+            self.last_response = request_func(*args, **kwargs)
+            return self.last_response
+
+        return _tracked
+
+    @property
+    def complete(self):
+        # a failed or rate limited request ends the pagination like a last page does
+        return self.last_response is not None and not getattr(self.last_response, "failed", False)
+
+
 class SearchTweetsResource:
-    def __init__(self, config, response_class=None):
+    def __init__(
+        self,
+        config,
+        response_class=None,
+        session_pool=None,
+        prefetch_depth=0,
+        rate_limiter=None,
+        credential_pool=None,
+        max_in_flight=None,
+    ):
         self.config = config
         self.max_limit = config.max_limit
         self.response_class = response_class or BaseSearchTweetsResponse
+        self.session_pool = session_pool or SessionPool()
+        self.rate_limiter = rate_limiter or HeaderRateLimiter()
+        self.credential_pool = credential_pool or CredentialPool.from_config(config, rate_limiter=self.rate_limiter)
         self.valid_filters = {"hashtag": "#{value}", "username": "from:{value}"}
         self._request_url = urljoin(self.config.base_url, "search/tweets.json")
-        self._first_payload = {}
-        self.paginator = RequestPaginator(
-            request_func=self._first_request,
-            iter_objects_func=self._iter_response_objects,
-            has_next_page_func=self._has_next_page,
-            next_page_request_func=self._next_page_request,
-        )
+        self._endpoint = urlparse(self._request_url).path
+        self.prefetch_depth = prefetch_depth
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def _build_paginator(self, request_func, max_items=None, result=None):
+        # every call gets its own paginator so concurrent searches don't share pagination state
+        next_page_request_func = self._next_page_request
+        if result is not None:
+            request_func = result.track(request_func)
+            next_page_request_func = result.track(next_page_request_func)
+        paginator_kwargs = {
+            "request_func": request_func,
+            "iter_objects_func": self._iter_response_objects,
+            "has_next_page_func": self._has_next_page,
+            "next_page_request_func": next_page_request_func,
+            "max_items": max_items,
+        }
+        if self.prefetch_depth:
+            return PrefetchingRequestPaginator(
+                prefetch_depth=self.prefetch_depth,
+                # the next page of a streamed response is at the end of its body
+                consume_before_next_page=getattr(self.response_class, "streaming", False),
+                **paginator_kwargs,
+            )
+        return RequestPaginator(**paginator_kwargs)
 
     @property
     def session_auth(self):
-        return OAuth1(
-            self.config.consumer_key,
-            client_secret=self.config.consumer_secret,
-            resource_owner_key=self.config.access_token,
-            resource_owner_secret=self.config.access_token_secret,
-            decoding=None,
-        )
+        return self.credential_pool.default.auth
 
     def _get_valid_query_param(self, **query_params):
         _valid_filters = filter(
@@ -63,7 +121,9 @@ class SearchTweetsResource:
         query_param = self._get_valid_query_param(**query_params)
         return self._format_query_data(*query_param)
 
-    def _build_request_data(self, include_entities=1, result_type="recent", limit=30, **query_params):
+    def _build_request_data(
+        self, include_entities=1, result_type="recent", limit=30, since_id=None, max_id=None, **query_params
+    ):
         query_params = {
             "q": self._build_query_data(**query_params),
             "include_entities": include_entities,
@@ -71,10 +131,15 @@ class SearchTweetsResource:
         }
         if limit:
             query_params["count"] = min(limit, self.max_limit)
+        if since_id:
+            query_params["since_id"] = since_id
+        if max_id:
+            query_params["max_id"] = max_id
         return query_params
 
-    def _first_request(self):
-        return self._request(url=self._request_url, payload=self._first_payload)
+    def _first_request(self, payload=None):
+        credential = self.credential_pool.select(endpoint=self._endpoint)
+        return self._request(url=self._request_url, payload=payload or {}, auth=credential.auth)
 
     def _iter_response_objects(self, response):
         return response.iter_objects()
@@ -82,27 +147,94 @@ class SearchTweetsResource:
     def _has_next_page(self, response):
         return response.has_next_page
 
-    def _next_page_request(self, prev_response):
+    def _next_page_payload(self, prev_response):
         payload = prev_response.get_next_page_params(limit=self.max_limit)
-        return self._request(url=self._request_url, payload=payload)
+        since_id = getattr(prev_response, "since_id", None)
+        if payload and since_id:
+            # next_results only carries max_id, keep the lower bound of the search
+            payload["since_id"] = since_id
+        return payload
+
+    def _next_page_request(self, prev_response):
+        payload = self._next_page_payload(prev_response)
+        # stick to the credential of the first page so max_id continuations stay consistent
+        return self._request(url=self._request_url, payload=payload, auth=getattr(prev_response, "auth", None))
+
+    @staticmethod
+    def _rate_limit_key(url, auth):
+        return urlparse(url).path, auth.client.resource_owner_key
+
+    def _empty_response(self, response_class, auth):
+        response = response_class(response=requests.Response())
+        response.auth = auth
+        response.failed = True
+        return response
+
+    def _handle_error(self, exc, rate_limit_key, headers):
+        if isinstance(exc, TwitterRateLimit):
+            self.rate_limiter.exhaust(rate_limit_key, headers)
+            return
+        logger.exception(exc)
+        if isinstance(exc, (TwitterAuthorization, TwitterAccessForbidden)):
+            self.credential_pool.mark_failure(rate_limit_key[1])
+
+    def _send(self, method, url, **kwargs):
+        if self._in_flight is None:
+            return self.session_pool.request(method=method, url=url, **kwargs)
+        with self._in_flight:
+            return self.session_pool.request(method=method, url=url, **kwargs)
 
     def _request(self, url, payload, auth=None, response_class=None, method="GET", **kwargs):
         auth = auth or self.session_auth
         response_class = response_class or self.response_class
+        rate_limit_key = self._rate_limit_key(url=url, auth=auth)
+        if not self.rate_limiter.acquire(rate_limit_key):
+            logger.debug(f"Rate limit budget of {rate_limit_key} is exhausted. Request is not sent.")
+            return self._empty_response(response_class, auth)
+
+        kwargs.setdefault("stream", getattr(response_class, "streaming", False))
         try:
-            _response = requests.request(method=method, url=url, params=payload, auth=auth, **kwargs)
+            _response = self._send(method=method, url=url, params=payload, auth=auth, **kwargs)
+            self.rate_limiter.update(rate_limit_key, _response.headers)
             response = response_class(response=_response)
             response.validate(raise_exception=True)
-        except TwitterRateLimit as exc:
-            raise exc
-        except (RequestException, TwitterBaseError) as exc:
+        except TwitterBaseError as exc:
+            self._handle_error(exc, rate_limit_key, _response.headers)
+            return self._empty_response(response_class, auth)
+        except RequestException as exc:
             logger.exception(exc)
-            response = response_class(response=requests.Response())
+            return self._empty_response(response_class, auth)
 
+        self.credential_pool.mark_success(rate_limit_key[1])
+        response.auth = auth
+        response.since_id = payload.get("since_id")
         return response
 
-    @RateLimitDecorator(on_exception=TwitterRateLimit, wait_period=15 * 60)
+    def connection_stats(self):
+        return self.session_pool.stats()
+
+    def rate_limit_stats(self):
+        return self.rate_limiter.stats()
+
+    def credential_stats(self):
+        return self.credential_pool.stats(endpoint=self._endpoint)
+
+    def search(self, limit=30, **params):
+        payload = self._build_request_data(limit=limit, **params)
+        result = SearchTweetsResult()
+        paginator = self._build_paginator(
+            request_func=functools.partial(self._first_request, payload=payload), max_items=limit, result=result
+        )
+        result.objects = paginator.get_objects()
+        return result
+
     def get(self, limit=30, **params):
-        self._first_payload = self._build_request_data(limit=limit, **params)
-        self.paginator(max_items=limit)
-        return self.paginator.get_objects()
+        return self.search(limit=limit, **params).objects
+
+    def get_many(self, queries, limit=30):
+        results = []
+        for query in queries:
+            query = dict(query)
+            query_limit = query.pop("limit", limit)
+            results.append(list(self.get(limit=query_limit, **query)))
+        return results
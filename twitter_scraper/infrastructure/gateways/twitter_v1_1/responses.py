@@ -9,16 +9,20 @@ from twitter_scraper.infrastructure.gateways.twitter_v1_1 import exceptions
 from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
     TwitterUnknown,
 )
+from twitter_scraper.infrastructure.parsers import JSONObjectStream
 
 logger = logging.getLogger(__name__)
 
 
 class BaseSearchTweetsResponse(ValidateResponseMixin):
     errors = exceptions.ERRORS
+    streaming = False
+    chunk_size = 16 * 1024
 
     def __init__(self, response):
         self._response = response
         self.status_code = self._response.status_code
+        self._stream_metadata = None
 
     def _is_response_ok(self):
         return self._response.ok
@@ -32,17 +36,58 @@ class BaseSearchTweetsResponse(ValidateResponseMixin):
             return {}
         return self._response.json()
 
+    @functools.cached_property
+    def stream_content(self):
+        chunks = () if self.status_code is None else self._response.iter_content(chunk_size=self.chunk_size)
+        return JSONObjectStream(chunks=chunks, stream_key="statuses")
+
+    def _release(self):
+        if self._response.raw is not None:
+            self._response.close()
+
+    @property
+    def search_metadata(self):
+        if not self.streaming:
+            return self.dict_content.get("search_metadata", {})
+        if self._stream_metadata is None:
+            # the stream is parsed once, by the first reader
+            try:
+                members = self.stream_content.finish()
+            except ValueError as exc:
+                logger.exception(exc)
+                members = {}
+            finally:
+                self._release()
+            self._stream_metadata = members.get("search_metadata", {})
+        return self._stream_metadata
+
     def get_objects(self):
+        if self.streaming:
+            return list(self._iter_stream_objects())
         return utils.get_list(self.dict_content, ["statuses"])
 
+    def _iter_stream_objects(self):
+        items_read = False
+        try:
+            yield from self.stream_content.iter_items()
+            items_read = True
+        except ValueError as exc:
+            logger.exception(exc)
+        finally:
+            # the search metadata follows the items, a consumer stopping early never reads it
+            if not items_read or self.stream_content.finished:
+                self._release()
+
     def iter_objects(self):
+        if self.streaming:
+            return self._iter_stream_objects()
         return iter(self.get_objects())
 
     def get_next_page_params(self, limit):
-        if "next_results" not in self.dict_content["search_metadata"]:
+        if "next_results" not in self.search_metadata:
             return {}
 
-        qs = self.dict_content["search_metadata"]["next_results"]
+        qs = self.search_metadata["next_results"]
         qs = qs.replace("?", "", 1)
         qs = parse_qs(qs)
         next_page_params = {
@@ -56,7 +101,7 @@ class BaseSearchTweetsResponse(ValidateResponseMixin):
 
     @property
     def has_next_page(self):
-        return "search_metadata" in self.dict_content and "next_results" in self.dict_content["search_metadata"]
+        return "next_results" in self.search_metadata
 
 
 class SearchTweetsResponse(BaseSearchTweetsResponse):
@@ -96,3 +141,7 @@ class SearchTweetsResponse(BaseSearchTweetsResponse):
                 continue
 
             yield formatted_dict
+
+
+class StreamingSearchTweetsResponse(SearchTweetsResponse):
+    streaming = True
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+
+from twitter_scraper.infrastructure.gateways.tests.stubs import StubSearchTweetsServer
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.async_resources import (
+    AsyncSearchTweetsResource,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
+    TwitterBaseError,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
+    SearchTweetsResponse,
+)
+from twitter_scraper.infrastructure.rate_limits import (
+    DatabaseRateLimitStore,
+    HeaderRateLimiter,
+)
+from twitter_scraper.scraper.models import RateLimitState
+
+
+class AsyncSearchTweetsResourceTestCase(TestCase):
+    def setUp(self):
+        class DummyConfig:
+            base_url = "https://api.twitter.com/1.1"
+            max_limit = 100
+            consumer_key = "dummy"
+            consumer_secret = "dummy"
+            access_token = "dummy"
+            access_token_secret = "dummy"
+
+        self.dummy_config = DummyConfig()
+
+    def _build_resource(self, server, max_concurrency=10):
+        self.dummy_config.base_url = server.base_url
+        return AsyncSearchTweetsResource(
+            config=self.dummy_config, response_class=SearchTweetsResponse, max_concurrency=max_concurrency
+        )
+
+    def test_get(self):
+        with StubSearchTweetsServer(pages=2, page_size=10) as server:
+            resource = self._build_resource(server)
+            objects = list(resource.get(username="guido", limit=15))
+
+        self.assertEqual(len(objects), 15)
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.requests[0]["q"], "from:guido")
+        self.assertEqual(objects[0]["account"]["username"], "guido")
+
+    def test_get_many_runs_queries_concurrently(self):
+        queries = [{"hashtag": f"tag{i}"} for i in range(6)]
+        headers = {"x-rate-limit-limit": "180", "x-rate-limit-remaining": "180", "x-rate-limit-reset": "9999999999"}
+        with StubSearchTweetsServer(pages=1, page_size=5, delay=0.2, headers=headers) as server:
+            resource = self._build_resource(server, max_concurrency=6)
+            started = time.monotonic()
+            results = resource.get_many(queries=queries, limit=5)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual([len(result) for result in results], [5] * 6)
+        # the first request probes the budget, the rest wait for its headers
+        self.assertEqual(server.max_in_flight, 5)
+        self.assertLess(elapsed, 0.2 * 6)
+
+    def test_get_many_respects_concurrency_cap(self):
+        queries = [{"hashtag": f"tag{i}"} for i in range(6)]
+        with StubSearchTweetsServer(pages=1, page_size=5, delay=0.05) as server:
+            resource = self._build_resource(server, max_concurrency=2)
+            results = resource.get_many(queries=queries, limit=5)
+
+        self.assertEqual(len(results), 6)
+        self.assertLessEqual(server.max_in_flight, 2)
+
+    def test_get_many_with_failing_upstream(self):
+        with StubSearchTweetsServer(status=503) as server:
+            resource = self._build_resource(server)
+            results = resource.get_many(queries=[{"hashtag": "dummy"}, {"username": "dummy"}])
+
+        self.assertEqual(results, [[], []])
+
+    def test_get_inside_a_running_event_loop(self):
+        async def _get(resource):
+            return list(resource.get(username="guido", limit=5))
+
+        with StubSearchTweetsServer(pages=1, page_size=5) as server:
+            objects = asyncio.run(_get(self._build_resource(server)))
+
+        self.assertEqual(len(objects), 5)
+
+    def test_get_many_with_twitter_error(self):
+        with StubSearchTweetsServer(pages=1, page_size=5) as server:
+            resource = self._build_resource(server)
+            with mock.patch.object(resource, "_iter_response_objects", side_effect=TwitterBaseError("dummy")):
+                results = resource.get_many(queries=[{"hashtag": "dummy"}])
+
+        self.assertEqual(results, [[]])
+
+    def test_get_many_raises_other_errors(self):
+        with StubSearchTweetsServer(pages=1, page_size=5) as server:
+            resource = self._build_resource(server)
+            with mock.patch.object(resource, "_iter_response_objects", side_effect=KeyError("dummy")):
+                with self.assertRaises(KeyError):
+                    resource.get_many(queries=[{"hashtag": "dummy"}])
+
+
+class AsyncSearchTweetsResourceDatabaseStoreTestCase(TransactionTestCase):
+    def test_get_many_with_database_rate_limit_store(self):
+        class DummyConfig:
+            max_limit = 100
+            consumer_key = "dummy"
+            consumer_secret = "dummy"
+            access_token = "dummy"
+            access_token_secret = "dummy"
+
+        config = DummyConfig()
+        headers = {"x-rate-limit-limit": "180", "x-rate-limit-remaining": "180", "x-rate-limit-reset": "9999999999"}
+        with StubSearchTweetsServer(pages=1, page_size=5, headers=headers) as server:
+            config.base_url = server.base_url
+            resource = AsyncSearchTweetsResource(
+                config=config,
+                response_class=SearchTweetsResponse,
+                rate_limiter=HeaderRateLimiter(store=DatabaseRateLimitStore(model="scraper.RateLimitState")),
+            )
+            results = resource.get_many(queries=[{"hashtag": "python"}, {"username": "guido"}], limit=5)
+
+        self.assertEqual([len(result) for result in results], [5, 5])
+        self.assertEqual(RateLimitState.objects.count(), 1)
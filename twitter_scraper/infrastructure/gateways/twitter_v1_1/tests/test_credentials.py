@@ -0,0 +1,122 @@
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.gateways.tests.stubs import StubSearchTweetsServer
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.configs import (
+    SearchTweetsCredentialConfig,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.credentials import (
+    Credential,
+    CredentialPool,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.resources import (
+    SearchTweetsResource,
+)
+from twitter_scraper.infrastructure.rate_limits import HeaderRateLimiter
+from twitter_scraper.infrastructure.tests.test_decorators import DummyClock
+
+endpoint = "/1.1/search/tweets.json"
+
+
+def build_credential(name):
+    return Credential(
+        consumer_key=f"{name}-consumer-key",
+        consumer_secret=f"{name}-consumer-secret",
+        access_token=f"{name}-access-token",
+        access_token_secret=f"{name}-access-token-secret",
+    )
+
+
+def rate_limit_headers(remaining):
+    return {"x-rate-limit-limit": 180, "x-rate-limit-remaining": remaining, "x-rate-limit-reset": 9999999999}
+
+
+class CredentialPoolTestCase(TestCase):
+    def setUp(self):
+        self.clock = DummyClock()
+        self.rate_limiter = HeaderRateLimiter()
+        self.first, self.second = build_credential("first"), build_credential("second")
+        self.pool = CredentialPool(
+            credentials=[self.first, self.second], rate_limiter=self.rate_limiter, clock=self.clock
+        )
+
+    def test_empty_pool(self):
+        with self.assertRaises(ValueError):
+            CredentialPool(credentials=[], rate_limiter=self.rate_limiter)
+
+    def test_select_given_unknown_budgets_rotates(self):
+        selected = [self.pool.select(endpoint=endpoint) for _ in range(4)]
+        self.assertEqual(selected, [self.first, self.second, self.first, self.second])
+
+    def test_select_most_remaining_budget(self):
+        self.rate_limiter.update((endpoint, self.first.key), rate_limit_headers(remaining=5))
+        self.rate_limiter.update((endpoint, self.second.key), rate_limit_headers(remaining=50))
+        self.assertEqual(self.pool.select(endpoint=endpoint), self.second)
+        self.assertEqual(self.pool.select(endpoint=endpoint), self.second)
+
+    def test_select_skips_unhealthy(self):
+        self.pool.mark_failure(self.first.key)
+        self.assertEqual([self.pool.select(endpoint=endpoint) for _ in range(2)], [self.second, self.second])
+
+        self.clock.increment(self.pool.unhealthy_period)
+        self.assertEqual(self.pool.select(endpoint=endpoint), self.first)
+
+        self.pool.mark_failure(self.first.key)
+        self.pool.mark_success(self.first.key)
+        self.assertEqual(self.pool.stats(endpoint=endpoint)[0]["failures"], 0)
+
+    def test_from_config(self):
+        class DummyConfig:
+            consumer_key = "first-consumer-key"
+            consumer_secret = "first-consumer-secret"
+            access_token = "first-access-token"
+            access_token_secret = "first-access-token-secret"
+            credentials = [
+                SearchTweetsCredentialConfig(**vars(build_credential("first"))),
+                SearchTweetsCredentialConfig(**vars(build_credential("second"))),
+            ]
+
+        pool = CredentialPool.from_config(DummyConfig(), rate_limiter=self.rate_limiter)
+        self.assertEqual([credential.key for credential in pool.credentials], [self.first.key, self.second.key])
+
+    def test_stats(self):
+        self.rate_limiter.update((endpoint, self.first.key), rate_limit_headers(remaining=5))
+        stats = self.pool.stats(endpoint=endpoint)
+        self.assertEqual(stats[0]["remaining"], 5)
+        self.assertTrue(stats[0]["healthy"])
+        self.assertEqual(stats[1]["remaining"], None)
+
+
+class SearchTweetsResourceCredentialsTestCase(TestCase):
+    def setUp(self):
+        class DummyConfig:
+            max_limit = 100
+
+        self.dummy_config = DummyConfig()
+        self.rate_limiter = HeaderRateLimiter()
+        self.first, self.second = build_credential("first"), build_credential("second")
+        self.pool = CredentialPool(credentials=[self.first, self.second], rate_limiter=self.rate_limiter)
+
+    def _build_resource(self, server):
+        self.dummy_config.base_url = server.base_url
+        return SearchTweetsResource(config=self.dummy_config, rate_limiter=self.rate_limiter, credential_pool=self.pool)
+
+    def test_pages_stick_to_selected_credential(self):
+        with StubSearchTweetsServer(pages=3, page_size=10) as server:
+            resource = self._build_resource(server)
+            self.rate_limiter.update((resource._endpoint, self.first.key), rate_limit_headers(remaining=5))
+            self.rate_limiter.update((resource._endpoint, self.second.key), rate_limit_headers(remaining=50))
+            objects = list(resource.get(hashtag="dummy", limit=30))
+
+        self.assertEqual(len(objects), 30)
+        self.assertEqual(len(server.authorizations), 3)
+        for authorization in server.authorizations:
+            self.assertIn(f'oauth_token="{self.second.key}"', authorization)
+
+    def test_authorization_failure_marks_credential_unhealthy(self):
+        with StubSearchTweetsServer(status=401) as server:
+            resource = self._build_resource(server)
+            self.assertEqual(list(resource.get(hashtag="dummy")), [])
+
+        stats = resource.credential_stats()
+        self.assertFalse(stats[0]["healthy"])
+        self.assertTrue(stats[1]["healthy"])
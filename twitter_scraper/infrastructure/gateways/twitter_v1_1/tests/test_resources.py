@@ -1,3 +1,5 @@
+import threading
+import time
 from unittest import mock
 
 import requests
@@ -5,6 +7,7 @@ import vcr
 from django.test import TestCase, override_settings
 from requests_oauthlib import OAuth1
 
+from twitter_scraper.infrastructure.gateways.tests.stubs import StubSearchTweetsServer
 from twitter_scraper.infrastructure.gateways.twitter_v1_1.exceptions import (
     TwitterInvalidFilters,
 )
@@ -13,6 +16,8 @@ from twitter_scraper.infrastructure.gateways.twitter_v1_1.resources import (
 )
 from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
     BaseSearchTweetsResponse,
+    SearchTweetsResponse,
+    StreamingSearchTweetsResponse,
 )
 
 my_vcr = vcr.VCR(
@@ -58,6 +63,7 @@ class SearchTweetsResourceTestCase(TestCase):
 
     def test_session_auth(self):
         self.assertTrue(isinstance(self.resource.session_auth, OAuth1))
+        self.assertIs(self.resource.session_auth, self.resource.session_auth)
 
     def test_get_valid_query_param_given_valid_query_params(self):
         self.resource._get_valid_query_param(hashtag="dummy")
@@ -106,7 +112,7 @@ class SearchTweetsResourceTestCase(TestCase):
         }
         self.assertDictEqual(expected_data, built_data)
 
-    @mock.patch("twitter_scraper.infrastructure.gateways.twitter_v1_1.resources.requests.request")
+    @mock.patch("twitter_scraper.infrastructure.gateways.sessions.requests.Session.request")
     def test_first_request(self, mock_request):
         mock_request.return_value = self._mock_response
         response = self.resource._first_request()
@@ -120,13 +126,13 @@ class SearchTweetsResourceTestCase(TestCase):
         result = self.resource._has_next_page(response=self.empty_response)
         self.assertFalse(result)
 
-    @mock.patch("twitter_scraper.infrastructure.gateways.twitter_v1_1.resources.requests.request")
+    @mock.patch("twitter_scraper.infrastructure.gateways.sessions.requests.Session.request")
     def test_next_page_request(self, mock_request):
         mock_request.return_value = self._mock_response
         response = self.resource._next_page_request(prev_response=self.empty_response)
         self.assertTrue(isinstance(response, BaseSearchTweetsResponse))
 
-    @mock.patch("twitter_scraper.infrastructure.gateways.twitter_v1_1.resources.requests.request")
+    @mock.patch("twitter_scraper.infrastructure.gateways.sessions.requests.Session.request")
     def test_request(self, mock_request):
         mock_request.return_value = self._mock_response
         response = self.resource._request(url=self.resource._request_url, payload={})
@@ -147,3 +153,140 @@ class SearchTweetsResourceTestCase(TestCase):
         generator = self.resource.get(hashtag="dummy")
         obj = next(generator)
         self.assertDictEqual(expected_object, obj)
+
+    def test_get_reuses_connection_across_pages(self):
+        with StubSearchTweetsServer(pages=3, page_size=10) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config)
+            objects = list(resource.get(hashtag="dummy", limit=30))
+
+        self.assertEqual(len(objects), 30)
+        self.assertEqual(len(server.requests), 3)
+        stats = resource.connection_stats()
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 2)
+
+    def test_get_with_prefetch(self):
+        with StubSearchTweetsServer(pages=3, page_size=10) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config, prefetch_depth=2)
+            objects = list(resource.get(hashtag="dummy", limit=25))
+
+        self.assertEqual(len(objects), 25)
+        self.assertEqual([obj["id"] for obj in objects], list(range(1000, 975, -1)))
+
+    def test_get_with_prefetch_stops_at_the_limit(self):
+        for response_class in (SearchTweetsResponse, StreamingSearchTweetsResponse):
+            with StubSearchTweetsServer(pages=3, page_size=10) as server:
+                self.dummy_config.base_url = server.base_url
+                resource = SearchTweetsResource(
+                    config=self.dummy_config, response_class=response_class, prefetch_depth=2
+                )
+                objects = list(resource.get(hashtag="dummy", limit=10))
+                # a prefetch still running would show up here
+                time.sleep(0.1)
+
+            self.assertEqual(len(objects), 10)
+            self.assertEqual(len(server.requests), 1)
+
+    def test_get_with_streaming_response(self):
+        with StubSearchTweetsServer(pages=3, page_size=10) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config, response_class=StreamingSearchTweetsResponse)
+            objects = list(resource.get(hashtag="dummy", limit=25))
+
+        self.assertEqual([obj["tweet_id"] for obj in objects], list(range(1000, 975, -1)))
+        self.assertEqual(resource.connection_stats()["connections"], 1)
+
+    def test_get_with_streaming_response_and_prefetch(self):
+        for _ in range(5):
+            with StubSearchTweetsServer(pages=5, page_size=100) as server:
+                self.dummy_config.base_url = server.base_url
+                resource = SearchTweetsResource(
+                    config=self.dummy_config, response_class=StreamingSearchTweetsResponse, prefetch_depth=2
+                )
+                with mock.patch("twitter_scraper.infrastructure.gateways.twitter_v1_1.responses.logger") as logger:
+                    objects = list(resource.get(hashtag="dummy", limit=500))
+
+            self.assertEqual([obj["tweet_id"] for obj in objects], list(range(1000, 500, -1)))
+            self.assertEqual(len(server.requests), 5)
+            logger.exception.assert_not_called()
+
+    def test_get_stops_before_exhausting_rate_limit(self):
+        headers = {"x-rate-limit-limit": "180", "x-rate-limit-remaining": "0", "x-rate-limit-reset": "9999999999"}
+        with StubSearchTweetsServer(pages=3, page_size=10, headers=headers) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config)
+            first_objects = list(resource.get(hashtag="dummy", limit=30))
+            second_objects = list(resource.get(hashtag="dummy", limit=30))
+
+        self.assertEqual(len(first_objects), 10)
+        self.assertEqual(second_objects, [])
+        self.assertEqual(len(server.requests), 1)
+
+    def test_get_given_rate_limit_error(self):
+        with StubSearchTweetsServer(status=429) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config)
+            self.assertEqual(list(resource.get(hashtag="dummy")), [])
+            self.assertEqual(list(resource.get(hashtag="dummy")), [])
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(list(resource.rate_limit_stats().values())[0]["remaining"], 0)
+
+    def test_search_keeps_since_id_on_next_pages(self):
+        with StubSearchTweetsServer(pages=10, page_size=5) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config, response_class=SearchTweetsResponse)
+            result = resource.search(hashtag="dummy", limit=30, since_id=990, max_id=999)
+            objects = list(result)
+
+        self.assertTrue(result.complete)
+        self.assertEqual([obj["tweet_id"] for obj in objects], list(range(999, 990, -1)))
+        self.assertEqual([request.get("since_id") for request in server.requests], ["990", "990"])
+        self.assertEqual(server.requests[0]["max_id"], "999")
+
+    def test_search_given_rate_limit_error_is_not_complete(self):
+        with StubSearchTweetsServer(status=429) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config)
+            result = resource.search(hashtag="dummy")
+            self.assertEqual(list(result), [])
+
+        self.assertFalse(result.complete)
+
+    def test_concurrent_gets_keep_their_own_pagination(self):
+        results = {}
+
+        def search(hashtag):
+            results[hashtag] = list(resource.get(hashtag=hashtag, limit=20))
+
+        # the first request probes the budget, the rest run concurrently once its headers arrive
+        headers = {"x-rate-limit-limit": "180", "x-rate-limit-remaining": "180", "x-rate-limit-reset": "9999999999"}
+        with StubSearchTweetsServer(pages=2, page_size=10, delay=0.1, headers=headers) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config, response_class=SearchTweetsResponse)
+            threads = [threading.Thread(target=search, args=(f"tag{i}",)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertEqual(len(server.requests), 8)
+        for hashtag, objects in results.items():
+            self.assertEqual(len(objects), 20)
+            self.assertEqual({obj["account"]["username"] for obj in objects}, {hashtag})
+
+    def test_max_in_flight(self):
+        with StubSearchTweetsServer(pages=1, page_size=10, delay=0.05) as server:
+            self.dummy_config.base_url = server.base_url
+            resource = SearchTweetsResource(config=self.dummy_config, max_in_flight=2)
+            threads = [threading.Thread(target=lambda: list(resource.get(hashtag="dummy"))) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(server.requests), 6)
+        self.assertLessEqual(server.max_in_flight, 2)
@@ -0,0 +1,71 @@
+import io
+from unittest import mock
+
+import requests
+import yaml
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
+    SearchTweetsResponse,
+    StreamingSearchTweetsResponse,
+)
+
+cassette_dir = "fixtures/cassettes/search_tweets_v_1_1/"
+
+
+def load_cassette_response(name, index=0):
+    with open(cassette_dir + name) as cassette:
+        interaction = yaml.safe_load(cassette)["interactions"][index]["response"]
+
+    response = requests.Response()
+    response.status_code = interaction["status"]["code"]
+    response.raw = io.BytesIO(interaction["body"]["string"].encode())
+    return response
+
+
+class StreamingSearchTweetsResponseTestCase(TestCase):
+    cassettes = [
+        "nasa_tweets_16_valid_objects_total_30_objects.yaml",
+        "guido_tweets_10_objects.yaml",
+        "hashtag_tweets_empty_result.yaml",
+    ]
+
+    def test_parity_with_buffered_response(self):
+        for name in self.cassettes:
+            buffered = SearchTweetsResponse(response=load_cassette_response(name))
+            streaming = StreamingSearchTweetsResponse(response=load_cassette_response(name))
+
+            self.assertEqual(list(streaming.iter_objects()), list(buffered.iter_objects()))
+            self.assertEqual(streaming.has_next_page, buffered.has_next_page)
+            self.assertEqual(streaming.get_next_page_params(limit=100), buffered.get_next_page_params(limit=100))
+
+    def test_next_page_params_before_objects_are_consumed(self):
+        name = self.cassettes[1]
+        buffered = SearchTweetsResponse(response=load_cassette_response(name))
+        streaming = StreamingSearchTweetsResponse(response=load_cassette_response(name))
+
+        self.assertTrue(streaming.has_next_page)
+        self.assertEqual(list(streaming.iter_objects()), list(buffered.iter_objects()))
+
+    def test_get_objects_parity_with_buffered_response(self):
+        for name in self.cassettes:
+            buffered = SearchTweetsResponse(response=load_cassette_response(name))
+            streaming = StreamingSearchTweetsResponse(response=load_cassette_response(name))
+
+            self.assertEqual(streaming.get_objects(), buffered.get_objects())
+
+    def test_stream_stopped_early_is_closed(self):
+        response = load_cassette_response(self.cassettes[0])
+        streaming = StreamingSearchTweetsResponse(response=response)
+
+        with mock.patch.object(response, "close", wraps=response.close) as close:
+            objs = streaming.iter_objects()
+            next(objs)
+            close.assert_not_called()
+            objs.close()
+        close.assert_called_once()
+
+    def test_empty_response(self):
+        streaming = StreamingSearchTweetsResponse(response=requests.Response())
+        self.assertEqual(list(streaming.iter_objects()), [])
+        self.assertFalse(streaming.has_next_page)
@@ -0,0 +1,78 @@
+import collections
+from threading import Lock
+
+
+class LRUCache:
+    def __init__(self, maxsize=10000):
+        """
+        Bounded thread-safe mapping dropping the least recently used key when
+        it is full. Hits and misses of the lookups are counted.
+        :param maxsize: max number of keys kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def get_many(self, keys):
+        """
+        :return: dict of the given keys found in the cache
+        """
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key not in self._data:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                self._data.move_to_end(key)
+                found[key] = self._data[key]
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, mapping):
+        with self.lock:
+            for key, value in mapping.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
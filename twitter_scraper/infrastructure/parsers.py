@@ -0,0 +1,120 @@
+import codecs
+import collections
+import json
+
+
+class JSONObjectStream:
+    def __init__(self, chunks, stream_key):
+        """
+        Incrementally parses a top level JSON object read from `chunks`. Elements
+        of the `stream_key` array are yielded by `iter_items` as soon as they are
+        decoded, the rest of the members are collected into `members`.
+        :param chunks: iterable of bytes or str chunks
+        :param stream_key: key of the array member to stream
+        """
+        self.stream_key = stream_key
+        self.members = {}
+        self.finished = False
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+        self._pending = collections.deque()
+        self._parser = self._parse()
+
+    def _read(self):
+        if self._exhausted:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._exhausted = True
+            chunk = self._text_decoder.decode(b"", final=True)
+        else:
+            if isinstance(chunk, bytes):
+                chunk = self._text_decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, *chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars} at stream offset, got {char!r}")
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # a number can only be terminated by the next char, make sure it arrived
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def _parse(self):
+        yield from self._parse_object()
+        self.finished = True
+
+    def _parse_object(self):
+        try:
+            self._peek()
+        except ValueError:
+            # empty body
+            return
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            if key == self.stream_key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._decode_value()
+                        if self._expect(",", "]") == "]":
+                            break
+                self.members.setdefault(key, [])
+            else:
+                self.members[key] = self._decode_value()
+
+            if self._expect(",", "}") == "}":
+                return
+
+    def iter_items(self):
+        while True:
+            if self._pending:
+                yield self._pending.popleft()
+                continue
+            try:
+                yield next(self._parser)
+            except StopIteration:
+                return
+
+    def finish(self):
+        """Parse the rest of the stream keeping the not yet consumed items for `iter_items`."""
+        self._pending.extend(self._parser)
+        return self.members
@@ -0,0 +1,374 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitStoreType(Enum):
+    local = "local"
+    cache = "cache"
+    database = "database"
+    file = "file"
+
+
+class RateLimitBucket:
+    def __init__(self, limit, remaining, reset):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+    def refill(self, now, window):
+        if self.reset <= now:
+            self.remaining = self.limit
+            self.reset = now + window
+
+    def to_dict(self):
+        return {"limit": self.limit, "remaining": self.remaining, "reset": self.reset}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(limit=data["limit"], remaining=data["remaining"], reset=data["reset"])
+
+
+class RateLimitState:
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+
+def dump_key(key):
+    return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+
+def load_key(dumped):
+    key = json.loads(dumped)
+    return tuple(key) if isinstance(key, list) else key
+
+
+class LocalRateLimitStore:
+    """Keeps the buckets in the memory of the process."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = Lock()
+
+    @contextlib.contextmanager
+    def transaction(self, key):
+        with self.lock:
+            state = RateLimitState(self.buckets.get(key))
+            yield state
+            if state.bucket is None:
+                self.buckets.pop(key, None)
+            else:
+                self.buckets[key] = state.bucket
+
+    def get(self, key):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            return None if bucket is None else RateLimitBucket.from_dict(bucket.to_dict())
+
+    def keys(self):
+        with self.lock:
+            return list(self.buckets.keys())
+
+
+class CacheRateLimitStore:
+    def __init__(self, cache, lock_timeout=5, wait_timeout=5, poll_interval=0.01, key_prefix="rate-limit"):
+        """
+        Keeps the buckets in a Django cache shared by all the workers. Updates
+        of a key are serialized with a short lived lock taken by `cache.add`.
+        :param cache: Django cache backend, it must be shared (i.e. redis or memcached) to be seen by other processes
+        :param lock_timeout: seconds before a lock of a crashed worker expires
+        :param wait_timeout: max seconds to wait for the lock of a key
+        :param poll_interval: seconds between lock attempts
+        """
+        self.cache = cache
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.key_prefix = key_prefix
+
+    def _cache_key(self, key):
+        return f"{self.key_prefix}:{hashlib.md5(dump_key(key).encode()).hexdigest()}"
+
+    @property
+    def _keys_key(self):
+        return f"{self.key_prefix}:keys"
+
+    @contextlib.contextmanager
+    def _lock(self, name):
+        lock_key = f"{name}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        while not self.cache.add(lock_key, token, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                logger.warning(f"Could not lock {name} in {self.wait_timeout} seconds, updating without the lock.")
+                break
+            time.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def _register(self, key):
+        dumped = dump_key(key)
+        keys = self.cache.get(self._keys_key) or []
+        if dumped not in keys:
+            with self._lock(self._keys_key):
+                keys = self.cache.get(self._keys_key) or []
+                if dumped not in keys:
+                    self.cache.set(self._keys_key, keys + [dumped], timeout=None)
+
+    @contextlib.contextmanager
+    def transaction(self, key):
+        cache_key = self._cache_key(key)
+        with self._lock(cache_key):
+            state = RateLimitState(self.get(key))
+            yield state
+            if state.bucket is None:
+                self.cache.delete(cache_key)
+            else:
+                self.cache.set(cache_key, state.bucket.to_dict(), timeout=None)
+                self._register(key)
+
+    def get(self, key):
+        data = self.cache.get(self._cache_key(key))
+        return None if data is None else RateLimitBucket.from_dict(data)
+
+    def keys(self):
+        keys = [load_key(dumped) for dumped in self.cache.get(self._keys_key) or []]
+        return [key for key in keys if self.cache.get(self._cache_key(key)) is not None]
+
+
+class DatabaseRateLimitStore:
+    def __init__(self, model="scraper.RateLimitState"):
+        """
+        Keeps the buckets in a table shared by all the workers. Updates of a
+        key are serialized with `SELECT ... FOR UPDATE`.
+        :param model: "app_label.ModelName" of a model with key, limit, remaining and reset fields
+        """
+        self.model_name = model
+
+    @property
+    def model(self):
+        from django.apps import apps
+
+        return apps.get_model(self.model_name)
+
+    @staticmethod
+    def _to_bucket(row):
+        return RateLimitBucket(limit=row.limit, remaining=row.remaining, reset=row.reset)
+
+    @contextlib.contextmanager
+    def transaction(self, key):
+        from django.db import IntegrityError, transaction
+
+        dumped = dump_key(key)
+        with transaction.atomic():
+            row = self.model.objects.select_for_update().filter(key=dumped).first()
+            state = RateLimitState(None if row is None else self._to_bucket(row))
+            yield state
+            if state.bucket is None:
+                if row is not None:
+                    row.delete()
+                return
+            values = state.bucket.to_dict()
+            if row is not None:
+                self.model.objects.filter(pk=row.pk).update(**values)
+                return
+            try:
+                with transaction.atomic():
+                    self.model.objects.create(key=dumped, **values)
+            except IntegrityError:
+                # created by another worker in the meantime
+                self.model.objects.filter(key=dumped).update(**values)
+
+    def get(self, key):
+        row = self.model.objects.filter(key=dump_key(key)).first()
+        return None if row is None else self._to_bucket(row)
+
+    def keys(self):
+        return [load_key(dumped) for dumped in self.model.objects.values_list("key", flat=True)]
+
+
+class FileRateLimitStore:
+    def __init__(self, path):
+        """
+        Keeps the buckets in a JSON file guarded by `flock`, shared by the
+        processes of a single host (i.e. tests or a local multi-worker setup).
+        :param path: path of the JSON file, created if it doesn't exist
+        """
+        self.path = Path(path)
+
+    @contextlib.contextmanager
+    def _open(self, lock_type):
+        self.path.touch(exist_ok=True)
+        with open(self.path, "r+") as file:
+            fcntl.flock(file, lock_type)
+            try:
+                content = file.read()
+                yield file, json.loads(content) if content else {}
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def transaction(self, key):
+        dumped = dump_key(key)
+        with self._open(fcntl.LOCK_EX) as (file, buckets):
+            state = RateLimitState(RateLimitBucket.from_dict(buckets[dumped]) if dumped in buckets else None)
+            yield state
+            if state.bucket is None:
+                buckets.pop(dumped, None)
+            else:
+                buckets[dumped] = state.bucket.to_dict()
+            file.seek(0)
+            file.truncate()
+            json.dump(buckets, file)
+            file.flush()
+
+    def _read(self):
+        with self._open(fcntl.LOCK_SH) as (_, buckets):
+            return buckets
+
+    def get(self, key):
+        data = self._read().get(dump_key(key))
+        return None if data is None else RateLimitBucket.from_dict(data)
+
+    def keys(self):
+        return [load_key(dumped) for dumped in self._read()]
+
+
+class HeaderRateLimiter:
+    limit_header = "x-rate-limit-limit"
+    remaining_header = "x-rate-limit-remaining"
+    reset_header = "x-rate-limit-reset"
+
+    def __init__(self, window=900, clock=time.time, store=None, probe_window=10):
+        """
+        Token bucket per key (endpoint, credential) synced from the rate limit
+        headers of every response. Each request takes a token before it is
+        sent; the bucket is refilled when the reset time of its window passes.
+        While nothing is known about a key, a single request probes its budget.
+        :param window: rate limit window (in seconds) used when the reset time is unknown
+        :param clock: An optional function returning the current epoch time.
+        :param store: where the buckets are kept, a shared store lets all the workers see the same budget
+        :param probe_window: seconds the other requests of a key wait for the headers of its probe
+        """
+        self.window = window
+        self.clock = clock
+        self.store = store or LocalRateLimitStore()
+        self.probe_window = probe_window
+
+    def try_acquire(self, key):
+        with self.store.transaction(key) as state:
+            bucket = state.bucket
+            now = self.clock()
+            if bucket is None or (bucket.limit is None and bucket.reset <= now):
+                # nothing known about the budget of this key yet, this request takes the
+                # only token of a provisional bucket and the next ones wait for its headers
+                state.bucket = RateLimitBucket(limit=None, remaining=0, reset=now + self.probe_window)
+                return True
+            bucket.refill(now=now, window=self.window)
+            if bucket.remaining <= 0:
+                return False
+            bucket.remaining -= 1
+            return True
+
+    def retry_in(self, key):
+        """
+        :return: seconds until the key has a token again, 0 if it has one or nothing is known about it
+        """
+        bucket = self.store.get(key)
+        if bucket is None or bucket.remaining > 0:
+            return 0
+        return max(bucket.reset - self.clock(), 0)
+
+    def acquire(self, key, timeout=None, poll=0.05):
+        """
+        Takes a token like `try_acquire`, waiting for it when the key gets one
+        within `timeout` seconds, i.e. when the probe of the key is in flight.
+        :param timeout: max seconds to wait, the probe window by default
+        """
+        timeout = self.probe_window if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire(key):
+            # the headers of a probe refill the bucket before its reset, within the probe window
+            if self.retry_in(key) > max(timeout, self.probe_window) or time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def remaining(self, key):
+        """
+        Return the remaining budget of the key without taking a token.
+        :return: None if nothing is known about the key yet.
+        """
+        bucket = self.store.get(key)
+        if bucket is None:
+            return None
+        if bucket.reset <= self.clock():
+            return bucket.limit
+        return bucket.remaining
+
+    def _parse_headers(self, headers):
+        try:
+            return (
+                int(headers[self.limit_header]),
+                int(headers[self.remaining_header]),
+                int(headers[self.reset_header]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def update(self, key, headers):
+        parsed = self._parse_headers(headers)
+        with self.store.transaction(key) as state:
+            bucket = state.bucket
+            if parsed is None:
+                if bucket is not None and bucket.limit is None:
+                    # the response tells nothing about the budget, the next request probes it
+                    state.bucket = None
+                return
+            limit, remaining, reset = parsed
+            if bucket is None or bucket.reset != reset:
+                state.bucket = RateLimitBucket(limit=limit, remaining=remaining, reset=reset)
+                return
+            # same window, keep the tokens already taken by requests still in flight
+            bucket.limit = limit
+            bucket.remaining = min(bucket.remaining, remaining)
+
+    def exhaust(self, key, headers=None):
+        parsed = self._parse_headers(headers or {})
+        with self.store.transaction(key) as state:
+            now = self.clock()
+            if state.bucket is None:
+                state.bucket = RateLimitBucket(limit=None, remaining=0, reset=now + self.window)
+            bucket = state.bucket
+            bucket.remaining = 0
+            if parsed is not None:
+                bucket.limit, _, bucket.reset = parsed
+            if bucket.reset <= now:
+                bucket.reset = now + self.window
+            logger.warning(f"Rate limit exhausted for {key} until {bucket.reset}.")
+
+    def stats(self):
+        return {key: self.key_stats(key) for key in self.store.keys()}
+
+    def key_stats(self, key):
+        bucket = self.store.get(key)
+        if bucket is None:
+            return {"limit": None, "remaining": None, "reset_in": 0}
+        now = self.clock()
+        return {
+            "limit": bucket.limit,
+            "remaining": bucket.limit if bucket.reset <= now and bucket.limit else bucket.remaining,
+            "reset_in": max(bucket.reset - now, 0),
+        }
@@ -0,0 +1,36 @@
+class ResponseCache:
+    def __init__(self, cache, timeout=3600, key_prefix="response"):
+        """
+        Keeps rendered response bodies. Keys are expected to change with the
+        data of the response (e.g. hold a version of it), the timeout only
+        bounds how long an entry nobody asks for anymore takes space.
+        :param cache: Django cache backend shared by the processes
+        :param timeout: seconds an entry is kept
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def _cache_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def get(self, key):
+        """
+        :return: HttpResponse of the stored body, None if not stored
+        """
+        from django.http import HttpResponse
+
+        stored = self.cache.get(self._cache_key(key))
+        if stored is None:
+            return None
+        content, content_type = stored
+        return HttpResponse(content, content_type=content_type)
+
+    def store(self, key, response):
+        """Stores the body of a template response once it is rendered."""
+
+        def store_rendered(rendered):
+            self.cache.set(self._cache_key(key), (rendered.content, rendered["Content-Type"]), timeout=self.timeout)
+
+        response.add_post_render_callback(store_rendered)
+        return response
@@ -1,3 +1,17 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from twitter_scraper.infrastructure.exceptions import PrefetchTimeout
+
+
+def close_objects(iter_objs):
+    """Closes the objects of a page left partly consumed, a streamed page keeps its connection until then."""
+    close = getattr(iter_objs, "close", None)
+    if close is not None:
+        close()
+
+
 class RequestPaginator:
     def __init__(
         self,
@@ -30,20 +44,146 @@ class RequestPaginator:
         page_count = 0
         item_count = 0
 
-        while iter_objs:
-            for obj in iter_objs:
+        try:
+            while iter_objs:
+                for obj in iter_objs:
+                    if self._reached_max_limits(page_count, item_count):
+                        break
+
+                    yield obj
+                    item_count += 1
+
+                if self._reached_max_limits(page_count, item_count):
+                    break
+
+                if not self.has_next_page(response):
+                    break
+
+                response = self.next_page_request(prev_response=response)
+                iter_objs = self.iter_objects(response=response)
+                page_count += 1
+        finally:
+            close_objects(iter_objs)
+
+
+_prefetch_executor = None
+_prefetch_executor_lock = threading.Lock()
+
+
+def get_prefetch_executor(max_workers=8):
+    global _prefetch_executor
+    with _prefetch_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request-prefetch")
+    return _prefetch_executor
+
+
+class PrefetchingRequestPaginator(RequestPaginator):
+    _done = object()
+
+    def __init__(
+        self, *args, prefetch_depth=1, executor=None, get_timeout=300, consume_before_next_page=False, **kwargs
+    ):
+        """
+        RequestPaginator that requests the upcoming pages on a background thread
+        while the objects of the current page are consumed.
+        :param prefetch_depth: max number of fetched pages waiting to be consumed
+        :param executor: executor running the page requests, shared one by default
+        :param get_timeout: seconds the consumer waits for the next page before PrefetchTimeout is raised
+        :param consume_before_next_page: whether a page has a next one is only known once its objects are
+        consumed (streamed responses), the consumer tells it to the producer so only it reads the response
+        """
+        super().__init__(*args, **kwargs)
+        self.prefetch_depth = prefetch_depth
+        self.executor = executor
+        self.get_timeout = get_timeout
+        self.consume_before_next_page = consume_before_next_page
+
+    def _put(self, pages, cancelled, item):
+        # waits for the consumer however slow it is, until it stops consuming
+        while not cancelled.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, pages):
+        try:
+            return pages.get(timeout=self.get_timeout)
+        except queue.Empty:
+            raise PrefetchTimeout(f"No page was fetched in {self.get_timeout} seconds.")
+
+    def _get_has_next_page(self, handoff, cancelled):
+        while not cancelled.is_set():
+            try:
+                return handoff.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return False
+
+    def _fetch_pages(self, pages, cancelled):
+        try:
+            response = self.request()
+            page_count = 0
+            item_count = 0
+            while True:
+                handoff = queue.Queue(maxsize=1) if self.consume_before_next_page else None
+                if handoff is None and self.max_items is not None:
+                    # no page is requested past the items the consumer takes, a streamed page is
+                    # consumed before the next one is requested anyway
+                    item_count += sum(1 for _ in self.iter_objects(response=response))
+                if not self._put(pages, cancelled, (response, handoff, None)):
+                    break
+                page_count += 1
                 if self._reached_max_limits(page_count, item_count):
                     break
+                if handoff is not None:
+                    has_next_page = self._get_has_next_page(handoff, cancelled)
+                else:
+                    has_next_page = self.has_next_page(response)
+                if not has_next_page:
+                    break
+                response = self.next_page_request(prev_response=response)
+        except Exception as exc:
+            self._put(pages, cancelled, (None, None, exc))
+        finally:
+            self._put(pages, cancelled, self._done)
+
+    def get_objects(self):
+        pages = queue.Queue(maxsize=self.prefetch_depth)
+        cancelled = threading.Event()
+        executor = self.executor or get_prefetch_executor()
+        executor.submit(self._fetch_pages, pages, cancelled)
+        page_count = 0
+        item_count = 0
 
-                yield obj
-                item_count += 1
+        try:
+            while True:
+                page = self._get(pages)
+                if page is self._done:
+                    break
+                response, handoff, exc = page
+                if exc is not None:
+                    raise exc
 
-            if self._reached_max_limits(page_count, item_count):
-                break
+                iter_objs = self.iter_objects(response=response)
+                try:
+                    for obj in iter_objs:
+                        if self._reached_max_limits(page_count, item_count):
+                            break
 
-            if not self.has_next_page(response):
-                break
+                        yield obj
+                        item_count += 1
+                finally:
+                    close_objects(iter_objs)
 
-            response = self.next_page_request(prev_response=response)
-            iter_objs = self.iter_objects(response=response)
-            page_count += 1
+                if self._reached_max_limits(page_count, item_count):
+                    break
+                if handoff is not None:
+                    # read after the objects, on the thread that consumed them
+                    handoff.put(self.has_next_page(response))
+                page_count += 1
+        finally:
+            cancelled.set()
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightType(Enum):
+    none = "none"
+    local = "local"
+    cache = "cache"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight:
+    """Runs a function once per key at a time. Callers arriving while the key
+    is in flight wait for it and share its result (or exception)."""
+
+    def __init__(self):
+        self._calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        :return: (result, shared) where shared is True if the result comes from another caller.
+        """
+        with self.lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as exc:
+            call.exception = exc
+            raise
+        finally:
+            with self.lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CacheSingleFlight(SingleFlight):
+    def __init__(self, cache, lock_timeout=60, wait_timeout=30, poll_interval=0.05, key_prefix="single-flight"):
+        """
+        SingleFlight that also coalesces callers of other processes through a
+        lock in a shared cache. Callers of other processes only wait for the
+        leader to finish, they don't receive its result.
+        :param cache: Django cache backend shared by the processes
+        :param lock_timeout: seconds before a lock of a crashed leader expires
+        :param wait_timeout: max seconds a caller waits for the leader
+        :param poll_interval: seconds between lock checks while waiting
+        """
+        super().__init__()
+        self.cache = cache
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.key_prefix = key_prefix
+
+    def _lock_key(self, key):
+        return f"{self.key_prefix}:{hashlib.md5(str(key).encode()).hexdigest()}"
+
+    def _wait(self, lock_key):
+        deadline = time.monotonic() + self.wait_timeout
+        while self.cache.get(lock_key) is not None:
+            if time.monotonic() >= deadline:
+                logger.warning(f"Gave up waiting for {lock_key} after {self.wait_timeout} seconds.")
+                return
+            time.sleep(self.poll_interval)
+
+    def _do_across_processes(self, key, func, *args, **kwargs):
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        if not self.cache.add(lock_key, token, timeout=self.lock_timeout):
+            self._wait(lock_key)
+            return None, True
+        try:
+            return func(*args, **kwargs), False
+        finally:
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def do(self, key, func, *args, **kwargs):
+        (result, shared_across_processes), shared = super().do(
+            key, self._do_across_processes, key, func, *args, **kwargs
+        )
+        return result, shared or shared_across_processes
@@ -0,0 +1,23 @@
+import datetime
+
+# tweet ids are snowflakes since November 2010: milliseconds since the Twitter epoch shifted left by 22 bits
+TWITTER_EPOCH_MS = 1288834974657
+TIMESTAMP_SHIFT = 22
+
+
+def snowflake_to_datetime(snowflake_id):
+    """Creation time of a snowflake id, ids older than the snowflakes map to the Twitter epoch.
+    >>> snowflake_to_datetime(1403128238184955906)
+    datetime.datetime(2021, 6, 10, 23, 13, 35, 502000, tzinfo=datetime.timezone.utc)
+    """
+    milliseconds = (snowflake_id >> TIMESTAMP_SHIFT) + TWITTER_EPOCH_MS
+    return datetime.datetime.fromtimestamp(milliseconds / 1000, tz=datetime.timezone.utc)
+
+
+def datetime_to_snowflake(value):
+    """The smallest snowflake id created at the given time.
+    >>> datetime_to_snowflake(datetime.datetime(2021, 6, 10, 23, 13, 35, 502000, tzinfo=datetime.timezone.utc))
+    1403128238183546880
+    """
+    milliseconds = round(value.timestamp() * 1000) - TWITTER_EPOCH_MS
+    return max(milliseconds, 0) << TIMESTAMP_SHIFT
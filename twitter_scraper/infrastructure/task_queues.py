@@ -0,0 +1,186 @@
+import datetime
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueueType(Enum):
+    sync = "sync"
+    thread = "thread"
+    database = "database"
+
+
+class CompletedTask:
+    def wait(self, timeout=None):
+        return True
+
+
+class FutureTask:
+    def __init__(self, future):
+        self.future = future
+
+    def wait(self, timeout=None):
+        """
+        :return: True if the task is done within the timeout (in seconds)
+        """
+        done, _ = wait_futures([self.future], timeout=timeout)
+        return bool(done)
+
+
+class SyncTaskQueue:
+    """Runs the tasks right away in the caller."""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, name, func):
+        self.handlers[name] = func
+
+    def submit(self, name, key, **params):
+        self.handlers[name](**params)
+        return CompletedTask()
+
+
+class ThreadPoolTaskQueue(SyncTaskQueue):
+    def __init__(self, max_workers=2):
+        """
+        Runs the tasks on a pool of threads of this process. A task submitted
+        while the same key is queued or running joins it.
+        :param max_workers: number of threads running the tasks
+        """
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-queue")
+        self._futures = {}
+        self.lock = threading.Lock()
+
+    def _run(self, name, **params):
+        from django.db import close_old_connections
+
+        # the pool threads outlive the tasks like the threads of a web server outlive the requests
+        close_old_connections()
+        try:
+            return self.handlers[name](**params)
+        finally:
+            close_old_connections()
+
+    def _done(self, key, future):
+        with self.lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+        if future.exception() is not None:
+            logger.error(f"Task {key} failed.", exc_info=future.exception())
+
+    def submit(self, name, key, **params):
+        with self.lock:
+            future = self._futures.get(key)
+            is_new = future is None
+            if is_new:
+                future = self._futures[key] = self.executor.submit(self._run, name, **params)
+        if is_new:
+            # called right away if the task is already done, so not under the lock
+            future.add_done_callback(lambda done: self._done(key, done))
+        return FutureTask(future)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class DatabaseTask:
+    def __init__(self, queue, pk):
+        self.queue = queue
+        self.pk = pk
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.model.objects.filter(pk=self.pk).exists():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.queue.poll_interval)
+        return True
+
+
+class DatabaseTaskQueue(SyncTaskQueue):
+    def __init__(self, model="scraper.IngestTask", poll_interval=0.05, lease=300, max_attempts=3, retry_backoff=10):
+        """
+        Keeps the tasks in a table drained by worker processes (`run_pending`).
+        A task submitted while the same key is queued or running joins it.
+        :param model: "app_label.ModelName" of a model with name, key, params, created_at, started_at and attempts
+        :param poll_interval: seconds between checks of a waiting caller
+        :param lease: seconds after which a task started by a crashed worker is run again
+        :param max_attempts: a task failing this many times is dropped
+        :param retry_backoff: seconds before the first retry of a failed task, doubled on every attempt
+        """
+        super().__init__()
+        self.model_name = model
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    @property
+    def model(self):
+        from django.apps import apps
+
+        return apps.get_model(self.model_name)
+
+    def submit(self, name, key, **params):
+        hashed_key = hashlib.md5(str(key).encode()).hexdigest()
+        task, _ = self.model.objects.get_or_create(key=hashed_key, defaults={"name": name, "params": params})
+        return DatabaseTask(queue=self, pk=task.pk)
+
+    def _claim(self):
+        from django.db import transaction
+        from django.db.models import Q
+        from django.utils import timezone
+
+        now = timezone.now()
+        expired = now - datetime.timedelta(seconds=self.lease)
+        with transaction.atomic():
+            task = (
+                self.model.objects.select_for_update(skip_locked=True)
+                .filter(Q(started_at__isnull=True) | Q(started_at__lt=expired))
+                .order_by("created_at")
+                .first()
+            )
+            if task is None:
+                return None
+            task.started_at = now
+            task.attempts += 1
+            task.save(update_fields=["started_at", "attempts"])
+            return task
+
+    def retry_delay(self, attempts):
+        return self.retry_backoff * 2 ** (attempts - 1)
+
+    def _run(self, task):
+        from django.utils import timezone
+
+        try:
+            self.handlers[task.name](**task.params)
+        except Exception:
+            logger.exception(f"Task {task.name} {task.params} failed on attempt {task.attempts}.")
+            if task.attempts < self.max_attempts:
+                # the lease of the task runs out when its retry is due
+                delay = datetime.timedelta(seconds=self.retry_delay(task.attempts) - self.lease)
+                self.model.objects.filter(pk=task.pk).update(started_at=timezone.now() + delay)
+                return
+        task.delete()
+
+    def run_pending(self, max_tasks=None):
+        """
+        Runs the queued tasks until the queue is empty.
+        :return: number of tasks run
+        """
+        count = 0
+        while max_tasks is None or count < max_tasks:
+            task = self._claim()
+            if task is None:
+                break
+            self._run(task)
+            count += 1
+        return count
@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.bloom import BloomFilter
+
+
+class BloomFilterTestCase(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        bloom.add_many(range(0, 2000, 2))
+        self.assertTrue(all(key in bloom for key in range(0, 2000, 2)))
+        self.assertEqual(bloom.count, 1000)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        bloom.add_many(range(1000))
+        false_positives = sum(key in bloom for key in range(10000, 20000))
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_clear(self):
+        bloom = BloomFilter(capacity=10)
+        bloom.add(1234567890123)
+        self.assertIn(1234567890123, bloom)
+        bloom.clear()
+        self.assertNotIn(1234567890123, bloom)
+        self.assertEqual(bloom.count, 0)
@@ -0,0 +1,54 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from twitter_scraper.infrastructure.db_routers import PrimaryPins, ReplicaRouter
+from twitter_scraper.scraper.models import IngestTask, Tweet, TweetAccount
+
+
+class ReplicaRouterTestCase(TransactionTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter(replicas=["replica_0", "replica_1"], models=["scraper.tweet"])
+
+    def test_reads_replicated_models_from_replicas(self):
+        aliases = {self.router.db_for_read(Tweet) for _ in range(50)}
+        self.assertEqual(aliases, {"replica_0", "replica_1"})
+
+    def test_reads_other_models_from_primary(self):
+        self.assertEqual(self.router.db_for_read(IngestTask), "default")
+
+    def test_reads_inside_transactions_from_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Tweet), "default")
+
+    def test_reads_related_objects_from_the_database_of_the_instance(self):
+        account = TweetAccount(fullname="dummy", username="dummy", twitter_id=1)
+        account._state.db = "replica_1"
+        self.assertEqual(self.router.db_for_read(Tweet, instance=account), "replica_1")
+
+    def test_without_replicas(self):
+        router = ReplicaRouter(replicas=[], models=["scraper.tweet"])
+        self.assertEqual(router.db_for_read(Tweet), "default")
+
+    def test_writes_and_migrations_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Tweet), "default")
+        self.assertIsNone(self.router.allow_migrate("default", "scraper"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "scraper"))
+
+
+class PrimaryPinsTestCase(TestCase):
+    def setUp(self):
+        self.cache = caches["default"]
+        self.addCleanup(self.cache.clear)
+        self.pins = PrimaryPins(cache=self.cache, window=5)
+
+    def test_pinned_keys(self):
+        self.pins.pin("hashtag:python")
+
+        self.assertTrue(self.pins.is_pinned("hashtag:python"))
+        self.assertFalse(self.pins.is_pinned("hashtag:django"))
+
+    def test_pins_expire_after_the_window(self):
+        pins = PrimaryPins(cache=self.cache, window=0)
+        pins.pin("hashtag:python")
+        self.assertFalse(pins.is_pinned("hashtag:python"))
@@ -3,10 +3,7 @@ from unittest import mock
 from django.test import TestCase
 from memoize import DEFAULT_CACHE_OBJECT
 
-from twitter_scraper.infrastructure.decorators import (
-    RateLimitDecorator,
-    memoize_generator,
-)
+from twitter_scraper.infrastructure.decorators import memoize_generator
 
 memoizer_path = "twitter_scraper.infrastructure.decorators"
 
@@ -24,48 +21,6 @@ class DummyClock:
         self.now += num
 
 
-class DummyException(Exception):
-    pass
-
-
-class RateLimitDecoratorTestCase(TestCase):
-    def setUp(self):
-        self.original_return_value = 1
-        self.dummy_func = mock.Mock(return_value=self.original_return_value)
-        self.return_value = "rate_limit_triggered"
-        self.wait_period = 10
-        self.clock = DummyClock()
-        self.clock.now = 100
-        self.decorator = RateLimitDecorator(
-            on_exception=DummyException,
-            wait_period=self.wait_period,
-            clock=self.clock,
-            default_return_value=self.return_value,
-        )
-        self.decorated_func = self.decorator(self.dummy_func)
-
-    def test_rate_limit_not_triggered(self):
-        result = self.decorated_func()
-        self.assertEqual(result, self.original_return_value)
-
-    def test_rate_limit_triggered(self):
-        result = self.decorated_func()
-        self.assertEqual(result, self.original_return_value)
-
-        self.dummy_func.side_effect = DummyException
-        result = self.decorated_func()
-        self.assertEqual(result, self.return_value)
-
-        self.clock.increment(5)
-        result = self.decorated_func()
-        self.assertEqual(result, self.return_value)
-
-        self.clock.increment(10)
-        self.dummy_func.side_effect = None
-        result = self.decorated_func()
-        self.assertEqual(result, self.original_return_value)
-
-
 @mock.patch(f"{memoizer_path}._memoizer._memoize_make_cache_key", return_value=mock.Mock(return_value="dummy"))
 @mock.patch(f"{memoizer_path}._memoizer.cache.set")
 @mock.patch(f"{memoizer_path}._memoizer.cache.get", return_value=DEFAULT_CACHE_OBJECT)
@@ -0,0 +1,21 @@
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.freshness import Freshness, FreshnessPolicy
+
+
+class FreshnessPolicyTestCase(TestCase):
+    def test_windows(self):
+        policy = FreshnessPolicy(fresh_for=10, stale_for=300)
+
+        self.assertEqual(policy(None), Freshness.expired)
+        self.assertEqual(policy(0), Freshness.fresh)
+        self.assertEqual(policy(9.9), Freshness.fresh)
+        self.assertEqual(policy(10), Freshness.stale)
+        self.assertEqual(policy(299), Freshness.stale)
+        self.assertEqual(policy(300), Freshness.expired)
+
+    def test_without_stale_window(self):
+        policy = FreshnessPolicy(fresh_for=10, stale_for=10)
+
+        self.assertEqual(policy(5), Freshness.fresh)
+        self.assertEqual(policy(10), Freshness.expired)
@@ -0,0 +1,52 @@
+import threading
+
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.lru import LRUCache
+
+
+class LRUCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=2)
+
+    def test_drops_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.cache.set("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+        self.assertEqual(len(self.cache), 2)
+
+    def test_stats(self):
+        self.cache.set_many({"a": 1})
+        self.cache.get("a")
+        self.cache.get_many(["a", "b", "c"])
+
+        self.assertEqual(self.cache.stats(), {"size": 1, "maxsize": 2, "hits": 2, "misses": 2, "hit_ratio": 0.5})
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["hit_ratio"], 0.0)
+
+    def test_delete(self):
+        self.cache.set_many({"a": 1, "b": 2})
+        self.cache.delete("a")
+        self.cache.delete_many(["b", "missing"])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_concurrent_access(self):
+        cache = LRUCache(maxsize=50)
+
+        def worker(offset):
+            for i in range(1000):
+                cache.set(offset + i % 100, i)
+                cache.get(offset + (i + 1) % 100)
+
+        threads = [threading.Thread(target=worker, args=(offset * 1000,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.stats()["hits"] + cache.stats()["misses"], 4000)
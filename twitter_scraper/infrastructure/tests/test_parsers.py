@@ -0,0 +1,58 @@
+import json
+
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.parsers import JSONObjectStream
+
+
+class JSONObjectStreamTestCase(TestCase):
+    def setUp(self):
+        self.document = {
+            "statuses": [{"id": i, "text": "ü" * i, "retweeted": i % 2 == 0, "score": i / 2} for i in range(10)],
+            "search_metadata": {"count": 10, "next_results": "?max_id=1"},
+            "total": 10,
+        }
+        self.body = json.dumps(self.document, ensure_ascii=False).encode()
+
+    def _chunks(self, size):
+        return (self.body[i : i + size] for i in range(0, len(self.body), size))
+
+    def test_iter_items_given_any_chunk_size(self):
+        for size in (1, 2, 5, 64, len(self.body)):
+            stream = JSONObjectStream(chunks=self._chunks(size), stream_key="statuses")
+            self.assertEqual(list(stream.iter_items()), self.document["statuses"])
+            self.assertEqual(stream.members["search_metadata"], self.document["search_metadata"])
+            self.assertEqual(stream.members["total"], 10)
+            self.assertTrue(stream.finished)
+
+    def test_first_item_decoded_before_whole_body_is_read(self):
+        read_chunks = []
+
+        def chunks():
+            for chunk in self._chunks(64):
+                read_chunks.append(chunk)
+                yield chunk
+
+        stream = JSONObjectStream(chunks=chunks(), stream_key="statuses")
+        self.assertEqual(next(stream.iter_items()), self.document["statuses"][0])
+        self.assertLess(sum(map(len, read_chunks)), len(self.body) / 2)
+
+    def test_finish_keeps_unconsumed_items(self):
+        stream = JSONObjectStream(chunks=self._chunks(16), stream_key="statuses")
+        items = stream.iter_items()
+        first = next(items)
+        members = stream.finish()
+        self.assertEqual(members["search_metadata"], self.document["search_metadata"])
+        self.assertEqual([first] + list(items), self.document["statuses"])
+
+    def test_empty_body(self):
+        stream = JSONObjectStream(chunks=[], stream_key="statuses")
+        self.assertEqual(list(stream.iter_items()), [])
+        self.assertEqual(stream.finish(), {})
+
+    def test_malformed_body(self):
+        stream = JSONObjectStream(chunks=[b'{"statuses": [{"id": 1}, {"id": '], stream_key="statuses")
+        items = stream.iter_items()
+        self.assertEqual(next(items), {"id": 1})
+        with self.assertRaises(ValueError):
+            next(items)
@@ -0,0 +1,169 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.rate_limits import (
+    CacheRateLimitStore,
+    DatabaseRateLimitStore,
+    FileRateLimitStore,
+    HeaderRateLimiter,
+    LocalRateLimitStore,
+)
+from twitter_scraper.infrastructure.tests.test_decorators import DummyClock
+
+
+class HeaderRateLimiterTestCase(TestCase):
+    def setUp(self):
+        self.clock = DummyClock()
+        self.clock.now = 1000
+        self.limiter = HeaderRateLimiter(window=900, clock=self.clock)
+        self.key = ("/1.1/search/tweets.json", "dummy")
+
+    def _headers(self, limit=180, remaining=180, reset=1900):
+        return {"x-rate-limit-limit": limit, "x-rate-limit-remaining": remaining, "x-rate-limit-reset": reset}
+
+    def test_unknown_key_is_probed_by_one_request(self):
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        self.assertFalse(self.limiter.try_acquire(self.key))
+        self.assertEqual(self.limiter.stats(), {self.key: {"limit": None, "remaining": 0, "reset_in": 10}})
+
+        self.limiter.update(self.key, self._headers(remaining=2))
+        self.assertTrue(self.limiter.try_acquire(self.key))
+
+    def test_probe_without_headers(self):
+        self.limiter.try_acquire(self.key)
+        self.limiter.update(self.key, {})
+        self.assertEqual(self.limiter.stats(), {})
+        self.assertTrue(self.limiter.try_acquire(self.key))
+
+    def test_unanswered_probe_is_sent_again_after_the_probe_window(self):
+        self.limiter.try_acquire(self.key)
+        self.clock.increment(10)
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        self.assertFalse(self.limiter.try_acquire(self.key))
+
+    def test_acquire_waits_for_the_headers_of_the_probe(self):
+        self.limiter.try_acquire(self.key)
+        threading.Timer(0.05, self.limiter.update, args=(self.key, self._headers(remaining=1))).start()
+        self.assertTrue(self.limiter.acquire(self.key, timeout=1))
+        self.assertFalse(self.limiter.acquire(self.key, timeout=0.1))
+
+    def test_acquire_does_not_wait_for_a_later_reset(self):
+        self.limiter.exhaust(self.key)
+        started = time.monotonic()
+        self.assertFalse(self.limiter.acquire(self.key, timeout=1))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_consumes_budget_until_reset(self):
+        self.limiter.update(self.key, self._headers(remaining=2))
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        self.assertFalse(self.limiter.try_acquire(self.key))
+
+        self.clock.now = 1900
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        self.assertEqual(self.limiter.stats()[self.key]["remaining"], 179)
+
+    def test_update_keeps_tokens_of_requests_in_flight(self):
+        self.limiter.update(self.key, self._headers(remaining=10))
+        for _ in range(3):
+            self.limiter.try_acquire(self.key)
+        self.limiter.update(self.key, self._headers(remaining=9))
+        self.assertEqual(self.limiter.stats()[self.key]["remaining"], 7)
+
+        self.limiter.update(self.key, self._headers(remaining=180, reset=2800))
+        self.assertEqual(self.limiter.stats()[self.key]["remaining"], 180)
+
+    def test_update_ignores_missing_headers(self):
+        self.limiter.update(self.key, {})
+        self.assertEqual(self.limiter.stats(), {})
+
+    def test_exhaust(self):
+        self.limiter.exhaust(self.key, self._headers(remaining=0, reset=1500))
+        self.assertFalse(self.limiter.try_acquire(self.key))
+        self.clock.now = 1500
+        self.assertTrue(self.limiter.try_acquire(self.key))
+
+    def test_exhaust_without_headers(self):
+        self.limiter.exhaust(self.key)
+        self.assertFalse(self.limiter.try_acquire(self.key))
+        self.clock.increment(900)
+        self.assertTrue(self.limiter.try_acquire(self.key))
+        # the budget is unknown again, probed by a single request
+        self.assertFalse(self.limiter.try_acquire(self.key))
+
+
+class SharedRateLimitStoreMixin:
+    """Two limiters built on two instances of a store act as two workers."""
+
+    def build_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.clock = DummyClock()
+        self.clock.now = 1000
+        self.worker_1 = HeaderRateLimiter(window=900, clock=self.clock, store=self.build_store())
+        self.worker_2 = HeaderRateLimiter(window=900, clock=self.clock, store=self.build_store())
+        self.key = ("/1.1/search/tweets.json", "dummy")
+        self.headers = {"x-rate-limit-limit": 180, "x-rate-limit-remaining": 2, "x-rate-limit-reset": 1900}
+
+    def test_workers_share_budget(self):
+        self.worker_1.update(self.key, self.headers)
+        self.assertEqual(self.worker_2.remaining(self.key), 2)
+        self.assertTrue(self.worker_1.try_acquire(self.key))
+        self.assertTrue(self.worker_2.try_acquire(self.key))
+        self.assertFalse(self.worker_1.try_acquire(self.key))
+        self.assertEqual(self.worker_2.stats(), {self.key: {"limit": 180, "remaining": 0, "reset_in": 900}})
+
+    def test_exhaust_is_seen_by_other_workers(self):
+        self.worker_1.exhaust(
+            self.key, {"x-rate-limit-limit": 180, "x-rate-limit-remaining": 0, "x-rate-limit-reset": 1500}
+        )
+        self.assertFalse(self.worker_2.try_acquire(self.key))
+
+        self.clock.now = 1500
+        self.assertTrue(self.worker_2.try_acquire(self.key))
+        self.assertEqual(self.worker_1.remaining(self.key), 179)
+
+    def test_unknown_limit_is_probed_again_after_reset(self):
+        self.worker_1.exhaust(self.key)
+        self.assertFalse(self.worker_2.try_acquire(self.key))
+        self.clock.now = 1900
+        self.assertTrue(self.worker_2.try_acquire(self.key))
+        self.assertFalse(self.worker_1.try_acquire(self.key))
+        self.assertEqual(self.worker_1.stats(), {self.key: {"limit": None, "remaining": 0, "reset_in": 10}})
+
+
+class LocalRateLimitStoreTestCase(TestCase):
+    def test_store_is_per_instance(self):
+        key = ("/1.1/search/tweets.json", "dummy")
+        worker_1 = HeaderRateLimiter(store=LocalRateLimitStore())
+        worker_2 = HeaderRateLimiter(store=LocalRateLimitStore())
+        worker_1.exhaust(key)
+        self.assertFalse(worker_1.try_acquire(key))
+        self.assertTrue(worker_2.try_acquire(key))
+
+
+class CacheRateLimitStoreTestCase(SharedRateLimitStoreMixin, TestCase):
+    def build_store(self):
+        caches["default"].clear()
+        return CacheRateLimitStore(cache=caches["default"])
+
+
+class DatabaseRateLimitStoreTestCase(SharedRateLimitStoreMixin, TestCase):
+    def build_store(self):
+        return DatabaseRateLimitStore(model="scraper.RateLimitState")
+
+
+class FileRateLimitStoreTestCase(SharedRateLimitStoreMixin, TestCase):
+    def build_store(self):
+        return FileRateLimitStore(path=Path(self.tmp_dir.name) / "rate_limits.json")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        super().setUp()
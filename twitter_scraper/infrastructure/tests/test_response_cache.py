@@ -0,0 +1,33 @@
+from django.core.cache import caches
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.response_cache import ResponseCache
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = caches["default"]
+        self.addCleanup(self.cache.clear)
+        self.response_cache = ResponseCache(cache=self.cache, timeout=60)
+
+    def _response(self, content):
+        template = engines["django"].from_string(content)
+        return SimpleTemplateResponse(template, content_type="application/json")
+
+    def test_stores_the_rendered_body(self):
+        response = self.response_cache.store("key", self._response('{"count": 1}'))
+        self.assertIsNone(self.response_cache.get("key"))
+
+        response.render()
+        cached = self.response_cache.get("key")
+        self.assertEqual(cached.content, b'{"count": 1}')
+        self.assertEqual(cached["Content-Type"], "application/json")
+        self.assertIsNone(self.response_cache.get("other"))
+
+    def test_keys_are_prefixed(self):
+        self.response_cache.store("key", self._response("{}")).render()
+        other = ResponseCache(cache=self.cache, key_prefix="other")
+
+        self.assertIsNone(other.get("key"))
@@ -1,8 +1,14 @@
+import threading
+import time
 from unittest import mock
 
 from django.test import TestCase
 
-from twitter_scraper.infrastructure.services import RequestPaginator
+from twitter_scraper.infrastructure.exceptions import PrefetchTimeout
+from twitter_scraper.infrastructure.services import (
+    PrefetchingRequestPaginator,
+    RequestPaginator,
+)
 
 
 class RequestPaginatorTestCase(TestCase):
@@ -120,3 +126,166 @@ class RequestPaginatorTestCase(TestCase):
         self.assertEqual(self.iter_objects.call_count, 2)
         self.assertEqual(self.has_next_page.call_count, 1)
         self.assertEqual(self.next_page_request.call_count, 1)
+
+    def test_page_left_unconsumed_is_closed(self):
+        closed = []
+
+        def iter_objects(response):
+            try:
+                yield from ["x"] * 10
+            finally:
+                closed.append(response)
+
+        self._prepare_paginator(iter_objects_func=iter_objects)
+        self.paginator(max_items=5)
+
+        self.assertEqual(list(self.paginator.get_objects()), ["x"] * 5)
+        self.assertEqual(closed, [None])
+
+    def test_page_is_closed_when_consumer_stops(self):
+        closed = []
+
+        def iter_objects(response):
+            try:
+                yield from ["x"] * 10
+            finally:
+                closed.append(response)
+
+        self._prepare_paginator(iter_objects_func=iter_objects)
+        objs = self.paginator.get_objects()
+        next(objs)
+        objs.close()
+        self.assertEqual(closed, [None])
+
+
+class PrefetchingRequestPaginatorTestCase(TestCase):
+    def setUp(self):
+        self.pages = [[f"{page}-{i}" for i in range(5)] for page in range(4)]
+        self.request = mock.Mock(return_value=0)
+        self.next_page_request = mock.Mock(side_effect=lambda prev_response: prev_response + 1)
+        self.iter_objects = mock.Mock(side_effect=lambda response: iter(self.pages[response]))
+        self.has_next_page = mock.Mock(side_effect=lambda response: response + 1 < len(self.pages))
+
+    def _prepare_paginator(self, prefetch_depth=1, **kwargs):
+        return PrefetchingRequestPaginator(
+            request_func=self.request,
+            iter_objects_func=self.iter_objects,
+            next_page_request_func=self.next_page_request,
+            has_next_page_func=self.has_next_page,
+            prefetch_depth=prefetch_depth,
+            **kwargs,
+        )
+
+    def test_without_max_limit(self):
+        paginator = self._prepare_paginator()
+        result = list(paginator.get_objects())
+        self.assertEqual(result, sum(self.pages, []))
+        self.assertEqual(self.request.call_count, 1)
+        self.assertEqual(self.next_page_request.call_count, 3)
+
+    def test_max_items_cancels_prefetch(self):
+        paginator = self._prepare_paginator(prefetch_depth=1)
+        paginator(max_items=7)
+        result = list(paginator.get_objects())
+        self.assertEqual(result, sum(self.pages, [])[:7])
+        self.assertEqual(self.next_page_request.call_count, 1)
+
+    def test_first_page_satisfying_max_items(self):
+        paginator = self._prepare_paginator(prefetch_depth=2)
+        paginator(max_items=5)
+        self.assertEqual(list(paginator.get_objects()), self.pages[0])
+        self.assertEqual(self.request.call_count, 1)
+        self.assertEqual(self.next_page_request.call_count, 0)
+
+    def test_page_left_unconsumed_is_closed(self):
+        closed = []
+
+        def iter_objects(response):
+            try:
+                yield from self.pages[response]
+            finally:
+                closed.append(response)
+
+        self.iter_objects = mock.Mock(side_effect=iter_objects)
+        paginator = self._prepare_paginator(consume_before_next_page=True)
+        paginator(max_items=7)
+
+        self.assertEqual(list(paginator.get_objects()), sum(self.pages, [])[:7])
+        self.assertEqual(closed, [0, 1])
+
+    def test_max_pages(self):
+        paginator = self._prepare_paginator()
+        paginator(max_pages=2)
+        result = list(paginator.get_objects())
+        self.assertEqual(result, self.pages[0] + self.pages[1])
+        self.assertEqual(self.next_page_request.call_count, 1)
+
+    def test_bounded_prefetch_depth(self):
+        paginator = self._prepare_paginator(prefetch_depth=1)
+        objects = paginator.get_objects()
+        next(objects)
+        time.sleep(0.3)
+        # the consumed page, one queued page and one page blocked on the full queue
+        self.assertEqual(self.request.call_count + self.next_page_request.call_count, 3)
+        objects.close()
+
+    def test_next_page_fetched_while_consuming(self):
+        def slow_next_page_request(prev_response):
+            time.sleep(0.1)
+            return prev_response + 1
+
+        self.next_page_request.side_effect = slow_next_page_request
+        paginator = self._prepare_paginator(prefetch_depth=2)
+        started = time.monotonic()
+        for _ in paginator.get_objects():
+            time.sleep(0.02)
+        elapsed = time.monotonic() - started
+        # serial: 3 * 0.1 (requests) + 20 * 0.02 (consuming) = 0.7
+        self.assertLess(elapsed, 0.6)
+
+    def test_request_error_is_raised_to_consumer(self):
+        self.next_page_request.side_effect = ValueError
+        paginator = self._prepare_paginator()
+        objects = paginator.get_objects()
+        self.assertEqual([next(objects) for _ in range(5)], self.pages[0])
+        with self.assertRaises(ValueError):
+            next(objects)
+
+    def test_slow_consumer_gets_every_page(self):
+        paginator = self._prepare_paginator(prefetch_depth=1)
+        result = []
+        for obj in paginator.get_objects():
+            result.append(obj)
+            if obj.endswith("-4"):
+                # the producer keeps waiting on the full queue
+                time.sleep(0.3)
+        self.assertEqual(result, sum(self.pages, []))
+
+    def test_missing_page_times_out(self):
+        def slow_next_page_request(prev_response):
+            time.sleep(0.5)
+            return prev_response + 1
+
+        self.next_page_request.side_effect = slow_next_page_request
+        paginator = self._prepare_paginator(get_timeout=0.1)
+        objects = paginator.get_objects()
+        self.assertEqual([next(objects) for _ in range(5)], self.pages[0])
+        with self.assertRaises(PrefetchTimeout):
+            next(objects)
+
+    def test_consumer_tells_the_next_page(self):
+        consumed = []
+        self.iter_objects.side_effect = lambda response: (consumed.append(obj) or obj for obj in self.pages[response])
+        # must not be asked before the objects of the page are consumed, nor off the consuming thread
+        self.has_next_page.side_effect = lambda response: (
+            self.assertEqual(consumed[-1], self.pages[response][-1]) or response + 1 < len(self.pages)
+        )
+        paginator = self._prepare_paginator(prefetch_depth=2, consume_before_next_page=True)
+        objects = paginator.get_objects()
+        consumer = threading.get_ident()
+        self.has_next_page.side_effect = lambda response, check=self.has_next_page.side_effect: (
+            self.assertEqual(threading.get_ident(), consumer) or check(response)
+        )
+
+        self.assertEqual(list(objects), sum(self.pages, []))
+        self.assertEqual(self.has_next_page.call_count, 4)
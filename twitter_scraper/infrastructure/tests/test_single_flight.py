@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.single_flight import CacheSingleFlight, SingleFlight
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def _slow_call(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        return value
+
+    def _run_concurrently(self, single_flight, func, count=5):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.do("key", func, "dummy")))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_call(self):
+        results = self._run_concurrently(self.single_flight, self._slow_call)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result == "dummy" for result, _ in results))
+        self.assertEqual(sum(not shared for _, shared in results), 1)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.release.set()
+        self.assertEqual(self.single_flight.do("key", self._slow_call, 1), (1, False))
+        self.assertEqual(self.single_flight.do("key", self._slow_call, 2), (2, False))
+        self.assertEqual(self.calls, 2)
+
+    def test_exception_propagates_to_waiters(self):
+        errors = []
+
+        def failing_call(value):
+            self.release.wait(5)
+            raise ValueError(value)
+
+        def target():
+            try:
+                self.single_flight.do("key", failing_call, "dummy")
+            except ValueError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len({id(error) for error in errors}), 1)
+
+
+class CacheSingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.cache = caches["default"]
+        self.cache.clear()
+        self.single_flight = CacheSingleFlight(cache=self.cache, wait_timeout=2, poll_interval=0.01)
+
+    def test_releases_lock(self):
+        self.assertEqual(self.single_flight.do("key", lambda: "dummy"), ("dummy", False))
+        self.assertIsNone(self.cache.get(self.single_flight._lock_key("key")))
+
+    def test_waits_for_lock_of_other_process(self):
+        lock_key = self.single_flight._lock_key("key")
+        self.cache.add(lock_key, "other process")
+        threading.Timer(0.1, self.cache.delete, args=(lock_key,)).start()
+
+        calls = []
+        result = self.single_flight.do("key", calls.append, "dummy")
+        self.assertEqual(result, (None, True))
+        self.assertEqual(calls, [])
+
+    def test_gives_up_waiting(self):
+        self.single_flight.wait_timeout = 0.05
+        self.cache.add(self.single_flight._lock_key("key"), "other process")
+        self.assertEqual(self.single_flight.do("key", lambda: "dummy"), (None, True))
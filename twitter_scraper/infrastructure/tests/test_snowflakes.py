@@ -0,0 +1,23 @@
+import datetime
+
+from django.test import TestCase
+
+from twitter_scraper.infrastructure.snowflakes import (
+    datetime_to_snowflake,
+    snowflake_to_datetime,
+)
+
+
+class SnowflakesTestCase(TestCase):
+    def test_round_trip(self):
+        created_at = datetime.datetime(2021, 6, 10, 23, 13, 35, 502000, tzinfo=datetime.timezone.utc)
+        snowflake_id = datetime_to_snowflake(created_at)
+
+        self.assertEqual(snowflake_to_datetime(snowflake_id), created_at)
+        self.assertEqual(snowflake_to_datetime(1403128238184955906), created_at)
+        self.assertLess(snowflake_id, 1403128238184955906)
+        self.assertEqual(snowflake_to_datetime(snowflake_id - 1), created_at - datetime.timedelta(milliseconds=1))
+
+    def test_ids_older_than_snowflakes(self):
+        self.assertEqual(datetime_to_snowflake(datetime.datetime(2009, 1, 1, tzinfo=datetime.timezone.utc)), 0)
+        self.assertEqual(snowflake_to_datetime(1000).year, 2010)
@@ -0,0 +1,131 @@
+import datetime
+import threading
+
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from twitter_scraper.infrastructure.task_queues import (
+    DatabaseTaskQueue,
+    SyncTaskQueue,
+    ThreadPoolTaskQueue,
+)
+from twitter_scraper.scraper.models import IngestTask
+
+
+class SyncTaskQueueTestCase(TestCase):
+    def test_runs_the_task_in_the_caller(self):
+        calls = []
+        task_queue = SyncTaskQueue()
+        task_queue.register("dummy", lambda **params: calls.append(params))
+
+        task = task_queue.submit("dummy", "key", hashtag="python")
+
+        self.assertEqual(calls, [{"hashtag": "python"}])
+        self.assertTrue(task.wait(timeout=0))
+
+
+class ThreadPoolTaskQueueTestCase(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.task_queue = ThreadPoolTaskQueue(max_workers=2)
+        self.task_queue.register("dummy", self._slow_call)
+        self.addCleanup(self.task_queue.shutdown)
+        self.addCleanup(self.release.set)
+
+    def _slow_call(self, **params):
+        self.calls.append(params)
+        self.release.wait(5)
+
+    def test_submit_does_not_wait_for_the_task(self):
+        task = self.task_queue.submit("dummy", "key", hashtag="python")
+
+        self.assertFalse(task.wait(timeout=0.05))
+        self.release.set()
+        self.assertTrue(task.wait(timeout=5))
+        self.assertEqual(self.calls, [{"hashtag": "python"}])
+
+    def test_tasks_of_the_same_key_are_joined_while_in_flight(self):
+        tasks = [self.task_queue.submit("dummy", "key", hashtag="python") for _ in range(3)]
+        self.task_queue.submit("dummy", "other", hashtag="django")
+        self.release.set()
+        for task in tasks:
+            self.assertTrue(task.wait(timeout=5))
+
+        self.assertEqual(len(self.calls), 2)
+        self.task_queue.submit("dummy", "key", hashtag="python").wait(timeout=5)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_failed_task_is_done(self):
+        self.task_queue.register("failing", lambda: 1 / 0)
+        with self.assertLogs("twitter_scraper.infrastructure.task_queues", level="ERROR"):
+            task = self.task_queue.submit("failing", "key")
+            self.assertTrue(task.wait(timeout=5))
+        self.assertEqual(self.task_queue._futures, {})
+
+
+class DatabaseTaskQueueTestCase(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.task_queue = DatabaseTaskQueue(model="scraper.IngestTask", poll_interval=0.01, max_attempts=2)
+        self.task_queue.register("dummy", lambda **params: self.calls.append(params))
+
+    def test_tasks_run_by_the_worker(self):
+        task = self.task_queue.submit("dummy", "key", hashtag="python", limit=30)
+
+        self.assertEqual(self.calls, [])
+        self.assertFalse(task.wait(timeout=0.02))
+        self.assertEqual(self.task_queue.run_pending(), 1)
+        self.assertEqual(self.calls, [{"hashtag": "python", "limit": 30}])
+        self.assertTrue(task.wait(timeout=0))
+        self.assertFalse(IngestTask.objects.exists())
+
+    def test_tasks_of_the_same_key_are_joined(self):
+        self.task_queue.submit("dummy", "key", hashtag="python")
+        self.task_queue.submit("dummy", "key", hashtag="python")
+        self.task_queue.submit("dummy", "other", hashtag="django")
+
+        self.assertEqual(IngestTask.objects.count(), 2)
+        self.assertEqual(self.task_queue.run_pending(max_tasks=1), 1)
+        self.assertEqual(self.calls, [{"hashtag": "python"}])
+
+    def _backdate(self, seconds):
+        IngestTask.objects.update(started_at=F("started_at") - datetime.timedelta(seconds=seconds))
+
+    def test_failed_task_is_retried_until_max_attempts(self):
+        self.task_queue.register("failing", lambda: 1 / 0)
+        self.task_queue.submit("failing", "key")
+
+        with self.assertLogs("twitter_scraper.infrastructure.task_queues", level="ERROR") as logs:
+            self.assertEqual(self.task_queue.run_pending(), 1)
+            self._backdate(self.task_queue.retry_delay(1) + 1)
+            self.assertEqual(self.task_queue.run_pending(), 1)
+        self.assertEqual(len(logs.records), 2)
+        self.assertFalse(IngestTask.objects.exists())
+
+    def test_failed_task_is_retried_after_a_growing_backoff(self):
+        task_queue = DatabaseTaskQueue(model="scraper.IngestTask", max_attempts=3, retry_backoff=10)
+        task_queue.register("failing", lambda: 1 / 0)
+        task_queue.submit("failing", "key")
+
+        with self.assertLogs("twitter_scraper.infrastructure.task_queues", level="ERROR"):
+            self.assertEqual(task_queue.run_pending(), 1)
+            self._backdate(9)
+            self.assertEqual(task_queue.run_pending(), 0)
+            self._backdate(2)
+            self.assertEqual(task_queue.run_pending(), 1)
+            self._backdate(11)
+            self.assertEqual(task_queue.run_pending(), 0)
+            self._backdate(10)
+            self.assertEqual(task_queue.run_pending(), 1)
+        self.assertFalse(IngestTask.objects.exists())
+
+    def test_started_tasks_are_run_again_after_the_lease(self):
+        self.task_queue.submit("dummy", "key", hashtag="python")
+        IngestTask.objects.update(started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(self.task_queue.run_pending(), 0)
+        IngestTask.objects.update(started_at=timezone.now() - datetime.timedelta(seconds=self.task_queue.lease + 1))
+        self.assertEqual(self.task_queue.run_pending(), 1)
+        self.assertEqual(self.calls, [{"hashtag": "python"}])
@@ -1,4 +1,5 @@
 import functools
+import itertools
 from typing import Generator, Sequence
 
 
@@ -8,6 +9,19 @@ def enforce_sequence(obj):
     return obj
 
 
+def chunked(iterable, size):
+    """Splits given iterable into lists of `size` items.
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def get_list(dict_item, keys):
     """Extracts a list from given dictionary.
     >>>get_list({'a':{'b': {'c': 'value',}}},['a', 'b', 'list'])
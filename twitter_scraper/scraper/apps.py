@@ -5,9 +5,17 @@ from django.apps import AppConfig
 from twitter_scraper.infrastructure.gateways.enums import SearchTweetsAPIType
 from twitter_scraper.scraper.factories import (
     SearchTweetsAPIFactory,
+    build_page_cache,
+    build_primary_pins,
+    build_rate_limiter,
+    build_revalidation_queue,
     build_search_tweets_api_v1_1,
+    build_search_tweets_api_v1_1_async,
+    build_single_flight,
+    build_task_queue,
     build_tweet_api_fetcher,
     build_tweet_listing,
+    build_tweet_listing_fetcher,
 )
 from twitter_scraper.scraper.queries import filter_by_hashtag, filter_by_username
 
@@ -16,18 +24,39 @@ class ScraperConfig(AppConfig):
     name = "scraper"
 
 
+rate_limiter = build_rate_limiter()
+
 search_tweets_api_factory = SearchTweetsAPIFactory()
 search_tweets_api_factory.register_builder(key=SearchTweetsAPIType.v1_1, builder=build_search_tweets_api_v1_1)
+search_tweets_api_factory.register_builder(
+    key=SearchTweetsAPIType.v1_1_async, builder=build_search_tweets_api_v1_1_async
+)
 
 use_cases = SimpleNamespace()
 
 use_cases.fetch_api_tweets = build_tweet_api_fetcher()
+use_cases.fetch_listing_tweets = build_tweet_listing_fetcher()
+use_cases.single_flight = build_single_flight()
+use_cases.task_queue = build_task_queue()
+use_cases.revalidation_queue = build_revalidation_queue(task_queue=use_cases.task_queue)
+use_cases.primary_pins = build_primary_pins()
+use_cases.page_cache = build_page_cache()
 use_cases.list_tweets_by_username = build_tweet_listing(
-    fetch_data_use_case=use_cases.fetch_api_tweets,
+    fetch_data_use_case=use_cases.fetch_listing_tweets,
     query_func=filter_by_username,
+    single_flight=use_cases.single_flight,
+    task_queue=use_cases.task_queue,
+    revalidation_queue=use_cases.revalidation_queue,
+    primary_pins=use_cases.primary_pins,
+    name="list_tweets_by_username",
 )
 
 use_cases.list_tweets_by_hashtag = build_tweet_listing(
-    fetch_data_use_case=use_cases.fetch_api_tweets,
+    fetch_data_use_case=use_cases.fetch_listing_tweets,
     query_func=filter_by_hashtag,
+    single_flight=use_cases.single_flight,
+    task_queue=use_cases.task_queue,
+    revalidation_queue=use_cases.revalidation_queue,
+    primary_pins=use_cases.primary_pins,
+    name="list_tweets_by_hashtag",
 )
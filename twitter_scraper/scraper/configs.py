@@ -1,12 +1,26 @@
 from pydantic import BaseSettings
 
 from twitter_scraper.infrastructure.gateways.enums import SearchTweetsAPIType
+from twitter_scraper.infrastructure.rate_limits import RateLimitStoreType
+from twitter_scraper.infrastructure.single_flight import SingleFlightType
+from twitter_scraper.infrastructure.task_queues import TaskQueueType
 
 
 class SearchTweetsApiConfig(BaseSettings):
     client_type: SearchTweetsAPIType
     live: bool = True
     cache_timeout: int = 10
+    coverage_index: bool = True
+    bulk_ingest: bool = True
+    ingest_chunk_size: int = 500
+    ingest_mode: TaskQueueType = TaskQueueType.sync
+    ingest_workers: int = 2
+    ingest_wait_ms: int = 0
+    fresh_timeout: int = 10
+    stale_timeout: int = 300
+    single_flight: SingleFlightType = SingleFlightType.local
+    rate_limit_store: RateLimitStoreType = RateLimitStoreType.local
+    rate_limit_store_path: str = "rate_limits.json"
 
     class Config:
         env_prefix = "SEARCH_TWEETS_API_"
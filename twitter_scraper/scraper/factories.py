@@ -1,3 +1,5 @@
+import functools
+
 from twitter_scraper.infrastructure.factories import ObjectFactory
 
 
@@ -6,18 +8,66 @@ class SearchTweetsAPIFactory(ObjectFactory):
 
 
 def build_search_tweets_api_v1_1(config=None):
+    from twitter_scraper.infrastructure.gateways.sessions import SessionPool
     from twitter_scraper.infrastructure.gateways.twitter_v1_1.configs import (
         SearchTweetsConfig,
     )
     from twitter_scraper.infrastructure.gateways.twitter_v1_1.resources import (
         SearchTweetsResource,
     )
+    from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
+        SearchTweetsResponse,
+        StreamingSearchTweetsResponse,
+    )
+    from twitter_scraper.scraper.apps import rate_limiter
+
+    config = config or SearchTweetsConfig()
+    response_class = StreamingSearchTweetsResponse if config.stream_responses else SearchTweetsResponse
+    session_pool = SessionPool(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=config.max_retries,
+        backoff_factor=config.backoff_factor,
+        keep_alive=config.keep_alive,
+    )
+    return SearchTweetsResource(
+        config=config,
+        response_class=response_class,
+        session_pool=session_pool,
+        prefetch_depth=config.prefetch_depth,
+        rate_limiter=rate_limiter,
+        max_in_flight=config.max_in_flight,
+    )
+
+
+def build_search_tweets_api_v1_1_async(config=None):
+    from twitter_scraper.infrastructure.gateways.twitter_v1_1.async_resources import (
+        AsyncSearchTweetsResource,
+    )
+    from twitter_scraper.infrastructure.gateways.twitter_v1_1.configs import (
+        SearchTweetsConfig,
+    )
     from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
         SearchTweetsResponse,
     )
+    from twitter_scraper.scraper.apps import rate_limiter
 
     config = config or SearchTweetsConfig()
-    return SearchTweetsResource(config=config, response_class=SearchTweetsResponse)
+    return AsyncSearchTweetsResource(
+        config=config,
+        response_class=SearchTweetsResponse,
+        max_concurrency=config.max_concurrency,
+        timeout=config.timeout,
+        rate_limiter=rate_limiter,
+    )
+
+
+def build_tweet_api_resource():
+    from twitter_scraper.scraper.apps import search_tweets_api_factory
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+
+    config = SearchTweetsApiConfig()
+    return search_tweets_api_factory.create(key=config.client_type)
 
 
 def build_tweet_api_fetcher():
@@ -30,9 +80,148 @@ def build_tweet_api_fetcher():
     return fetch_tweets(resource=api_resource, live=config.live, cache_timeout=config.cache_timeout)
 
 
-def build_tweet_listing(fetch_data_use_case, query_func):
-    from twitter_scraper.scraper.use_cases import ListingTweets, populate_tweets
+def build_tweet_listing_fetcher():
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+    from twitter_scraper.scraper.queries import count_tweets
+    from twitter_scraper.scraper.use_cases import FetchingTweetGaps
+
+    config = SearchTweetsApiConfig()
+    if not config.coverage_index:
+        return build_tweet_api_fetcher()
+    return FetchingTweetGaps(resource=build_tweet_api_resource(), count_stored=count_tweets)
+
+
+def build_rate_limiter():
+    from django.core.cache import cache
+
+    from twitter_scraper.infrastructure.rate_limits import (
+        CacheRateLimitStore,
+        DatabaseRateLimitStore,
+        FileRateLimitStore,
+        HeaderRateLimiter,
+        LocalRateLimitStore,
+        RateLimitStoreType,
+    )
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+
+    config = SearchTweetsApiConfig()
+    stores = {
+        RateLimitStoreType.local: LocalRateLimitStore,
+        RateLimitStoreType.cache: lambda: CacheRateLimitStore(cache=cache),
+        RateLimitStoreType.database: lambda: DatabaseRateLimitStore(model="scraper.RateLimitState"),
+        RateLimitStoreType.file: lambda: FileRateLimitStore(path=config.rate_limit_store_path),
+    }
+    return HeaderRateLimiter(store=stores[config.rate_limit_store]())
+
+
+def build_single_flight():
+    from django.core.cache import cache
+
+    from twitter_scraper.infrastructure.single_flight import (
+        CacheSingleFlight,
+        SingleFlight,
+        SingleFlightType,
+    )
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
 
+    config = SearchTweetsApiConfig()
+    if config.single_flight == SingleFlightType.cache:
+        return CacheSingleFlight(cache=cache)
+    if config.single_flight == SingleFlightType.local:
+        return SingleFlight()
+    return None
+
+
+def build_tweet_populator():
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+    from twitter_scraper.scraper.use_cases import bulk_populate_tweets, populate_tweets
+
+    config = SearchTweetsApiConfig()
+    if not config.bulk_ingest:
+        return populate_tweets
+    return functools.partial(bulk_populate_tweets, chunk_size=config.ingest_chunk_size)
+
+
+def build_task_queue():
+    from twitter_scraper.infrastructure.task_queues import (
+        DatabaseTaskQueue,
+        TaskQueueType,
+        ThreadPoolTaskQueue,
+    )
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+
+    config = SearchTweetsApiConfig()
+    if config.ingest_mode == TaskQueueType.thread:
+        return ThreadPoolTaskQueue(max_workers=config.ingest_workers)
+    if config.ingest_mode == TaskQueueType.database:
+        return DatabaseTaskQueue(model="scraper.IngestTask")
+    return None
+
+
+def build_freshness_policy():
+    from twitter_scraper.infrastructure.freshness import FreshnessPolicy
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+
+    config = SearchTweetsApiConfig()
+    if not config.fresh_timeout and not config.stale_timeout:
+        return None
+    return FreshnessPolicy(fresh_for=config.fresh_timeout, stale_for=max(config.stale_timeout, config.fresh_timeout))
+
+
+def build_revalidation_queue(task_queue=None):
+    from twitter_scraper.infrastructure.task_queues import ThreadPoolTaskQueue
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+
+    config = SearchTweetsApiConfig()
+    if task_queue is not None or config.stale_timeout <= config.fresh_timeout:
+        return task_queue
+    return ThreadPoolTaskQueue(max_workers=config.ingest_workers)
+
+
+def build_primary_pins():
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from twitter_scraper.infrastructure.db_routers import PrimaryPins
+
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return PrimaryPins(cache=cache, window=settings.DATABASE_READ_YOUR_WRITES_WINDOW)
+
+
+def build_page_cache():
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from twitter_scraper.infrastructure.response_cache import ResponseCache
+
+    if not settings.TWEET_PAGE_CACHE_TIMEOUT:
+        return None
+    return ResponseCache(cache=cache, timeout=settings.TWEET_PAGE_CACHE_TIMEOUT, key_prefix="tweet-page")
+
+
+def build_tweet_listing(
+    fetch_data_use_case,
+    query_func,
+    single_flight=None,
+    task_queue=None,
+    name=None,
+    revalidation_queue=None,
+    primary_pins=None,
+):
+    from twitter_scraper.scraper.configs import SearchTweetsApiConfig
+    from twitter_scraper.scraper.use_cases import ListingTweets
+
+    config = SearchTweetsApiConfig()
     return ListingTweets(
-        fetch_data_use_case=fetch_data_use_case, populate_use_case=populate_tweets, query_func=query_func
+        fetch_data_use_case=fetch_data_use_case,
+        populate_use_case=build_tweet_populator(),
+        query_func=query_func,
+        single_flight=single_flight,
+        task_queue=task_queue,
+        name=name,
+        wait=config.ingest_wait_ms / 1000,
+        freshness=build_freshness_policy(),
+        revalidation_queue=revalidation_queue,
+        primary_pins=primary_pins,
     )
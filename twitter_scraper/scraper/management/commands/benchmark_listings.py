@@ -0,0 +1,103 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from twitter_scraper.infrastructure.utils import chunked
+from twitter_scraper.scraper.models import (
+    Tweet,
+    TweetAccount,
+    TweetHashtag,
+    TweetHashtagIndex,
+)
+from twitter_scraper.scraper.queries import filter_by_hashtag, filter_by_username
+
+INDEX_SCAN_MARKERS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan", "USING INDEX", "USING COVERING INDEX")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic tweets in a transaction rolled back at the end and reports the plans and timings of the "
+        "listing queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000, help="number of tweets to seed")
+        parser.add_argument("--accounts", type=int, default=1000)
+        parser.add_argument("--hashtags", type=int, default=500)
+        parser.add_argument("--limit", type=int, default=30)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--keep", action="store_true", help="commit the seeded rows")
+
+    def handle(self, *args, rows, accounts, hashtags, limit, repeat, chunk_size, keep, **options):
+        with transaction.atomic():
+            self._seed(rows=rows, accounts=accounts, hashtags=hashtags, chunk_size=chunk_size)
+            self._benchmark(
+                "username", lambda: filter_by_username(username="user0")[:limit], repeat=repeat, limit=limit
+            )
+            self._benchmark("hashtag", lambda: filter_by_hashtag(hashtag="TAG0")[:limit], repeat=repeat, limit=limit)
+            if not keep:
+                transaction.set_rollback(True)
+
+    def _seed(self, rows, accounts, hashtags, chunk_size):
+        started = time.perf_counter()
+        # snowflake sized ids to exercise the 64 bit columns
+        base_id = 1403128238184955906
+        account_objs = TweetAccount.objects.bulk_create(
+            TweetAccount(fullname=f"User {i}", username=f"user{i}", twitter_id=base_id + i) for i in range(accounts)
+        )
+        hashtag_objs = TweetHashtag.objects.bulk_create(
+            TweetHashtag(name=f"tag{i}", key=f"tag{i}") for i in range(hashtags)
+        )
+        account_ids = list(TweetAccount.objects.filter(twitter_id__gte=base_id).values_list("id", flat=True))
+        hashtag_keys = dict(TweetHashtag.objects.filter(name__startswith="tag").values_list("id", "key"))
+        hashtag_ids = list(hashtag_keys)
+        created_at = datetime.datetime(2021, 6, 10, tzinfo=datetime.timezone.utc)
+        through_model = Tweet.hashtags.through
+
+        for chunk in chunked(range(rows), chunk_size):
+            tweets = [
+                Tweet(
+                    tweet_id=base_id + i,
+                    account_id=account_ids[i % len(account_objs)],
+                    created_at=created_at,
+                    like_count=0,
+                    reply_count=0,
+                    retweet_count=0,
+                    text=f"benchmark tweet {i}",
+                )
+                for i in chunk
+            ]
+            Tweet.objects.bulk_create(tweets)
+            pks = Tweet.objects.filter(tweet_id__gte=base_id + chunk[0], tweet_id__lte=base_id + chunk[-1])
+            tweet_hashtags = [
+                (pk, tweet_id, hashtag_id)
+                for pk, tweet_id in pks.values_list("id", "tweet_id")
+                for hashtag_id in random.sample(hashtag_ids, k=min(2, len(hashtag_objs)))
+            ]
+            through_model.objects.bulk_create(
+                through_model(tweet_id=pk, tweethashtag_id=hashtag_id) for pk, _, hashtag_id in tweet_hashtags
+            )
+            TweetHashtagIndex.objects.bulk_create(
+                TweetHashtagIndex(key=hashtag_keys[hashtag_id], tweet_id=tweet_id)
+                for _, tweet_id, hashtag_id in tweet_hashtags
+            )
+        self.stdout.write(f"Seeded {rows} tweets in {time.perf_counter() - started:.1f}s.")
+        # refresh the planner statistics, both PostgreSQL and SQLite support it
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _benchmark(self, name, make_queryset, repeat, limit):
+        plan = make_queryset().explain()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(make_queryset())
+            timings.append(time.perf_counter() - started)
+        uses_index = any(marker in plan for marker in INDEX_SCAN_MARKERS)
+        self.stdout.write(f"\n{name} listing (limit {limit}): best {min(timings) * 1000:.2f}ms of {repeat} runs")
+        self.stdout.write(f"index scan: {'yes' if uses_index else 'NO'}")
+        self.stdout.write(plan)
@@ -0,0 +1,42 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from twitter_scraper.scraper.use_cases import prune_tweets
+
+
+class Command(BaseCommand):
+    help = "Drops the tweets older than the retention period one day (partition) at a time, oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=settings.TWEET_RETENTION_DAYS)
+        parser.add_argument("--period-days", type=int, default=1, help="days of tweets in a partition")
+        parser.add_argument(
+            "--archive-dir", default=settings.TWEET_ARCHIVE_DIR or None, help="archive the partitions here first"
+        )
+        parser.add_argument("--max-partitions", type=int, default=None, help="stop after this many partitions")
+        parser.add_argument("--dry-run", action="store_true", help="only report the partitions to drop")
+
+    def handle(self, *args, retention_days, period_days, archive_dir, max_partitions, dry_run, **options):
+        if retention_days <= 0:
+            raise CommandError("Set a positive --retention-days (or TWEET_RETENTION_DAYS) to prune the tweets.")
+        if period_days <= 0:
+            raise CommandError("--period-days must be positive.")
+
+        before = timezone.now() - datetime.timedelta(days=retention_days)
+        partitions = prune_tweets(
+            before=before,
+            period_days=period_days,
+            archive_dir=archive_dir,
+            max_partitions=max_partitions,
+            dry_run=dry_run,
+        )
+        total = 0
+        for start, end, count in partitions:
+            total += count
+            self.stdout.write(
+                f"{'Would drop' if dry_run else 'Dropped'} {count} tweets of [{start:%Y-%m-%d}, {end:%Y-%m-%d})."
+            )
+        self.stdout.write(f"{'Would drop' if dry_run else 'Dropped'} {total} tweets created before {before:%Y-%m-%d}.")
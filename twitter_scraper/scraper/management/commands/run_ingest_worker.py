@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from twitter_scraper.infrastructure.task_queues import DatabaseTaskQueue
+
+
+class Command(BaseCommand):
+    help = "Runs the listing refreshes queued when SEARCH_TWEETS_API_INGEST_MODE is database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+
+    def handle(self, *args, poll_interval, once, **options):
+        from twitter_scraper.scraper.apps import use_cases
+
+        task_queue = use_cases.task_queue
+        if not isinstance(task_queue, DatabaseTaskQueue):
+            raise CommandError("Set SEARCH_TWEETS_API_INGEST_MODE=database to queue the refreshes in the database.")
+
+        total = 0
+        while True:
+            total += task_queue.run_pending()
+            if once:
+                break
+            time.sleep(poll_interval)
+        self.stdout.write(f"Ran {total} tasks.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from twitter_scraper.scraper.factories import (
+    build_tweet_api_resource,
+    build_tweet_populator,
+)
+from twitter_scraper.scraper.services import identity_cache_stats
+from twitter_scraper.scraper.use_cases import fetch_tweets_many
+
+
+class Command(BaseCommand):
+    help = "Fetches tweets of many hashtags/usernames at once and stores them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hashtag", action="append", default=[], dest="hashtags")
+        parser.add_argument("--username", action="append", default=[], dest="usernames")
+        parser.add_argument("--limit", type=int, default=30)
+
+    def handle(self, *args, hashtags, usernames, limit, **options):
+        queries = [{"hashtag": hashtag} for hashtag in hashtags]
+        queries += [{"username": username} for username in usernames]
+        if not queries:
+            self.stderr.write("Nothing to scrape. Pass at least one --hashtag or --username.")
+            return
+
+        resource = build_tweet_api_resource()
+        populate_tweets = build_tweet_populator()
+        populate_tweets(fetch_tweets_many(resource=resource, queries=queries, limit=limit))
+        self.stdout.write(f"Scraped {len(queries)} queries.")
+        for name, stats in identity_cache_stats().items():
+            self.stdout.write(f"{name} identity cache hit ratio: {stats['hit_ratio']:.2%} ({stats['hits']} hits)")
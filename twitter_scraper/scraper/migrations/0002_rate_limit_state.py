@@ -0,0 +1,23 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitState",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=255, unique=True)),
+                ("limit", models.IntegerField(null=True)),
+                ("remaining", models.IntegerField()),
+                ("reset", models.FloatField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0002_rate_limit_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TweetQueryCoverage",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("query", models.CharField(db_index=True, max_length=255)),
+                ("min_tweet_id", models.PositiveBigIntegerField()),
+                ("max_tweet_id", models.PositiveBigIntegerField()),
+                ("tweet_count", models.PositiveIntegerField()),
+            ],
+            options={
+                "ordering": ("query", "-max_tweet_id"),
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0003_tweet_query_coverage"),
+    ]
+
+    operations = [
+        # created before the index of account_id is dropped, it covers the same lookups
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(fields=["account", "-tweet_id"], name="tweet_account_tweet_id_idx"),
+        ),
+        migrations.AlterField(
+            model_name="tweet",
+            name="account",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tweets",
+                to="scraper.tweetaccount",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tweet",
+            name="tweet_id",
+            field=models.PositiveBigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name="tweetaccount",
+            name="twitter_id",
+            field=models.PositiveBigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name="tweetaccount",
+            name="username",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        # hashtags__name__iexact compiles to UPPER("name") = UPPER(%s) on PostgreSQL
+        migrations.RunSQL(
+            sql='CREATE INDEX "tweethashtag_upper_name_idx" ON "scraper_tweethashtag" (UPPER("name"));',
+            reverse_sql='DROP INDEX IF EXISTS "tweethashtag_upper_name_idx";',
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.1.1 on 2026-10-18 22:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def fill_hashtag_keys(apps, schema_editor):
+    TweetHashtag = apps.get_model("scraper", "TweetHashtag")
+    hashtags = list(TweetHashtag.objects.only("id", "name"))
+    for hashtag in hashtags:
+        hashtag.key = hashtag.name.lower()
+    TweetHashtag.objects.bulk_update(hashtags, ["key"], batch_size=BATCH_SIZE)
+
+
+def fill_hashtag_index(apps, schema_editor):
+    Tweet = apps.get_model("scraper", "Tweet")
+    TweetHashtagIndex = apps.get_model("scraper", "TweetHashtagIndex")
+    pairs = Tweet.hashtags.through.objects.values_list("tweethashtag__key", "tweet__tweet_id").iterator(
+        chunk_size=BATCH_SIZE
+    )
+    batch = []
+    for key, tweet_id in pairs:
+        batch.append(TweetHashtagIndex(key=key, tweet_id=tweet_id))
+        if len(batch) >= BATCH_SIZE:
+            TweetHashtagIndex.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TweetHashtagIndex.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0004_bigint_ids_and_indexes"),
+    ]
+
+    operations = [
+        # hashtag listings no longer compare UPPER("name"); first, so the index is recreated last when reversed,
+        # after SQLite rebuilt the table for the fields below
+        migrations.RunSQL(
+            sql='DROP INDEX IF EXISTS "tweethashtag_upper_name_idx";',
+            reverse_sql='CREATE INDEX "tweethashtag_upper_name_idx" ON "scraper_tweethashtag" (UPPER("name"));',
+        ),
+        migrations.AddField(
+            model_name="tweethashtag",
+            name="key",
+            field=models.CharField(default="", max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_hashtag_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="tweethashtag",
+            name="key",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name="TweetHashtagIndex",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=255)),
+                (
+                    "tweet",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hashtag_keys",
+                        to="scraper.tweet",
+                        to_field="tweet_id",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="tweethashtagindex",
+            constraint=models.UniqueConstraint(fields=("key", "tweet"), name="tweethashtagindex_key_tweet_uniq"),
+        ),
+        migrations.RunPython(fill_hashtag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0005_hashtag_keys"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestTask",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255)),
+                ("key", models.CharField(max_length=32, unique=True)),
+                ("params", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ("created_at",),
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0006_ingest_task"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TweetQueryState",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("query", models.CharField(max_length=255, unique=True)),
+                ("refreshed_at", models.DateTimeField()),
+                ("depth", models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.1 on 2026-10-18 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scraper", "0007_tweet_query_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tweetquerystate",
+            name="changed_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="tweetquerystate",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="tweetquerystate",
+            name="depth",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="tweetquerystate",
+            name="refreshed_at",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -3,8 +3,8 @@ from django.db import models
 
 class TweetAccount(models.Model):
     fullname = models.CharField(max_length=255)
-    username = models.CharField(max_length=255)
-    twitter_id = models.PositiveIntegerField(unique=True)
+    username = models.CharField(max_length=255, db_index=True)
+    twitter_id = models.PositiveBigIntegerField(unique=True)
 
     def __str__(self):
         return f"Twitter Id: {self.twitter_id} Username: {self.username}"
@@ -12,14 +12,21 @@ class TweetAccount(models.Model):
 
 class TweetHashtag(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # normalized name, hashtags differing only in case share the key
+    key = models.CharField(max_length=255, db_index=True)
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def to_key(name):
+        return name.lower()
+
 
 class Tweet(models.Model):
-    tweet_id = models.PositiveIntegerField(unique=True)
-    account = models.ForeignKey(TweetAccount, related_name="tweets", on_delete=models.CASCADE)
+    tweet_id = models.PositiveBigIntegerField(unique=True)
+    # indexed by tweet_account_tweet_id_idx
+    account = models.ForeignKey(TweetAccount, related_name="tweets", on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField()
     hashtags = models.ManyToManyField(TweetHashtag, related_name="tweets", blank=True)
     like_count = models.PositiveIntegerField()
@@ -29,6 +36,80 @@ class Tweet(models.Model):
 
     class Meta:
         ordering = ("-tweet_id",)
+        indexes = [models.Index(fields=["account", "-tweet_id"], name="tweet_account_tweet_id_idx")]
 
     def __str__(self):
         return f"Tweet Id: {self.tweet_id} Text: {self.text[:25]}"
+
+
+class TweetHashtagIndex(models.Model):
+    """(hashtag key, tweet id) pairs written at ingest time, a hashtag listing
+    is a range scan of their unique index in tweet id order."""
+
+    key = models.CharField(max_length=255)
+    tweet = models.ForeignKey(
+        Tweet, to_field="tweet_id", related_name="hashtag_keys", on_delete=models.CASCADE, db_index=False
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["key", "tweet"], name="tweethashtagindex_key_tweet_uniq")]
+
+    def __str__(self):
+        return f"{self.key}: {self.tweet_id}"
+
+
+class TweetQueryCoverage(models.Model):
+    """Tweet id interval [min_tweet_id, max_tweet_id] of a query already fetched
+    without holes; min_tweet_id 0 means it reaches the oldest searchable tweet."""
+
+    query = models.CharField(max_length=255, db_index=True)
+    min_tweet_id = models.PositiveBigIntegerField()
+    max_tweet_id = models.PositiveBigIntegerField()
+    tweet_count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ("query", "-max_tweet_id")
+
+    def __str__(self):
+        return f"{self.query}: [{self.min_tweet_id}, {self.max_tweet_id}]"
+
+
+class RateLimitState(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    limit = models.IntegerField(null=True)
+    remaining = models.IntegerField()
+    reset = models.FloatField()
+
+    def __str__(self):
+        return f"Rate limit of {self.key}: {self.remaining}/{self.limit}"
+
+
+class IngestTask(models.Model):
+    """Refresh of a listing queued for the `run_ingest_worker` command."""
+
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=32, unique=True)
+    params = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("created_at",)
+
+    def __str__(self):
+        return f"{self.name}: {self.params}"
+
+
+class TweetQueryState(models.Model):
+    """When the tweets of a query were last refreshed and how deep (offset + limit),
+    and the version of its stored tweets, bumped by the ingests changing them."""
+
+    query = models.CharField(max_length=255, unique=True)
+    refreshed_at = models.DateTimeField(null=True)
+    depth = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.query}: {self.refreshed_at}"
@@ -1,6 +1,134 @@
+import base64
+import hashlib
+from collections import OrderedDict
+from urllib import parse
+
 from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class TweetListPaginator(LimitOffsetPagination):
+    """
+    Keyset pagination on the -tweet_id order of the listings. The cursors
+    are opaque max_id (next page) or since_id (previous page) bounds, so
+    every page is a range scan of the same cost however deep it is. The
+    view lists the page of `get_page_params` and counts with `get_count`.
+    """
+
     default_limit = settings.TWEET_LISTING_DEFAULT_LIMIT
+    cursor_query_param = "cursor"
+    cursor_keys = ("max_id", "since_id")
+    invalid_cursor_message = "Invalid cursor"
+    # exact, cached (for count_timeout seconds) or none
+    count_mode = settings.TWEET_LISTING_COUNT
+    count_timeout = settings.TWEET_LISTING_COUNT_TIMEOUT
+
+    @staticmethod
+    def _tweet_id(tweet):
+        # model instances or values() rows
+        return tweet["tweet_id"] if isinstance(tweet, dict) else tweet.tweet_id
+
+    def encode_cursor(self, **bounds):
+        return base64.urlsafe_b64encode(parse.urlencode(bounds).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return {}
+        try:
+            bounds = dict(parse.parse_qsl(base64.urlsafe_b64decode(encoded.encode()).decode(), strict_parsing=True))
+            key, value = bounds.popitem()
+            if bounds or key not in self.cursor_keys:
+                raise ValueError(encoded)
+            return {key: int(value)}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_params(self, request):
+        """
+        :return: limit and the max_id/since_id bound of the requested page
+        """
+        return {"limit": self.get_limit(request), **self.decode_cursor(request)}
+
+    def get_count(self, request, view):
+        if self.count_mode == "none":
+            return None
+        if self.count_mode == "cached":
+            key = f"tweet-count:{hashlib.md5(request.path.encode()).hexdigest()}"
+            return cache.get_or_set(key, view.get_count, timeout=self.count_timeout)
+        return view.get_count()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.bounds = self.decode_cursor(request)
+
+        if "since_id" in self.bounds:
+            # the tweets right above since_id, in the listing order
+            tweets = list(queryset.reverse()[: self.limit + 1])
+            self.has_previous = len(tweets) > self.limit
+            self.has_next = True
+            self.page = tweets[: self.limit][::-1]
+        else:
+            tweets = list(queryset[: self.limit + 1])
+            self.has_previous = "max_id" in self.bounds
+            self.has_next = len(tweets) > self.limit
+            self.page = tweets[: self.limit]
+        self.count = self.get_count(request, view)
+        return self.page
+
+    def _get_link(self, **bounds):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(**bounds))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return self._get_link(max_id=self.bounds["since_id"])
+        return self._get_link(max_id=self._tweet_id(self.page[-1]) - 1)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self._get_link(since_id=self.bounds["max_id"])
+        return self._get_link(since_id=self._tweet_id(self.page[0]))
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"]["nullable"] = True
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            *[
+                parameter
+                for parameter in super().get_schema_operation_parameters(view)
+                if parameter["name"] != self.offset_query_param
+            ],
+        ]
@@ -1,9 +1,88 @@
-from twitter_scraper.scraper.models import Tweet
+from django.db.models import Prefetch
 
+from twitter_scraper.scraper.models import Tweet, TweetHashtag
 
-def filter_by_hashtag(hashtag, **params):
-    return Tweet.objects.filter(hashtags__name__iexact=hashtag).prefetch_related("hashtags").distinct()
 
+def _tweet_id_range(field, max_id=None, since_id=None):
+    lookups = {}
+    if max_id is not None:
+        lookups[f"{field}__lte"] = max_id
+    if since_id is not None:
+        lookups[f"{field}__gt"] = since_id
+    return lookups
 
-def filter_by_username(username, **params):
-    return Tweet.objects.filter(account__username=username).select_related("account").distinct()
+
+def _prefetch_hashtags():
+    # the hashtags of a tweet in the order of their pks, like `get_hashtag_names`
+    return Prefetch("hashtags", queryset=TweetHashtag.objects.order_by("pk"))
+
+
+def filter_by_hashtag(hashtag, max_id=None, since_id=None, using=None, **params):
+    # an index row is unique per (key, tweet), the join can't produce duplicates;
+    # the range goes into the same filter() call to be applied on the same join
+    return (
+        Tweet.objects.using(using)
+        .filter(
+            hashtag_keys__key=TweetHashtag.to_key(hashtag),
+            **_tweet_id_range("hashtag_keys__tweet_id", max_id=max_id, since_id=since_id),
+        )
+        .order_by("-hashtag_keys__tweet_id")
+        .prefetch_related(_prefetch_hashtags())
+    )
+
+
+def filter_by_username(username, max_id=None, since_id=None, using=None, **params):
+    # a tweet has a single account, the join can't produce duplicates
+    return (
+        Tweet.objects.using(using)
+        .filter(account__username=username, **_tweet_id_range("tweet_id", max_id=max_id, since_id=since_id))
+        .select_related("account")
+        .prefetch_related(_prefetch_hashtags())
+    )
+
+
+# what TweetSerializer reads of a tweet and its account
+TWEET_ROW_FIELDS = (
+    "pk",
+    "tweet_id",
+    "account__fullname",
+    "account__username",
+    "account__twitter_id",
+    "created_at",
+    "like_count",
+    "reply_count",
+    "retweet_count",
+    "text",
+)
+
+
+def tweet_rows(queryset):
+    """
+    The listed tweets as values() rows of TWEET_ROW_FIELDS, their accounts are
+    joined and their hashtags are read by `get_hashtag_names`. The rows are
+    pinned to one database, `QuerySet.db` asks the router again on every access.
+    """
+    return queryset.using(queryset.db).prefetch_related(None).values(*TWEET_ROW_FIELDS)
+
+
+def get_hashtag_names(tweet_pks, using=None):
+    """
+    :return: names of the hashtags of each tweet pk, in the order of their pks
+    """
+    names = {}
+    if not tweet_pks:
+        return names
+    # the same join and order as the hashtags prefetch of the listings
+    rows = TweetHashtag.objects.using(using).filter(tweets__in=tweet_pks).order_by("pk").values_list("tweets", "name")
+    for tweet_pk, name in rows:
+        names.setdefault(tweet_pk, []).append(name)
+    return names
+
+
+def count_tweets(limit=None, **params):
+    """
+    Counts the listed tweets of a hashtag or a username, at most `limit` of them.
+    """
+    query_func = filter_by_hashtag if params.get("hashtag") is not None else filter_by_username
+    queryset = query_func(**params).prefetch_related(None).values("pk")
+    return queryset[:limit].count() if limit else queryset.count()
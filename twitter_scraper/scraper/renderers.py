@@ -0,0 +1,22 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON, a list is rendered as one line per item."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return b"".join(
+            json.dumps(item, cls=self.encoder_class, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+            for item in items
+        )
@@ -1,6 +1,8 @@
+from django.utils import timezone
 from rest_framework import serializers
 
 from twitter_scraper.scraper.models import Tweet, TweetAccount, TweetHashtag
+from twitter_scraper.scraper.queries import get_hashtag_names
 
 
 class TweetAccountSerializer(serializers.ModelSerializer):
@@ -36,3 +38,42 @@ class TweetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tweet
         fields = ("account", "date", "hashtags", "likes", "replies", "retweets", "text")
+
+
+class TweetRowSerializer:
+    """
+    Builds the representation of TweetSerializer from the values() rows of
+    `tweet_rows` and one query of their hashtags, without model instances
+    or serializer fields.
+    """
+
+    date_format = TweetSerializer._declared_fields["date"].format
+
+    def __init__(self, rows, using=None):
+        """
+        :param rows: values() rows of TWEET_ROW_FIELDS
+        :param using: database the rows were read from, their hashtags are read from it too
+        """
+        self.rows = rows
+        self.using = using
+
+    def to_representation(self, row, hashtag_names):
+        return {
+            "account": {
+                "fullname": row["account__fullname"],
+                "href": f"/{row['account__username']}",
+                "id": row["account__twitter_id"],
+            },
+            # as DateTimeField, in the current timezone
+            "date": timezone.localtime(row["created_at"]).strftime(self.date_format),
+            "hashtags": [f"#{name}" for name in hashtag_names],
+            "likes": row["like_count"],
+            "replies": row["reply_count"],
+            "retweets": row["retweet_count"],
+            "text": row["text"],
+        }
+
+    @property
+    def data(self):
+        hashtag_names = get_hashtag_names([row["pk"] for row in self.rows], using=self.using)
+        return [self.to_representation(row, hashtag_names.get(row["pk"], ())) for row in self.rows]
@@ -1,23 +1,169 @@
+import collections
+import json
 import logging
+import threading
+import traceback
 
-from django.db import transaction
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F, Min
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
-from twitter_scraper.scraper.models import Tweet, TweetAccount, TweetHashtag
+from twitter_scraper.infrastructure.bloom import BloomFilter
+from twitter_scraper.infrastructure.lru import LRUCache
+from twitter_scraper.infrastructure.utils import chunked
+from twitter_scraper.scraper.models import (
+    Tweet,
+    TweetAccount,
+    TweetHashtag,
+    TweetHashtagIndex,
+    TweetQueryCoverage,
+    TweetQueryState,
+)
 
 logger = logging.getLogger(__name__)
 
+TWEET_METRIC_FIELDS = ("like_count", "reply_count", "retweet_count")
+
+# natural key -> primary key maps shared by the ingest services, filled only
+# by committed rows and cleared on delete or when a chunk fails on the database
+account_identities = LRUCache(maxsize=settings.TWEET_IDENTITY_CACHE_SIZE)  # twitter_id: (pk, fullname, username)
+hashtag_identities = LRUCache(maxsize=settings.TWEET_IDENTITY_CACHE_SIZE)  # name: pk
+
+
+# tweet ids stored by this process or found at warm up, a miss means the tweet is new
+stored_tweet_ids = BloomFilter(capacity=settings.TWEET_ID_FILTER_CAPACITY)
+_stored_tweet_ids_warmed = threading.Event()
+_stored_tweet_ids_lock = threading.Lock()
+
+
+@receiver(post_delete, sender=TweetAccount)
+def forget_deleted_account(sender, instance, **kwargs):
+    account_identities.delete(instance.twitter_id)
+
+
+@receiver(post_delete, sender=TweetHashtag)
+def forget_deleted_hashtag(sender, instance, **kwargs):
+    hashtag_identities.delete(instance.name)
+
+
+def remember_identities(accounts=(), hashtags=()):
+    """Caches given accounts and hashtags once the current transaction is committed."""
+
+    def _remember():
+        account_identities.set_many(
+            {account.twitter_id: (account.pk, account.fullname, account.username) for account in accounts}
+        )
+        hashtag_identities.set_many({hashtag.name: hashtag.pk for hashtag in hashtags})
+
+    transaction.on_commit(_remember)
+
+
+def forget_identities(validated_dicts):
+    account_identities.delete_many(
+        [validated_dict.get("account", {}).get("twitter_id") for validated_dict in validated_dicts]
+    )
+    hashtag_identities.delete_many(
+        [hashtag.get("name") for validated_dict in validated_dicts for hashtag in validated_dict.get("hashtags", [])]
+    )
+
+
+def identity_cache_stats():
+    return {"accounts": account_identities.stats(), "hashtags": hashtag_identities.stats()}
+
+
+def warm_stored_tweet_ids(chunk_size=10000):
+    if _stored_tweet_ids_warmed.is_set():
+        return
+    with _stored_tweet_ids_lock:
+        if _stored_tweet_ids_warmed.is_set():
+            return
+        tweet_ids = Tweet.objects.values_list("tweet_id", flat=True).order_by().iterator(chunk_size=chunk_size)
+        for chunk in chunked(tweet_ids, chunk_size):
+            stored_tweet_ids.add_many(chunk)
+        _stored_tweet_ids_warmed.set()
+        logger.info(f"Warmed the stored tweet id filter with {stored_tweet_ids.count} ids.")
+
+
+def start_warming_stored_tweet_ids():
+    """
+    Warms the stored tweet id filter in a thread when the server starts, the first ingest
+    warms it (or waits for this warm up) when it's disabled or failed.
+    :return: the warm up thread or None
+    """
+    if not settings.TWEET_ID_FILTER_WARM_UP:
+        return None
+
+    def _warm():
+        try:
+            warm_stored_tweet_ids()
+        except DatabaseError:
+            logger.exception("Failed to warm the stored tweet id filter.")
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=_warm, name="warm-stored-tweet-ids", daemon=True)
+    thread.start()
+    return thread
+
+
+def remember_stored_tweet_ids(tweet_ids):
+    transaction.on_commit(lambda: stored_tweet_ids.add_many(tweet_ids))
+
+
+def find_stored_tweets(tweet_ids):
+    """
+    Looks up only the tweet ids the filter has seen, with a single query.
+    :return: {tweet_id: [pk, *counters]} of the stored ones
+    """
+    warm_stored_tweet_ids()
+    candidates = [tweet_id for tweet_id in tweet_ids if tweet_id in stored_tweet_ids]
+    if not candidates:
+        return {}
+    return get_stored_tweet_metrics(candidates)
+
+
+def get_stored_tweet_metrics(tweet_ids):
+    """
+    :return: {tweet_id: [pk, *counters]} of the stored ones
+    """
+    return {
+        tweet_id: metrics
+        for tweet_id, *metrics in Tweet.objects.filter(tweet_id__in=tweet_ids).values_list(
+            "tweet_id", "id", *TWEET_METRIC_FIELDS
+        )
+    }
+
 
 def get_or_create_account(fullname, username, twitter_id):
+    cached = account_identities.get(twitter_id)
+    if cached is not None and cached[1:] == (fullname, username):
+        return TweetAccount.from_db(
+            router.db_for_write(TweetAccount),
+            ["id", "fullname", "username", "twitter_id"],
+            [cached[0], fullname, username, twitter_id],
+        )
+
     account_obj, _ = TweetAccount.objects.get_or_create(
         fullname=fullname,
         username=username,
         twitter_id=twitter_id,
     )
+    remember_identities(accounts=[account_obj])
     return account_obj
 
 
 def get_or_create_hashtag(name):
-    hashtag_obj, _ = TweetHashtag.objects.get_or_create(name=name)
+    pk = hashtag_identities.get(name)
+    if pk is not None:
+        return TweetHashtag.from_db(router.db_for_write(TweetHashtag), ["id", "name"], [pk, name])
+
+    hashtag_obj, _ = TweetHashtag.objects.get_or_create(name=name, defaults={"key": TweetHashtag.to_key(name)})
+    remember_identities(hashtags=[hashtag_obj])
     return hashtag_obj
 
 
@@ -33,17 +179,393 @@ def create_tweet(tweet_id, account_obj, created_at, like_count, reply_count, ret
     )
     tweet_obj.full_clean(validate_unique=True)
     tweet_obj.save()
+    remember_stored_tweet_ids([tweet_id])
     if hashtags:
         tweet_obj.hashtags.set(hashtags)
+        index_tweet_hashtags({tweet_id: [hashtag.name for hashtag in hashtags]})
     return tweet_obj
 
 
 @transaction.atomic()
 def create_tweet_from_dict(**validated_dict):
+    """
+    Stores a validated tweet, the counters of a tweet already stored are updated if they changed.
+    :return: created Tweet object, None if the tweet was stored already
+    """
+    stored = get_stored_tweet_metrics([validated_dict["tweet_id"]])
+    if stored:
+        update_tweet_metrics([validated_dict], stored)
+        return None
+
     account_dict = validated_dict.pop("account")
     account_obj = get_or_create_account(**account_dict)
 
     hashtags_list = validated_dict.pop("hashtags", [])
     hashtag_objs = [get_or_create_hashtag(name=hashtag["name"]) for hashtag in hashtags_list]
 
-    return create_tweet(account_obj=account_obj, hashtags=hashtag_objs, **validated_dict)
+    tweet_obj = create_tweet(account_obj=account_obj, hashtags=hashtag_objs, **validated_dict)
+    bump_query_versions(
+        [normalize_tweet_query(username=account_obj.username)]
+        + [normalize_tweet_query(hashtag=hashtag.name) for hashtag in hashtag_objs]
+    )
+    return tweet_obj
+
+
+def _clean_tweet_dicts(validated_dicts):
+    cleaned = {}
+    for validated_dict in validated_dicts:
+        validated_dict = dict(validated_dict)
+        account_dict = validated_dict.pop("account")
+        hashtag_names = [hashtag["name"] for hashtag in validated_dict.pop("hashtags", [])]
+        try:
+            TweetAccount(**account_dict).clean_fields()
+            Tweet(**validated_dict).clean_fields(exclude=["account"])
+        except DjangoValidationError:
+            logger.debug(traceback.format_exc())
+            continue
+        cleaned[validated_dict["tweet_id"]] = (validated_dict, account_dict, hashtag_names)
+    return list(cleaned.values())
+
+
+def bulk_get_or_create_accounts(account_dicts):
+    """
+    :return: {twitter_id: pk} of given accounts, names of the stored ones are updated if they changed
+    """
+    account_dicts = {account_dict["twitter_id"]: account_dict for account_dict in account_dicts}
+    account_pks = {
+        twitter_id: cached[0]
+        for twitter_id, cached in account_identities.get_many(account_dicts).items()
+        if cached[1:] == (account_dicts[twitter_id]["fullname"], account_dicts[twitter_id]["username"])
+    }
+    account_dicts = {
+        twitter_id: account_dict for twitter_id, account_dict in account_dicts.items() if twitter_id not in account_pks
+    }
+    if not account_dicts:
+        return account_pks
+
+    accounts = TweetAccount.objects.in_bulk(list(account_dicts), field_name="twitter_id")
+
+    changed = []
+    queries = set()
+    for twitter_id, account in accounts.items():
+        account_dict = account_dicts[twitter_id]
+        if (account.fullname, account.username) != (account_dict["fullname"], account_dict["username"]):
+            # the old username doesn't list the tweets of the account anymore
+            queries.add(normalize_tweet_query(username=account.username))
+            account.fullname, account.username = account_dict["fullname"], account_dict["username"]
+            changed.append(account)
+    if changed:
+        TweetAccount.objects.bulk_update(changed, ["fullname", "username"])
+        # the listings of the stored tweets of the accounts show their names
+        tweet_ids = Tweet.objects.filter(account__in=changed).values("tweet_id")
+        bump_query_versions(queries | get_tweet_queries(tweet_id__in=tweet_ids))
+
+    missing = [account_dict for twitter_id, account_dict in account_dicts.items() if twitter_id not in accounts]
+    if missing:
+        TweetAccount.objects.bulk_create(
+            [TweetAccount(**account_dict) for account_dict in missing], ignore_conflicts=True
+        )
+        accounts.update(
+            TweetAccount.objects.in_bulk(
+                [account_dict["twitter_id"] for account_dict in missing], field_name="twitter_id"
+            )
+        )
+    remember_identities(accounts=list(accounts.values()))
+    account_pks.update({twitter_id: account.pk for twitter_id, account in accounts.items()})
+    return account_pks
+
+
+def bulk_get_or_create_hashtags(names):
+    """
+    :return: {name: pk} of given hashtags
+    """
+    names = set(names)
+    hashtag_pks = hashtag_identities.get_many(names)
+    names -= set(hashtag_pks)
+    if not names:
+        return hashtag_pks
+
+    hashtags = TweetHashtag.objects.in_bulk(list(names), field_name="name")
+    missing = names - set(hashtags)
+    if missing:
+        TweetHashtag.objects.bulk_create(
+            [TweetHashtag(name=name, key=TweetHashtag.to_key(name)) for name in missing], ignore_conflicts=True
+        )
+        hashtags.update(TweetHashtag.objects.in_bulk(list(missing), field_name="name"))
+    remember_identities(hashtags=list(hashtags.values()))
+    hashtag_pks.update({name: hashtag.pk for name, hashtag in hashtags.items()})
+    return hashtag_pks
+
+
+def index_tweet_hashtags(hashtag_names):
+    """
+    Writes the (hashtag key, tweet id) pairs read by the hashtag listings.
+    :param hashtag_names: {tweet_id: [hashtag name, ...]}
+    """
+    TweetHashtagIndex.objects.bulk_create(
+        [
+            TweetHashtagIndex(key=key, tweet_id=tweet_id)
+            for tweet_id, names in hashtag_names.items()
+            for key in {TweetHashtag.to_key(name) for name in names}
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def update_tweet_metrics(tweet_dicts, stored):
+    """
+    Updates the engagement counters of stored tweets with a batched UPDATE
+    of the rows whose counters changed, and the versions of their queries.
+    :param tweet_dicts: validated dicts of stored tweets
+    :param stored: {tweet_id: [pk, *counters]} of the stored tweets
+    :return: updated Tweet objects
+    """
+    changed = {}
+    for tweet_dict in tweet_dicts:
+        pk, *counters = stored[tweet_dict["tweet_id"]]
+        metrics = [tweet_dict[field] for field in TWEET_METRIC_FIELDS]
+        if metrics != counters:
+            changed[tweet_dict["tweet_id"]] = Tweet(pk=pk, **dict(zip(TWEET_METRIC_FIELDS, metrics)))
+    if changed:
+        Tweet.objects.bulk_update(list(changed.values()), TWEET_METRIC_FIELDS, batch_size=500)
+        bump_query_versions(get_tweet_queries(tweet_id__in=list(changed)))
+    return list(changed.values())
+
+
+@transaction.atomic()
+def bulk_create_tweets_from_dicts(validated_dicts):
+    """
+    Stores a chunk of validated tweets with a fixed number of queries. Rows
+    failing the field validation are skipped, counters of the tweets already
+    stored are updated if they changed. The versions of the queries listing
+    the stored or updated tweets are bumped.
+    :return: created Tweet objects
+    """
+    rows = _clean_tweet_dicts(validated_dicts)
+    if not rows:
+        return []
+
+    stored = get_stored_tweet_metrics([tweet_dict["tweet_id"] for tweet_dict, _, _ in rows])
+    update_tweet_metrics([tweet_dict for tweet_dict, _, _ in rows if tweet_dict["tweet_id"] in stored], stored)
+    rows = [row for row in rows if row[0]["tweet_id"] not in stored]
+    if not rows:
+        return []
+
+    account_pks = bulk_get_or_create_accounts([account_dict for _, account_dict, _ in rows])
+    hashtag_pks = bulk_get_or_create_hashtags([name for _, _, names in rows for name in names])
+
+    Tweet.objects.bulk_create(
+        [
+            Tweet(account_id=account_pks[account_dict["twitter_id"]], **tweet_dict)
+            for tweet_dict, account_dict, _ in rows
+        ],
+        ignore_conflicts=True,
+    )
+    tweets = Tweet.objects.in_bulk([tweet_dict["tweet_id"] for tweet_dict, _, _ in rows], field_name="tweet_id")
+    remember_stored_tweet_ids(list(tweets))
+
+    through_model = Tweet.hashtags.through
+    through_model.objects.bulk_create(
+        [
+            through_model(tweet_id=tweets[tweet_dict["tweet_id"]].pk, tweethashtag_id=hashtag_pks[name])
+            for tweet_dict, _, names in rows
+            if tweet_dict["tweet_id"] in tweets
+            for name in set(names)
+        ],
+        ignore_conflicts=True,
+    )
+    index_tweet_hashtags(
+        {tweet_dict["tweet_id"]: names for tweet_dict, _, names in rows if tweet_dict["tweet_id"] in tweets}
+    )
+    bump_query_versions(
+        {
+            query
+            for tweet_dict, account_dict, names in rows
+            if tweet_dict["tweet_id"] in tweets
+            for query in [
+                normalize_tweet_query(username=account_dict["username"]),
+                *[normalize_tweet_query(hashtag=name) for name in names],
+            ]
+        }
+    )
+    return list(tweets.values())
+
+
+def normalize_tweet_query(hashtag=None, username=None, **params):
+    if hashtag is not None:
+        return f"hashtag:{TweetHashtag.to_key(hashtag)}"
+    if username is not None:
+        return f"username:{username.lower()}"
+    raise ValueError("Query must have a hashtag or a username.")
+
+
+def get_query_coverage(query):
+    """
+    :return: [min_tweet_id, max_tweet_id, tweet_count] intervals of the query, newest first
+    """
+    return [
+        list(interval)
+        for interval in TweetQueryCoverage.objects.filter(query=query)
+        .order_by("-max_tweet_id")
+        .values_list("min_tweet_id", "max_tweet_id", "tweet_count")
+    ]
+
+
+@transaction.atomic()
+def set_query_coverage(query, intervals):
+    TweetQueryCoverage.objects.filter(query=query).delete()
+    TweetQueryCoverage.objects.bulk_create(
+        TweetQueryCoverage(query=query, min_tweet_id=min_id, max_tweet_id=max_id, tweet_count=count)
+        for min_id, max_id, count in intervals
+    )
+
+
+def get_query_age(query, depth=0):
+    """
+    :return: seconds since the tweets of the query were refreshed at least `depth` deep, None if never
+    """
+    refreshed_at = (
+        TweetQueryState.objects.filter(query=query, depth__gte=depth).values_list("refreshed_at", flat=True).first()
+    )
+    if refreshed_at is None:
+        return None
+    return (timezone.now() - refreshed_at).total_seconds()
+
+
+def set_query_refreshed(query, depth=0):
+    now = timezone.now()
+    state, created = TweetQueryState.objects.get_or_create(query=query, defaults={"refreshed_at": now, "depth": depth})
+    if not created:
+        # the older tweets of a deeper refresh are still stored
+        TweetQueryState.objects.filter(pk=state.pk).update(refreshed_at=now, depth=Greatest(F("depth"), depth))
+
+
+def get_query_version(query, using=None):
+    """
+    :param using: database of the listed tweets, a replica has the version of the tweets it has
+    :return: (version, changed_at) of the stored tweets of the query, (0, None) if never changed
+    """
+    return TweetQueryState.objects.using(using).filter(query=query).values_list("version", "changed_at").first() or (
+        0,
+        None,
+    )
+
+
+# a transaction for select_for_update, part of the one of the ingest when there is one
+@transaction.atomic(savepoint=False)
+def bump_query_versions(queries, chunk_size=500):
+    """
+    Bumps the version of the stored tweets of each query, the listings
+    validated and cached by it change with it.
+    """
+    now = timezone.now()
+    # sorted, concurrent ingests lock the shared rows in the same order
+    for chunk in chunked(sorted(set(queries)), chunk_size):
+        TweetQueryState.objects.bulk_create([TweetQueryState(query=query) for query in chunk], ignore_conflicts=True)
+        pks = list(
+            TweetQueryState.objects.select_for_update()
+            .filter(query__in=chunk)
+            .order_by("query")
+            .values_list("pk", flat=True)
+        )
+        TweetQueryState.objects.filter(pk__in=pks).update(version=F("version") + 1, changed_at=now)
+
+
+def get_tweet_queries(**tweet_id_lookups):
+    """
+    :param tweet_id_lookups: lookups of the tweet ids, i.e. tweet_id__in=[...]
+    :return: normalized queries listing any of the tweets
+    """
+    usernames = (
+        Tweet.objects.filter(**tweet_id_lookups).order_by().values_list("account__username", flat=True).distinct()
+    )
+    # the hashtag keys of a tweet are indexed by its id
+    keys = TweetHashtagIndex.objects.filter(**tweet_id_lookups).order_by().values_list("key", flat=True).distinct()
+    return {normalize_tweet_query(username=username) for username in usernames} | {
+        normalize_tweet_query(hashtag=key) for key in keys
+    }
+
+
+def get_oldest_tweet_id(after=0):
+    """
+    :return: the smallest stored tweet id not smaller than `after`, None if there isn't any
+    """
+    return Tweet.objects.filter(tweet_id__gte=after).aggregate(oldest=Min("tweet_id"))["oldest"]
+
+
+def count_tweets_in_range(start_id, end_id):
+    """
+    :return: number of stored tweets with start_id <= tweet_id < end_id
+    """
+    return Tweet.objects.filter(tweet_id__gte=start_id, tweet_id__lt=end_id).count()
+
+
+def archive_tweets(start_id, end_id, file, chunk_size=2000):
+    """
+    Writes the tweets with start_id <= tweet_id < end_id to the file as JSON
+    lines shaped like the validated tweets of the ingestion.
+    :return: ids of the archived tweets
+    """
+    tweets = (
+        Tweet.objects.filter(tweet_id__gte=start_id, tweet_id__lt=end_id)
+        .order_by("tweet_id")
+        .values("id", "tweet_id", "created_at", "like_count", "reply_count", "retweet_count", "text")
+        .annotate(
+            account_twitter_id=F("account__twitter_id"),
+            account_fullname=F("account__fullname"),
+            account_username=F("account__username"),
+        )
+    )
+    tweet_ids = []
+    for chunk in chunked(tweets.iterator(chunk_size=chunk_size), chunk_size):
+        hashtags = collections.defaultdict(list)
+        for tweet_pk, name in Tweet.hashtags.through.objects.filter(
+            tweet_id__in=[tweet["id"] for tweet in chunk]
+        ).values_list("tweet_id", "tweethashtag__name"):
+            hashtags[tweet_pk].append({"name": name})
+        for tweet in chunk:
+            tweet_dict = {
+                "tweet_id": tweet["tweet_id"],
+                "account": {
+                    "twitter_id": tweet["account_twitter_id"],
+                    "fullname": tweet["account_fullname"],
+                    "username": tweet["account_username"],
+                },
+                "created_at": tweet["created_at"].isoformat(),
+                "hashtags": hashtags[tweet["id"]],
+                "like_count": tweet["like_count"],
+                "reply_count": tweet["reply_count"],
+                "retweet_count": tweet["retweet_count"],
+                "text": tweet["text"],
+            }
+            file.write(json.dumps(tweet_dict) + "\n")
+        tweet_ids.extend(tweet["tweet_id"] for tweet in chunk)
+    return tweet_ids
+
+
+@transaction.atomic()
+def delete_tweets(**tweet_id_lookups):
+    """
+    Deletes the tweets with one DELETE per table instead of collecting the
+    cascades row by row. Accounts and hashtags are kept.
+    :param tweet_id_lookups: lookups of the tweet ids, i.e. tweet_id__in=[...]
+    :return: number of deleted tweets
+    """
+    using = router.db_for_write(Tweet)
+    tweets = Tweet.objects.filter(**tweet_id_lookups)
+    bump_query_versions(get_tweet_queries(**tweet_id_lookups))
+    # the dependent rows go first, nothing else references them
+    TweetHashtagIndex.objects.filter(**tweet_id_lookups)._raw_delete(using)
+    Tweet.hashtags.through.objects.filter(tweet__in=tweets)._raw_delete(using)
+    return tweets._raw_delete(using)
+
+
+@transaction.atomic()
+def archive_and_delete_tweets(start_id, end_id, file, chunk_size=2000):
+    """
+    Archives the tweets with start_id <= tweet_id < end_id to the file and
+    deletes the archived ones, the ones stored in the range meanwhile are kept.
+    :return: number of deleted tweets
+    """
+    tweet_ids = archive_tweets(start_id, end_id, file, chunk_size=chunk_size)
+    return sum(delete_tweets(tweet_id__in=chunk) for chunk in chunked(tweet_ids, chunk_size))
@@ -0,0 +1,15 @@
+import datetime
+
+
+def build_validated_tweet(tweet_id, twitter_id=1, hashtags=("python", "django"), like_count=1):
+    """Validated tweet dict as ingested by the use cases."""
+    return {
+        "tweet_id": tweet_id,
+        "account": {"twitter_id": twitter_id, "fullname": f"Account {twitter_id}", "username": f"user{twitter_id}"},
+        "created_at": datetime.datetime(2021, 6, 10, tzinfo=datetime.timezone.utc),
+        "hashtags": [{"name": name} for name in hashtags],
+        "like_count": like_count,
+        "reply_count": 0,
+        "retweet_count": 1,
+        "text": f"dummy {tweet_id}",
+    }
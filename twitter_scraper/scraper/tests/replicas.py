@@ -0,0 +1,31 @@
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+
+class MirrorReplicaTestCase(TransactionTestCase):
+    """Routes the reads of the replicated models to a replica mirroring the test database."""
+
+    # it reads what the primary commits, hence no TestCase transaction
+    replica = "replica_test"
+    databases = {"default", replica}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[cls.replica] = {**connections["default"].settings_dict, "TEST": {"MIRROR": "default"}}
+        connections[cls.replica].creation.set_as_test_mirror(connections["default"].settings_dict)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.replica].close()
+        del connections[cls.replica]
+        del connections.databases[cls.replica]
+
+    def setUp(self):
+        replica_settings = override_settings(
+            DATABASE_REPLICAS=[self.replica],
+            DATABASE_ROUTERS=["twitter_scraper.infrastructure.db_routers.ReplicaRouter"],
+        )
+        replica_settings.enable()
+        self.addCleanup(replica_settings.disable)
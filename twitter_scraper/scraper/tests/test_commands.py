@@ -0,0 +1,80 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from twitter_scraper.infrastructure.snowflakes import datetime_to_snowflake
+from twitter_scraper.infrastructure.task_queues import DatabaseTaskQueue
+from twitter_scraper.scraper.apps import use_cases
+from twitter_scraper.scraper.models import IngestTask, Tweet, TweetAccount
+
+
+class BenchmarkListingsCommandTestCase(TestCase):
+    def test_reports_plans_and_rolls_back(self):
+        stdout = io.StringIO()
+        call_command("benchmark_listings", rows=200, accounts=10, hashtags=5, repeat=1, stdout=stdout)
+
+        output = stdout.getvalue()
+        self.assertIn("Seeded 200 tweets", output)
+        self.assertIn("username listing (limit 30)", output)
+        self.assertIn("hashtag listing (limit 30)", output)
+        self.assertEqual(Tweet.objects.count(), 0)
+
+
+class RunIngestWorkerCommandTestCase(TestCase):
+    def test_runs_queued_tasks(self):
+        calls = []
+        task_queue = DatabaseTaskQueue(model="scraper.IngestTask")
+        task_queue.register("dummy", lambda **params: calls.append(params))
+        task_queue.submit("dummy", "key", hashtag="python")
+        stdout = io.StringIO()
+
+        with mock.patch.object(use_cases, "task_queue", task_queue):
+            call_command("run_ingest_worker", once=True, stdout=stdout)
+
+        self.assertEqual(calls, [{"hashtag": "python"}])
+        self.assertIn("Ran 1 tasks.", stdout.getvalue())
+        self.assertFalse(IngestTask.objects.exists())
+
+    def test_requires_the_database_ingest_mode(self):
+        with mock.patch.object(use_cases, "task_queue", None):
+            with self.assertRaises(CommandError):
+                call_command("run_ingest_worker", once=True)
+
+
+class PruneTweetsCommandTestCase(TestCase):
+    def setUp(self):
+        account = TweetAccount.objects.create(fullname="dummy", username="dummy", twitter_id=1)
+        for days in (40, 10):
+            created_at = timezone.now() - datetime.timedelta(days=days)
+            Tweet.objects.create(
+                tweet_id=datetime_to_snowflake(created_at),
+                account=account,
+                created_at=created_at,
+                like_count=0,
+                reply_count=0,
+                retweet_count=0,
+                text="dummy",
+            )
+
+    def test_drops_tweets_older_than_the_retention(self):
+        stdout = io.StringIO()
+        call_command("prune_tweets", retention_days=30, stdout=stdout)
+
+        self.assertIn("Dropped 1 tweets created before", stdout.getvalue())
+        self.assertEqual(Tweet.objects.count(), 1)
+
+    def test_dry_run(self):
+        stdout = io.StringIO()
+        call_command("prune_tweets", retention_days=30, dry_run=True, stdout=stdout)
+
+        self.assertIn("Would drop 1 tweets", stdout.getvalue())
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    @override_settings(TWEET_RETENTION_DAYS=0)
+    def test_requires_a_retention(self):
+        with self.assertRaises(CommandError):
+            call_command("prune_tweets")
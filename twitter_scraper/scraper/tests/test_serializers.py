@@ -0,0 +1,63 @@
+import datetime
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from twitter_scraper.scraper.models import TweetHashtag
+from twitter_scraper.scraper.queries import (
+    filter_by_hashtag,
+    filter_by_username,
+    tweet_rows,
+)
+from twitter_scraper.scraper.serializers import TweetRowSerializer, TweetSerializer
+from twitter_scraper.scraper.tests.factories import build_validated_tweet
+from twitter_scraper.scraper.use_cases import bulk_create_tweets
+
+
+class TweetRowSerializerTestCase(TestCase):
+    def setUp(self):
+        validated_objs = [
+            build_validated_tweet(i, twitter_id=i % 2, hashtags=hashtags, like_count=i * 1000)
+            for i, hashtags in [
+                (1, ("Python",)),
+                (2, ("python", "django", "Üniversite")),
+                (3, ()),
+                (4, ("django", "python")),
+            ]
+        ]
+        # around midnight in UTC, another day in the current timezone
+        validated_objs[0]["created_at"] = datetime.datetime(2021, 6, 10, 23, 30, tzinfo=datetime.timezone.utc)
+        validated_objs[1]["text"] = 'quotes " and\nnew lines 🐍'
+        list(bulk_create_tweets(validated_objs))
+
+    def _assert_same_json(self, queryset):
+        expected = JSONRenderer().render(TweetSerializer(list(queryset), many=True).data)
+        rows = list(tweet_rows(queryset))
+        with self.assertNumQueries(1):
+            data = TweetRowSerializer(rows).data
+        self.assertEqual(JSONRenderer().render(data), expected)
+
+    def test_same_json_as_tweet_serializer(self):
+        self._assert_same_json(filter_by_hashtag(hashtag="python"))
+        self._assert_same_json(filter_by_username(username="user0"))
+        self._assert_same_json(filter_by_username(username="user1", max_id=3))
+
+    def test_rows_are_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = list(tweet_rows(filter_by_hashtag(hashtag="python")))
+        self.assertEqual([row["tweet_id"] for row in rows], [4, 2, 1])
+
+    def test_hashtags_in_the_order_of_their_pks(self):
+        data = TweetRowSerializer(list(tweet_rows(filter_by_hashtag(hashtag="python")))).data
+        hashtag_pks = dict(TweetHashtag.objects.values_list("name", "pk"))
+        for tweet in data:
+            names = [name[1:] for name in tweet["hashtags"]]
+            self.assertEqual(names, sorted(names, key=hashtag_pks.get))
+
+    def test_rows_are_pinned_to_one_database(self):
+        rows = tweet_rows(filter_by_hashtag(hashtag="python"))
+        self.assertEqual(rows._db, "default")
+
+    def test_empty_page(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(TweetRowSerializer([]).data, [])
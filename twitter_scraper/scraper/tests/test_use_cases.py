@@ -1,15 +1,67 @@
 import collections
 import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
 from unittest import mock
 
 import vcr
-from django.test import TestCase, override_settings
-
-from twitter_scraper.scraper.models import Tweet
+from django.core.cache import caches
+from django.db import DatabaseError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from twitter_scraper.infrastructure.db_routers import PrimaryPins
+from twitter_scraper.infrastructure.freshness import Freshness, FreshnessPolicy
+from twitter_scraper.infrastructure.gateways.tests.stubs import StubSearchTweetsServer
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.resources import (
+    SearchTweetsResource,
+)
+from twitter_scraper.infrastructure.gateways.twitter_v1_1.responses import (
+    SearchTweetsResponse,
+)
+from twitter_scraper.infrastructure.single_flight import SingleFlight
+from twitter_scraper.infrastructure.snowflakes import datetime_to_snowflake
+from twitter_scraper.infrastructure.task_queues import ThreadPoolTaskQueue
+from twitter_scraper.scraper import services
+from twitter_scraper.scraper.datastructures import TweetData
+from twitter_scraper.scraper.factories import build_tweet_populator
+from twitter_scraper.scraper.models import (
+    Tweet,
+    TweetAccount,
+    TweetHashtag,
+    TweetHashtagIndex,
+    TweetQueryState,
+)
+from twitter_scraper.scraper.queries import (
+    count_tweets,
+    filter_by_hashtag,
+    filter_by_username,
+)
+from twitter_scraper.scraper.services import (
+    account_identities,
+    get_query_coverage,
+    hashtag_identities,
+    identity_cache_stats,
+    set_query_refreshed,
+)
+from twitter_scraper.scraper.tests.factories import build_validated_tweet
+from twitter_scraper.scraper.tests.replicas import MirrorReplicaTestCase
 from twitter_scraper.scraper.use_cases import (
+    FetchingTweetGaps,
+    ListingTweets,
+    bulk_create_tweets,
+    bulk_populate_tweets,
     create_tweets,
     fetch_tweets,
+    fetch_tweets_many,
     populate_tweets,
+    prefilter_stored_tweets,
+    prune_tweets,
     validate_tweets,
 )
 
@@ -77,6 +129,355 @@ class FetchTweetsTestCase(TestCase):
         self.assertListEqual(list(decorated_resource()), self.dummy_result)
 
 
+class FetchTweetsManyTestCase(TestCase):
+    def test_fetch_tweets_many_feeds_populate_tweets(self):
+        def raw_obj(tweet_id):
+            return {
+                "created_at": datetime.datetime(2021, 6, 10, tzinfo=datetime.timezone.utc),
+                "hashtags": [{"name": "dummy"}],
+                "like_count": 1,
+                "tweet_id": tweet_id,
+                "reply_count": 0,
+                "retweet_count": 1,
+                "text": "dummy",
+                "account": {"twitter_id": 15804774, "fullname": "Guido van Rossum", "username": "gvanrossum"},
+            }
+
+        class DummyResource:
+            def get_many(self, queries, limit=30):
+                return [[raw_obj(1)], [raw_obj(2)]]
+
+        queries = [{"hashtag": "dummy"}, {"username": "gvanrossum"}]
+        populate_tweets(fetch_tweets_many(resource=DummyResource(), queries=queries))
+        self.assertEqual(Tweet.objects.count(), 2)
+
+
+class ListingTweetsTestCase(TestCase):
+    def test_concurrent_identical_listings_share_one_fetch(self):
+        release = threading.Event()
+        fetches = []
+
+        def fetch(**params):
+            fetches.append(params)
+            release.wait(5)
+            return []
+
+        listing = ListingTweets(
+            fetch_data_use_case=fetch,
+            populate_use_case=lambda raw_objs: None,
+            query_func=lambda **params: params,
+            single_flight=SingleFlight(),
+        )
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(listing(hashtag="python", limit=30))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(fetches, [{"hashtag": "python", "limit": 30}])
+        self.assertEqual(results, [{"hashtag": "python", "limit": 30}] * 4)
+
+        listing(hashtag="django", limit=30)
+        self.assertEqual(len(fetches), 2)
+
+    def test_listings_of_one_query_share_one_fetch(self):
+        release = threading.Event()
+        fetches = []
+
+        def fetch(**params):
+            fetches.append(params)
+            release.wait(5)
+            return []
+
+        listing = ListingTweets(
+            fetch_data_use_case=fetch,
+            populate_use_case=lambda raw_objs: None,
+            query_func=lambda **params: params,
+            single_flight=SingleFlight(),
+        )
+        threads = [
+            threading.Thread(target=listing, kwargs={"hashtag": hashtag, "limit": 30})
+            for hashtag in ("python", "Python", "PYTHON")
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(ListingTweets._make_key(hashtag="Python", limit=30), "hashtag:python&limit=30")
+
+    def _queued_listing(self, wait):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        task_queue = ThreadPoolTaskQueue(max_workers=1)
+        self.addCleanup(task_queue.shutdown)
+        stored = []
+
+        def populate(raw_objs):
+            release.wait(5)
+            stored.extend(raw_objs)
+
+        listing = ListingTweets(
+            fetch_data_use_case=lambda **params: [params["hashtag"]],
+            populate_use_case=populate,
+            query_func=lambda **params: list(stored),
+            task_queue=task_queue,
+            name="list_tweets",
+            wait=wait,
+        )
+        return listing, release
+
+    def test_queued_listing_returns_stored_tweets_right_away(self):
+        listing, release = self._queued_listing(wait=0)
+
+        self.assertEqual(listing(hashtag="python"), [])
+        release.set()
+        listing.task_queue.shutdown(wait=True)
+        self.assertEqual(listing.query_tweets(hashtag="python"), ["python"])
+
+    def test_queued_listing_waits_for_fresh_tweets(self):
+        listing, release = self._queued_listing(wait=5)
+        threading.Timer(0.05, release.set).start()
+
+        self.assertEqual(listing(hashtag="python"), ["python"])
+
+
+class ListingFreshnessTestCase(TestCase):
+    def setUp(self):
+        self.fetches = []
+        self.revalidation_queue = mock.Mock()
+        self.listing = ListingTweets(
+            fetch_data_use_case=lambda **params: self.fetches.append(params) or [],
+            populate_use_case=lambda raw_objs: None,
+            query_func=lambda **params: "stored tweets",
+            name="list_tweets",
+            freshness=FreshnessPolicy(fresh_for=10, stale_for=300),
+            revalidation_queue=self.revalidation_queue,
+        )
+
+    def _age(self, seconds):
+        TweetQueryState.objects.update(refreshed_at=timezone.now() - datetime.timedelta(seconds=seconds))
+
+    def test_fresh_query_is_served_without_refresh(self):
+        self.assertEqual(self.listing(hashtag="Python", limit=30), "stored tweets")
+        self.assertEqual(self.listing(hashtag="python", limit=30), "stored tweets")
+
+        self.assertEqual(self.fetches, [{"hashtag": "Python", "limit": 30}])
+        self.assertEqual(self.listing.get_freshness(hashtag="python", limit=30), Freshness.fresh)
+        self.revalidation_queue.submit.assert_not_called()
+
+    def test_stale_query_is_served_while_refreshed_in_background(self):
+        self.listing(hashtag="python", limit=30)
+        self._age(60)
+
+        self.assertEqual(self.listing(hashtag="python", limit=30), "stored tweets")
+        self.assertEqual(len(self.fetches), 1)
+        self.revalidation_queue.submit.assert_called_once_with(
+            "list_tweets", "list_tweets?hashtag:python&limit=30", hashtag="python", limit=30
+        )
+
+    def test_expired_query_is_refreshed_before_served(self):
+        self.listing(hashtag="python", limit=30)
+        self._age(600)
+
+        self.listing(hashtag="python", limit=30)
+        self.assertEqual(len(self.fetches), 2)
+        self.assertEqual(self.listing.get_freshness(hashtag="python", limit=30), Freshness.fresh)
+
+    def test_deeper_pages_than_refreshed_are_expired(self):
+        self.listing(hashtag="python", limit=30, offset=30)
+
+        self.assertEqual(self.listing.get_freshness(hashtag="python", limit=30), Freshness.fresh)
+        self.assertEqual(self.listing.get_freshness(hashtag="python", limit=30, offset=60), Freshness.expired)
+        self.listing(hashtag="python", limit=30)
+        # a shallower refresh keeps the depth
+        self.assertEqual(TweetQueryState.objects.get().depth, 60)
+
+
+class ListingReadYourWritesTestCase(TestCase):
+    def setUp(self):
+        self.cache = caches["default"]
+        self.addCleanup(self.cache.clear)
+        self.listing = ListingTweets(
+            fetch_data_use_case=lambda **params: [],
+            populate_use_case=lambda raw_objs: None,
+            query_func=lambda **params: params,
+            primary_pins=PrimaryPins(cache=self.cache, window=5),
+        )
+
+    def test_refreshed_query_reads_from_primary(self):
+        self.assertEqual(
+            self.listing(hashtag="Python", limit=30), {"using": "default", "hashtag": "Python", "limit": 30}
+        )
+        self.assertEqual(self.listing.query_tweets(hashtag="python"), {"hashtag": "python"})
+
+    def test_other_queries_read_from_replicas(self):
+        self.listing.primary_pins.pin("hashtag:python")
+        self.assertEqual(self.listing.query_tweets(hashtag="django"), {"hashtag": "django"})
+        self.assertTrue(self.listing.primary_pins.is_pinned("hashtag:python"))
+        self.assertFalse(self.listing.primary_pins.is_pinned("hashtag:django"))
+
+    def test_queries_accept_the_database(self):
+        self.assertEqual(filter_by_hashtag(hashtag="python", using="default").db, "default")
+        self.assertEqual(filter_by_username(username="python", using="default").db, "default")
+
+
+class ListingReplicaReadsTestCase(MirrorReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = caches["default"]
+        self.addCleanup(self.cache.clear)
+        self.listing = ListingTweets(
+            fetch_data_use_case=lambda **params: [],
+            populate_use_case=lambda raw_objs: None,
+            query_func=filter_by_hashtag,
+            freshness=FreshnessPolicy(fresh_for=10, stale_for=300),
+            primary_pins=PrimaryPins(cache=self.cache, window=5),
+        )
+        list(bulk_create_tweets([build_validated_tweet(1)]))
+        # fresh, listed without a refresh pinning it
+        set_query_refreshed("hashtag:python", depth=30)
+
+    def _list(self, **params):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections[self.replica]) as replica:
+                tweet_ids = [tweet.tweet_id for tweet in self.listing(**params)]
+        return tweet_ids, len(primary), len(replica)
+
+    def test_unpinned_query_reads_from_replica(self):
+        tweet_ids, _, replica_queries = self._list(hashtag="python", limit=30)
+
+        self.assertEqual(tweet_ids, [1])
+        # the tweets and their hashtags
+        self.assertEqual(replica_queries, 2)
+
+    def test_pinned_query_reads_from_primary(self):
+        self.listing.primary_pins.pin("hashtag:python")
+        tweet_ids, primary_queries, replica_queries = self._list(hashtag="python", limit=30)
+
+        self.assertEqual(tweet_ids, [1])
+        self.assertEqual(replica_queries, 0)
+        self.assertGreaterEqual(primary_queries, 2)
+
+
+class FetchingTweetGapsTestCase(TestCase):
+    def setUp(self):
+        class DummyConfig:
+            base_url = "https://api.twitter.com/1.1"
+            max_limit = 100
+            consumer_key = "dummy"
+            consumer_secret = "dummy"
+            access_token = "dummy"
+            access_token_secret = "dummy"
+
+        self.dummy_config = DummyConfig()
+        # 100 tweets with ids 1000..901 served 5 per page
+        self.server = StubSearchTweetsServer(pages=20, page_size=5, top_id=1000)
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.dummy_config.base_url = self.server.base_url
+        resource = SearchTweetsResource(config=self.dummy_config, response_class=SearchTweetsResponse)
+        self.fetch = FetchingTweetGaps(resource=resource)
+
+    def _fetch_ids(self, **params):
+        self.server.requests.clear()
+        fetched = self.fetch(hashtag="Python", **params)
+        tweet_ids = [raw_obj["tweet_id"] for raw_obj in fetched]
+        fetched.save_coverage()
+        return tweet_ids
+
+    def test_fetches_only_new_tweets(self):
+        self.assertEqual(self._fetch_ids(limit=10), list(range(1000, 990, -1)))
+        self.assertEqual(get_query_coverage("hashtag:python"), [[991, 1000, 10]])
+
+        self.assertEqual(self._fetch_ids(limit=10), [])
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]["since_id"], "1000")
+
+        self.server.top_id, self.server.pages = 1008, 108 // 5 + 1
+        self.assertEqual(self._fetch_ids(limit=10), list(range(1008, 1000, -1)))
+        self.assertEqual(get_query_coverage("hashtag:python"), [[991, 1008, 18]])
+
+    def test_fetches_gaps_of_deeper_pages(self):
+        self._fetch_ids(limit=10)
+        self.assertEqual(self._fetch_ids(limit=10, offset=10), list(range(990, 980, -1)))
+        self.assertEqual(self.server.requests[-1]["max_id"], "985")
+        self.assertEqual(get_query_coverage("hashtag:python"), [[981, 1000, 20]])
+
+    def test_joins_gap_between_intervals(self):
+        self._fetch_ids(limit=10)
+        self.server.top_id, self.server.pages = 1020, 24
+        self.assertEqual(self._fetch_ids(limit=10), list(range(1020, 1010, -1)))
+        self.assertEqual(get_query_coverage("hashtag:python"), [[1011, 1020, 10], [991, 1000, 10]])
+
+        self.assertEqual(self._fetch_ids(limit=40), list(range(1010, 1000, -1)) + list(range(990, 980, -1)))
+        self.assertEqual(get_query_coverage("hashtag:python"), [[981, 1020, 40]])
+
+    def test_reaches_oldest_tweet(self):
+        self.assertEqual(len(self._fetch_ids(limit=150)), 100)
+        self.assertEqual(get_query_coverage("hashtag:python"), [[0, 1000, 100]])
+        self.assertEqual(self._fetch_ids(limit=150), [])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_failed_search_keeps_coverage(self):
+        self._fetch_ids(limit=10)
+        self.server.status = 429
+        self.assertEqual(self._fetch_ids(limit=10, offset=10), [])
+        self.assertEqual(get_query_coverage("hashtag:python"), [[991, 1000, 10]])
+
+    def test_coverage_is_saved_after_the_tweets_are_stored(self):
+        self.assertEqual(len(list(self.fetch(hashtag="Python", limit=10))), 10)
+        self.assertEqual(get_query_coverage("hashtag:python"), [])
+
+    def test_failed_populate_keeps_coverage(self):
+        def _failing_populate(raw_objs):
+            list(raw_objs)
+            raise DatabaseError("dummy")
+
+        listing = ListingTweets(
+            fetch_data_use_case=self.fetch, populate_use_case=_failing_populate, query_func=filter_by_hashtag
+        )
+        with self.assertRaises(DatabaseError):
+            listing(hashtag="Python", limit=10)
+        self.assertEqual(get_query_coverage("hashtag:python"), [])
+
+        listing.populate_tweets = bulk_populate_tweets
+        listing(hashtag="Python", limit=10)
+        self.assertEqual(get_query_coverage("hashtag:python"), [[991, 1000, 10]])
+
+    def test_fetches_page_below_the_cursor(self):
+        self._fetch_ids(limit=10)
+        self.assertEqual(self._fetch_ids(limit=10, max_id=990), list(range(990, 980, -1)))
+        self.assertEqual(self.server.requests[0]["max_id"], "990")
+        self.assertEqual(get_query_coverage("hashtag:python"), [[981, 1000, 20]])
+
+    def test_fetches_page_below_an_uncovered_cursor(self):
+        self._fetch_ids(limit=10)
+        self.assertEqual(self._fetch_ids(limit=10, max_id=950), list(range(950, 940, -1)))
+        self.assertEqual(get_query_coverage("hashtag:python"), [[991, 1000, 10], [941, 950, 10]])
+
+    def test_stored_tweets_below_the_cursor_are_not_fetched(self):
+        self._fetch_ids(limit=10)
+        self.fetch.count_stored = lambda limit, since_id, max_id, **params: min(limit, max_id - since_id)
+
+        self.assertEqual(self._fetch_ids(limit=5, max_id=998), [])
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(self._fetch_ids(limit=5, max_id=993), [990, 989])
+
+    def test_previous_pages_are_not_fetched(self):
+        self._fetch_ids(limit=10)
+        self.assertEqual(self._fetch_ids(limit=10, since_id=995), [])
+        self.assertEqual(self.server.requests, [])
+
+
 class ValidateTweetsTestCase(TestCase, DummyTestDataMixin):
     @mock.patch("twitter_scraper.scraper.use_cases.logger")
     def test_raw_objects_given_multiple_valid_objects(self, mock_logger):
@@ -136,9 +537,10 @@ class CreateTweetsTestCase(TestCase, DummyTestDataMixin):
     @mock.patch("twitter_scraper.scraper.use_cases.logger")
     def test_validated_objects_given_already_exists(self, mock_logger):
         dummy_objs = [self.dummy_valid_data_1, self.dummy_valid_data_1]
-        generator = create_tweets(validated_objs=dummy_objs)
-        collections.deque(generator, maxlen=0)
-        self.assertTrue(mock_logger.debug.called)
+        created = list(create_tweets(validated_objs=dummy_objs))
+        # the duplicate only updates the counters of the stored tweet
+        self.assertEqual(len(created), 1)
+        self.assertFalse(mock_logger.debug.called)
         self.assertFalse(mock_logger.exception.called)
 
         Tweet.objects.get(tweet_id=dummy_objs[0]["tweet_id"])
@@ -174,3 +576,430 @@ class PopulateTweetsTestCase(TestCase, DummyTestDataMixin):
         raw_objs = [self.dummy_valid_data_1, self.dummy_valid_data_1]
         populate_tweets(raw_objs=raw_objs)
         Tweet.objects.get(tweet_id=raw_objs[0]["tweet_id"])
+
+
+class BulkCreateTweetsTestCase(TestCase):
+    def test_creates_tweets_with_relations(self):
+        validated_objs = [build_validated_tweet(i, twitter_id=i % 3) for i in range(1, 11)]
+        created = list(bulk_create_tweets(validated_objs))
+
+        self.assertEqual(len(created), 10)
+        self.assertEqual(Tweet.objects.count(), 10)
+        self.assertEqual(TweetAccount.objects.count(), 3)
+        self.assertEqual(TweetHashtag.objects.count(), 2)
+        tweet = Tweet.objects.get(tweet_id=4)
+        self.assertEqual(tweet.account.twitter_id, 1)
+        self.assertEqual(sorted(tweet.hashtags.values_list("name", flat=True)), ["django", "python"])
+        # the given dicts are left intact
+        self.assertIn("account", validated_objs[0])
+
+    def test_stores_64_bit_ids(self):
+        snowflake_id = 1403128238184955906
+        list(bulk_create_tweets([build_validated_tweet(snowflake_id, twitter_id=snowflake_id + 1)]))
+        tweet = Tweet.objects.select_related("account").get()
+        self.assertEqual((tweet.tweet_id, tweet.account.twitter_id), (snowflake_id, snowflake_id + 1))
+
+    def test_query_count_does_not_depend_on_chunk_length(self):
+        # hashtags are stored by the first chunk
+        with self.assertNumQueries(16):
+            list(bulk_create_tweets([build_validated_tweet(0, twitter_id=0)]))
+        with self.assertNumQueries(14):
+            list(bulk_create_tweets([build_validated_tweet(i, twitter_id=i) for i in range(1, 6)]))
+        with self.assertNumQueries(14):
+            list(bulk_create_tweets([build_validated_tweet(i, twitter_id=i) for i in range(100, 150)]))
+
+    def test_updates_changed_metrics_of_stored_tweets(self):
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 4)]))
+        validated_objs = [build_validated_tweet(1, like_count=10), build_validated_tweet(2), build_validated_tweet(3)]
+        validated_objs[2]["retweet_count"] = 7
+
+        with CaptureQueriesContext(connection) as context:
+            created = list(bulk_create_tweets(validated_objs))
+
+        updates = [
+            query["sql"] for query in context.captured_queries if query["sql"].startswith('UPDATE "scraper_tweet" ')
+        ]
+        self.assertEqual(created, [])
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Tweet.objects.order_by("tweet_id").values_list("like_count", "retweet_count")),
+            [(10, 1), (1, 1), (1, 7)],
+        )
+
+    def test_updates_changed_metrics_under_both_ingest_settings(self):
+        for bulk_ingest in ("1", "0"):
+            with self.subTest(bulk_ingest=bulk_ingest):
+                with mock.patch.dict(os.environ, {"SEARCH_TWEETS_API_BULK_INGEST": bulk_ingest}):
+                    populate = build_tweet_populator()
+                tweet_id = int(bulk_ingest) + 1
+                populate([build_validated_tweet(tweet_id)])
+                self.assertEqual(self._versions()["username:user1"], 1)
+
+                populate([build_validated_tweet(tweet_id, like_count=10)])
+                self.assertEqual(Tweet.objects.get(tweet_id=tweet_id).like_count, 10)
+                self.assertEqual(Tweet.objects.filter(tweet_id=tweet_id).count(), 1)
+                self.assertEqual(self._versions()["username:user1"], 2)
+                TweetQueryState.objects.all().delete()
+
+    def _versions(self):
+        return dict(TweetQueryState.objects.values_list("query", "version"))
+
+    def test_bumps_versions_of_the_queries_of_written_tweets(self):
+        list(
+            bulk_create_tweets([build_validated_tweet(1), build_validated_tweet(2, twitter_id=2, hashtags=("Python",))])
+        )
+        self.assertEqual(
+            self._versions(), {"username:user1": 1, "username:user2": 1, "hashtag:python": 1, "hashtag:django": 1}
+        )
+
+        list(
+            bulk_create_tweets([build_validated_tweet(1), build_validated_tweet(2, twitter_id=2, hashtags=("Python",))])
+        )
+        self.assertEqual(self._versions()["hashtag:python"], 1)
+
+        list(bulk_create_tweets([build_validated_tweet(2, twitter_id=2, hashtags=("Python",), like_count=5)]))
+        self.assertEqual(
+            self._versions(), {"username:user1": 1, "username:user2": 2, "hashtag:python": 2, "hashtag:django": 1}
+        )
+
+        list(create_tweets([build_validated_tweet(3, hashtags=("django",))]))
+        self.assertEqual(
+            self._versions(), {"username:user1": 2, "username:user2": 2, "hashtag:python": 2, "hashtag:django": 2}
+        )
+
+        services.delete_tweets(tweet_id__gte=2, tweet_id__lt=3)
+        self.assertEqual(
+            self._versions(), {"username:user1": 2, "username:user2": 3, "hashtag:python": 3, "hashtag:django": 2}
+        )
+
+    def test_unchanged_stored_tweets_are_not_updated(self):
+        list(bulk_create_tweets([build_validated_tweet(1)]))
+        with self.assertNumQueries(3):
+            self.assertEqual(list(bulk_create_tweets([build_validated_tweet(1)])), [])
+
+    def test_skips_stored_and_invalid_tweets(self):
+        list(bulk_create_tweets([build_validated_tweet(1)]))
+        created = list(
+            bulk_create_tweets(
+                [build_validated_tweet(1), build_validated_tweet(2, like_count=-1), build_validated_tweet(3)]
+            )
+        )
+
+        self.assertEqual([tweet.tweet_id for tweet in created], [3])
+        self.assertEqual(sorted(Tweet.objects.values_list("tweet_id", flat=True)), [1, 3])
+
+    def test_updates_renamed_accounts(self):
+        list(bulk_create_tweets([build_validated_tweet(1)]))
+        renamed = build_validated_tweet(2)
+        renamed["account"]["username"] = "renamed"
+        list(bulk_create_tweets([renamed]))
+
+        self.assertEqual(TweetAccount.objects.get().username, "renamed")
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    @mock.patch("twitter_scraper.scraper.use_cases.bulk_create_tweets_from_dicts")
+    def test_falls_back_to_row_by_row(self, mock_bulk_create):
+        from django.db import IntegrityError
+
+        mock_bulk_create.side_effect = IntegrityError
+        created = list(bulk_create_tweets([build_validated_tweet(1), build_validated_tweet(2)], chunk_size=1))
+
+        self.assertEqual(mock_bulk_create.call_count, 2)
+        self.assertEqual([tweet.tweet_id for tweet in created], [1, 2])
+
+    def test_indexes_hashtag_keys(self):
+        list(bulk_create_tweets([build_validated_tweet(1, hashtags=("Python", "python", "Django"))]))
+
+        self.assertEqual(
+            sorted(TweetHashtag.objects.values_list("name", "key")),
+            [("Django", "django"), ("Python", "python"), ("python", "python")],
+        )
+        self.assertEqual(
+            sorted(TweetHashtagIndex.objects.values_list("key", "tweet_id")), [("django", 1), ("python", 1)]
+        )
+
+    def test_bulk_populate_tweets(self):
+        raw_objs = [build_validated_tweet(i) for i in range(1, 8)] + [{}]
+        bulk_populate_tweets(raw_objs=raw_objs, chunk_size=3)
+        self.assertEqual(Tweet.objects.count(), 7)
+
+
+class IdentityCacheTestCase(TransactionTestCase):
+    # reads outside transactions go to the replicas when DATABASE_REPLICA_URLS is set
+    databases = "__all__"
+
+    def setUp(self):
+        for identities in (account_identities, hashtag_identities):
+            identities.clear()
+            self.addCleanup(identities.clear)
+
+    def _ingest_queries(self, validated_objs):
+        with CaptureQueriesContext(connection) as context:
+            list(bulk_create_tweets(validated_objs))
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_known_identities_are_not_looked_up(self):
+        self._ingest_queries([build_validated_tweet(i, twitter_id=i % 2) for i in range(1, 5)])
+        queries = self._ingest_queries([build_validated_tweet(i, twitter_id=i % 2) for i in range(5, 9)])
+
+        self.assertFalse([sql for sql in queries if "scraper_tweetaccount" in sql or 'scraper_tweethashtag"' in sql])
+        self.assertEqual(Tweet.objects.count(), 8)
+        stats = identity_cache_stats()
+        self.assertEqual((stats["accounts"]["hits"], stats["accounts"]["misses"]), (2, 2))
+        self.assertEqual(stats["hashtags"]["hit_ratio"], 0.5)
+
+    def test_renamed_account_is_looked_up(self):
+        self._ingest_queries([build_validated_tweet(1)])
+        renamed = build_validated_tweet(2)
+        renamed["account"]["username"] = "renamed"
+        self._ingest_queries([renamed])
+
+        self.assertEqual(TweetAccount.objects.get().username, "renamed")
+        self.assertEqual(account_identities.get(1)[2], "renamed")
+
+    def test_deleted_rows_are_forgotten(self):
+        self._ingest_queries([build_validated_tweet(1)])
+        TweetAccount.objects.all().delete()
+        TweetHashtag.objects.filter(name="python").delete()
+
+        self.assertIsNone(account_identities.get(1))
+        self.assertIsNone(hashtag_identities.get("python"))
+        self.assertIsNotNone(hashtag_identities.get("django"))
+        self._ingest_queries([build_validated_tweet(2)])
+        self.assertEqual(Tweet.objects.get().hashtags.count(), 2)
+
+    @mock.patch("twitter_scraper.scraper.use_cases.create_tweets", return_value=iter(()))
+    def test_rolled_back_rows_are_not_remembered(self, mock_create_tweets):
+        with mock.patch("twitter_scraper.scraper.models.Tweet.hashtags.through.objects.bulk_create") as bulk_create:
+            bulk_create.side_effect = DatabaseError
+            self._ingest_queries([build_validated_tweet(1)])
+
+        self.assertEqual(TweetAccount.objects.count(), 0)
+        self.assertEqual(len(account_identities), 0)
+        self.assertEqual(len(hashtag_identities), 0)
+
+    def test_duplicate_tweet_keeps_identities(self):
+        populate_tweets([build_validated_tweet(1)])
+        populate_tweets([build_validated_tweet(1)])
+
+        self.assertEqual(Tweet.objects.count(), 1)
+        self.assertIsNotNone(account_identities.get(1))
+        self.assertIsNotNone(hashtag_identities.get("python"))
+
+    def test_stale_account_is_forgotten(self):
+        populate_tweets([build_validated_tweet(1)])
+        account_identities.set(1, (999, "Account 1", "user1"))
+        populate_tweets([build_validated_tweet(2)])
+        self.assertIsNone(account_identities.get(1))
+
+        populate_tweets([build_validated_tweet(2)])
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    def test_row_by_row_ingest_uses_cache(self):
+        populate_tweets([build_validated_tweet(1)])
+        populate_tweets([build_validated_tweet(2)])
+        self.assertEqual(identity_cache_stats()["accounts"]["hits"], 1)
+        self.assertEqual(Tweet.objects.filter(account__twitter_id=1).count(), 2)
+
+
+class PrefilterStoredTweetsTestCase(TransactionTestCase):
+    # reads outside transactions go to the replicas when DATABASE_REPLICA_URLS is set
+    databases = "__all__"
+
+    def setUp(self):
+        self._reset_filter()
+        self.addCleanup(self._reset_filter)
+
+    @staticmethod
+    def _reset_filter():
+        services.stored_tweet_ids.clear()
+        services._stored_tweet_ids_warmed.clear()
+
+    def test_warms_filter_with_stored_tweets(self):
+        account = TweetAccount.objects.create(fullname="a", username="a", twitter_id=1)
+        for tweet_id in (1, 2):
+            Tweet.objects.create(
+                tweet_id=tweet_id,
+                account=account,
+                created_at=datetime.datetime(2021, 6, 10, tzinfo=datetime.timezone.utc),
+                like_count=0,
+                reply_count=0,
+                retweet_count=0,
+                text="dummy",
+            )
+
+        self.assertEqual(services.find_stored_tweets([1, 2, 3]).keys(), {1, 2})
+        self.assertEqual(services.stored_tweet_ids.count, 2)
+
+    def test_warms_filter_at_startup(self):
+        bulk_populate_tweets([build_validated_tweet(i) for i in range(1, 3)])
+        self._reset_filter()
+
+        services.start_warming_stored_tweet_ids().join()
+
+        self.assertEqual(services.stored_tweet_ids.count, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(services.find_stored_tweets([1, 2, 3]).keys(), {1, 2})
+
+    def test_failed_warm_up_falls_back_to_first_use(self):
+        with mock.patch.object(Tweet.objects, "values_list", side_effect=DatabaseError):
+            services.start_warming_stored_tweet_ids().join()
+        self.assertFalse(services._stored_tweet_ids_warmed.is_set())
+
+        services.find_stored_tweets([1])
+        self.assertTrue(services._stored_tweet_ids_warmed.is_set())
+
+    @override_settings(TWEET_ID_FILTER_WARM_UP=False)
+    def test_warm_up_at_startup_can_be_disabled(self):
+        self.assertIsNone(services.start_warming_stored_tweet_ids())
+
+    def test_new_tweets_are_not_looked_up(self):
+        services.warm_stored_tweet_ids()
+        raw_objs = [build_validated_tweet(i) for i in range(1, 4)]
+        with self.assertNumQueries(0):
+            self.assertEqual(list(prefilter_stored_tweets(raw_objs)), raw_objs)
+
+    def test_stored_tweets_skip_to_metric_update(self):
+        bulk_populate_tweets([build_validated_tweet(i) for i in range(1, 4)])
+        self.assertIn(1, services.stored_tweet_ids)
+
+        raw_objs = [build_validated_tweet(1, like_count=5), build_validated_tweet(2), build_validated_tweet(4), {}]
+        with mock.patch("twitter_scraper.scraper.use_cases.TweetData.parse_obj", wraps=TweetData.parse_obj) as parse:
+            bulk_populate_tweets(raw_objs)
+
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(Tweet.objects.get(tweet_id=1).like_count, 5)
+        self.assertEqual(Tweet.objects.count(), 4)
+
+
+class HashtagListingTestCase(TestCase):
+    def setUp(self):
+        validated_objs = [
+            build_validated_tweet(i, hashtags=hashtags)
+            for i, hashtags in [
+                (1, ("Python",)),
+                (2, ("django",)),
+                (3, ("python", "PYTHON")),
+                (4, ("PyThOn", "django")),
+            ]
+        ]
+        list(bulk_create_tweets(validated_objs[:2]))
+        # the row by row path keeps the index too
+        list(create_tweets(validated_objs[2:]))
+
+    def test_lists_tweets_of_any_case_newest_first(self):
+        tweets = filter_by_hashtag(hashtag="pYTHON")
+        self.assertEqual([tweet.tweet_id for tweet in tweets], [4, 3, 1])
+
+    def test_listing_is_a_single_join_without_distinct(self):
+        sql = str(filter_by_hashtag(hashtag="python").query).upper()
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn("UPPER(", sql)
+        self.assertNotIn(" LIKE ", sql)
+        self.assertEqual(sql.count("JOIN"), 1)
+
+    def test_lists_tweets_between_ids(self):
+        tweets = filter_by_hashtag(hashtag="python", max_id=3, since_id=1)
+        self.assertEqual([tweet.tweet_id for tweet in tweets], [3])
+        tweets = filter_by_username(username="user1", max_id=3, since_id=1)
+        self.assertEqual([tweet.tweet_id for tweet in tweets], [3, 2])
+        self.assertEqual(count_tweets(hashtag="python", max_id=3), 2)
+        self.assertEqual(count_tweets(username="user1", limit=3), 3)
+
+    def test_index_rows_are_deleted_with_tweets(self):
+        Tweet.objects.filter(tweet_id=4).delete()
+        self.assertEqual(
+            sorted(TweetHashtagIndex.objects.values_list("key", "tweet_id")),
+            [("django", 2), ("python", 1), ("python", 3)],
+        )
+
+
+class PruneTweetsTestCase(TestCase):
+    def setUp(self):
+        self.day = datetime.datetime(2021, 6, 10, tzinfo=datetime.timezone.utc)
+        validated_objs = []
+        for days in range(5):
+            first_id = datetime_to_snowflake(self.day + datetime.timedelta(days=days, hours=12))
+            for i in range(3):
+                validated_obj = build_validated_tweet(first_id + i)
+                validated_obj["created_at"] = self.day + datetime.timedelta(days=days, hours=12)
+                validated_objs.append(validated_obj)
+        list(bulk_create_tweets(validated_objs))
+
+    def _stored_days(self):
+        return sorted({tweet.created_at.day for tweet in Tweet.objects.all()})
+
+    def test_drops_whole_partitions_before_the_cutoff(self):
+        before = self.day + datetime.timedelta(days=2, hours=18)
+        partitions = list(prune_tweets(before=before))
+
+        self.assertEqual([(start.day, end.day, count) for start, end, count in partitions], [(10, 11, 3), (11, 12, 3)])
+        # the partition of the cutoff is kept whole
+        self.assertEqual(self._stored_days(), [12, 13, 14])
+        self.assertEqual(Tweet.hashtags.through.objects.count(), 18)
+        self.assertEqual(TweetHashtagIndex.objects.count(), 18)
+        self.assertEqual(TweetHashtag.objects.count(), 2)
+        self.assertEqual(TweetAccount.objects.count(), 1)
+
+    def test_is_incremental(self):
+        before = self.day + datetime.timedelta(days=4)
+        self.assertEqual(len(list(prune_tweets(before=before, max_partitions=1))), 1)
+        self.assertEqual(self._stored_days(), [11, 12, 13, 14])
+        self.assertEqual(len(list(prune_tweets(before=before))), 3)
+        self.assertEqual(self._stored_days(), [14])
+
+    def test_partitions_of_many_days(self):
+        # aligned to even days since 1970-01-01, 2021-06-10 is one
+        partitions = list(prune_tweets(before=self.day + datetime.timedelta(days=4), period_days=2))
+        self.assertEqual([(start.day, end.day, count) for start, end, count in partitions], [(10, 12, 6), (12, 14, 6)])
+        self.assertEqual(self._stored_days(), [14])
+
+    def test_dry_run(self):
+        partitions = list(prune_tweets(before=self.day + datetime.timedelta(days=2), dry_run=True))
+
+        self.assertEqual([count for _, _, count in partitions], [3, 3])
+        self.assertEqual(Tweet.objects.count(), 15)
+
+    def test_count_tweets_in_range(self):
+        first_id = datetime_to_snowflake(self.day + datetime.timedelta(hours=12))
+        self.assertEqual(services.count_tweets_in_range(first_id + 1, first_id + 3), 2)
+
+    def test_archives_partitions_before_dropping(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            list(prune_tweets(before=self.day + datetime.timedelta(days=1), archive_dir=archive_dir))
+            with gzip.open(f"{archive_dir}/tweets-20210610.jsonl.gz", "rt") as file:
+                archived = [json.loads(line) for line in file]
+
+        self.assertEqual(len(archived), 3)
+        self.assertEqual(archived[0]["account"], {"twitter_id": 1, "fullname": "Account 1", "username": "user1"})
+        self.assertEqual(sorted(hashtag["name"] for hashtag in archived[0]["hashtags"]), ["django", "python"])
+        self.assertEqual(archived[0]["created_at"], "2021-06-10T12:00:00+00:00")
+        # archived tweets can be ingested again
+        list(bulk_create_tweets(archived))
+        self.assertEqual(Tweet.objects.count(), 15)
+
+    def test_appends_to_the_archive_of_an_earlier_run(self):
+        before = self.day + datetime.timedelta(days=1)
+        with tempfile.TemporaryDirectory() as archive_dir:
+            list(prune_tweets(before=before, archive_dir=archive_dir))
+            # tweets stored again in the archived partition
+            validated_obj = build_validated_tweet(datetime_to_snowflake(self.day + datetime.timedelta(hours=18)))
+            validated_obj["created_at"] = self.day + datetime.timedelta(hours=18)
+            list(bulk_create_tweets([validated_obj]))
+            list(prune_tweets(before=before, archive_dir=archive_dir))
+            with gzip.open(f"{archive_dir}/tweets-20210610.jsonl.gz", "rt") as file:
+                archived = [json.loads(line) for line in file]
+
+        self.assertEqual(len(archived), 4)
+        self.assertEqual(self._stored_days(), [11, 12, 13, 14])
+
+    def test_drops_only_the_archived_tweets(self):
+        first_id = datetime_to_snowflake(self.day + datetime.timedelta(hours=12))
+        start_id, end_id = datetime_to_snowflake(self.day), datetime_to_snowflake(self.day + datetime.timedelta(days=1))
+        # the third tweet of the partition is stored after the archive was written
+        with mock.patch.object(services, "archive_tweets", return_value=[first_id, first_id + 1]):
+            self.assertEqual(services.archive_and_delete_tweets(start_id, end_id, file=None), 2)
+
+        self.assertEqual(
+            list(Tweet.objects.filter(tweet_id__lt=end_id).values_list("tweet_id", flat=True)), [first_id + 2]
+        )
@@ -1,9 +1,29 @@
+import datetime
+import json
+from unittest import mock
+
 import vcr
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import F
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from twitter_scraper.scraper.models import Tweet
+from twitter_scraper.scraper.apps import use_cases
+from twitter_scraper.scraper.models import Tweet, TweetQueryState
+from twitter_scraper.scraper.paginators import TweetListPaginator
+from twitter_scraper.scraper.queries import filter_by_hashtag, filter_by_username
+from twitter_scraper.scraper.services import bump_query_versions
+from twitter_scraper.scraper.tests.factories import build_validated_tweet
+from twitter_scraper.scraper.tests.replicas import MirrorReplicaTestCase
+from twitter_scraper.scraper.use_cases import (
+    ListingTweets,
+    bulk_create_tweets,
+    bulk_populate_tweets,
+)
+from twitter_scraper.scraper.views import TweetExportView
 
 my_vcr = vcr.VCR(
     cassette_library_dir="fixtures/cassettes/search_tweets_v_1_1/",
@@ -161,3 +181,263 @@ class TweetsByUsernameViewTestCase(TestCase):
         self.assertEqual(json_response["next"], None)
         self.assertEqual(json_response["previous"], None)
         self.assertEqual(len(json_response["results"]), 0)
+
+
+class TweetCursorPaginationTestCase(TestCase):
+    def setUp(self):
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 8)]))
+        self.addCleanup(cache.clear)
+        # the stored tweets, without fetching
+        patcher = mock.patch.object(use_cases, "list_tweets_by_username", side_effect=filter_by_username)
+        self.list_tweets = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        json_response = response.json()
+        return json_response, [int(obj["text"].split()[-1]) for obj in json_response["results"]]
+
+    def test_navigates_with_cursors(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+        json_response, ids = self._get(url)
+        self.assertEqual(ids, [7, 6, 5])
+        self.assertEqual(json_response["count"], 7)
+        self.assertIsNone(json_response["previous"])
+
+        json_response, ids = self._get(json_response["next"])
+        self.assertEqual(ids, [4, 3, 2])
+        self.assertEqual(self.list_tweets.call_args.kwargs, {"username": "user1", "limit": 3, "max_id": 4})
+
+        json_response, ids = self._get(json_response["next"])
+        self.assertEqual(ids, [1])
+        self.assertIsNone(json_response["next"])
+
+        json_response, ids = self._get(json_response["previous"])
+        self.assertEqual(ids, [4, 3, 2])
+        self.assertEqual(self.list_tweets.call_args.kwargs, {"username": "user1", "limit": 3, "since_id": 1})
+
+        json_response, ids = self._get(json_response["previous"])
+        self.assertEqual(ids, [7, 6, 5])
+        self.assertIsNone(json_response["previous"])
+        self.assertIsNotNone(json_response["next"])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=2&format=json"
+        with CaptureQueriesContext(connection) as first:
+            json_response, _ = self._get(url)
+        json_response, _ = self._get(json_response["next"])
+        with CaptureQueriesContext(connection) as deep:
+            self._get(json_response["next"])
+
+        self.assertEqual(len(deep), len(first))
+        self.assertNotIn("OFFSET", " ".join(query["sql"] for query in deep.captured_queries).upper())
+
+    def test_count_can_be_skipped(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+        with mock.patch.object(TweetListPaginator, "count_mode", "none"):
+            with CaptureQueriesContext(connection) as queries:
+                json_response, _ = self._get(url)
+
+        self.assertIsNone(json_response["count"])
+        self.assertNotIn("COUNT(", " ".join(query["sql"] for query in queries.captured_queries).upper())
+
+    def test_count_can_be_cached(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+        with mock.patch.object(TweetListPaginator, "count_mode", "cached"):
+            self.assertEqual(self._get(url)[0]["count"], 7)
+            Tweet.objects.filter(tweet_id=7).delete()
+            self.assertEqual(self._get(url)[0]["count"], 7)
+
+    def test_invalid_cursor(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?cursor=invalid&format=json"
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class TweetConditionalResponseTestCase(TestCase):
+    def setUp(self):
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 5)]))
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(use_cases, "list_tweets_by_username", side_effect=filter_by_username)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+
+        # the version of the query and the newest tweet id only
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertIn("ETag", response)
+
+    def test_ingest_changes_the_validators(self):
+        etag = self.client.get(self.url)["ETag"]
+        bump_query_versions(["username:user1"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_tweets_changed_by_another_query_are_modified(self):
+        url = reverse("tweets_by_hashtag", kwargs={"hashtag": "python"}) + "?limit=3&format=json"
+        # HTTP dates have a resolution of seconds
+        TweetQueryState.objects.update(changed_at=F("changed_at") - datetime.timedelta(seconds=10))
+        with mock.patch.object(use_cases, "list_tweets_by_hashtag", side_effect=filter_by_hashtag):
+            last_modified = self.client.get(url)["Last-Modified"]
+            # stored by the ingest of username:user1, counters of a listed tweet changed
+            list(bulk_create_tweets([build_validated_tweet(3, like_count=100)]))
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_tweets_change_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        list(bulk_create_tweets([build_validated_tweet(5)]))
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pages_have_their_own_etag(self):
+        response = self.client.get(self.url)
+        next_response = self.client.get(response.json()["next"], HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(next_response.status_code, 200)
+        self.assertNotEqual(next_response["ETag"], response["ETag"])
+
+
+class TweetPageCacheTestCase(TestCase):
+    def setUp(self):
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 5)]))
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(use_cases, "list_tweets_by_username", side_effect=filter_by_username)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+
+    def test_rendered_page_is_served_from_cache(self):
+        content = self.client.get(self.url).content
+
+        # the version of the query and the newest tweet id only
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, content)
+        self.assertIn("ETag", response)
+
+    def test_ingest_invalidates_the_cached_pages(self):
+        self.client.get(self.url)
+        Tweet.objects.filter(tweet_id=4).update(like_count=100)
+        self.assertNotIn(b'"likes":100', self.client.get(self.url).content)
+
+        bump_query_versions(["username:user1"])
+        self.assertIn(b'"likes":100', self.client.get(self.url).content)
+
+    def test_refresh_of_another_query_invalidates_the_cached_pages(self):
+        url = reverse("tweets_by_hashtag", kwargs={"hashtag": "python"}) + "?limit=3&format=json"
+        # HTTP dates have a resolution of seconds
+        TweetQueryState.objects.update(changed_at=F("changed_at") - datetime.timedelta(seconds=10))
+        with mock.patch.object(use_cases, "list_tweets_by_hashtag", side_effect=filter_by_hashtag):
+            response = self.client.get(url)
+            self.assertNotIn(b'"likes":100', response.content)
+            refresh_username = ListingTweets(
+                fetch_data_use_case=lambda **params: [build_validated_tweet(3, like_count=100)],
+                populate_use_case=bulk_populate_tweets,
+                query_func=filter_by_username,
+            )
+            refresh_username(username="user1", limit=30)
+
+            # the newest tweet is the same, only the version of hashtag:python moved
+            self.assertIn(b'"likes":100', self.client.get(url).content)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 200)
+
+    def test_renamed_account_invalidates_the_cached_pages(self):
+        url = reverse("tweets_by_hashtag", kwargs={"hashtag": "python"}) + "?limit=3&format=json"
+        with mock.patch.object(use_cases, "list_tweets_by_hashtag", side_effect=filter_by_hashtag):
+            self.assertIn(b'"href":"/user1"', self.client.get(url).content)
+            # a tweet without hashtags, only the rename changes the hashtag listing
+            renamed = build_validated_tweet(5, hashtags=())
+            renamed["account"]["username"] = "renamed"
+            list(bulk_create_tweets([renamed]))
+
+            content = self.client.get(url).content
+        self.assertIn(b'"href":"/renamed"', content)
+        self.assertNotIn(b'"href":"/user1"', content)
+
+    def test_browsable_api_is_not_cached(self):
+        url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=api"
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertGreater(len(queries), 2)
+
+    @mock.patch.object(use_cases, "page_cache", None)
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertGreater(len(queries), 2)
+
+
+class TweetPageReplicaTestCase(MirrorReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 5)]))
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(use_cases, "list_tweets_by_username", side_effect=filter_by_username)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse("tweets_by_users", kwargs={"username": "user1"}) + "?limit=3&format=json"
+
+    def test_version_is_read_from_the_database_of_the_page(self):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections[self.replica]) as replica:
+                self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertTrue([query for query in replica if "scraper_tweetquerystate" in query["sql"]])
+        self.assertFalse([query for query in primary if "scraper_tweetquerystate" in query["sql"]])
+
+
+class TweetExportViewTestCase(TestCase):
+    def setUp(self):
+        list(bulk_create_tweets([build_validated_tweet(i) for i in range(1, 8)]))
+        self.addCleanup(cache.clear)
+
+    def _export(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    @mock.patch.object(TweetExportView, "chunk_size", 3)
+    def test_streams_tweets_in_chunks(self):
+        url = reverse("tweets_by_users_export", kwargs={"username": "user1"})
+        response = self.client.get(url)
+        # one query for the rows, one for the hashtags of each chunk
+        with self.assertNumQueries(4):
+            lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual([int(json.loads(line)["text"].split()[-1]) for line in lines], list(range(7, 0, -1)))
+
+    def test_lines_are_listing_results(self):
+        url = reverse("tweets_by_hashtag", kwargs={"hashtag": "python"}) + "?limit=10&format=json"
+        with mock.patch.object(use_cases, "list_tweets_by_hashtag", side_effect=filter_by_hashtag):
+            results = self.client.get(url).json()["results"]
+
+        url = reverse("tweets_by_hashtag_export", kwargs={"hashtag": "Python"})
+        self.assertEqual(self._export(url, HTTP_ACCEPT="application/x-ndjson"), results)
+
+    def test_bounds(self):
+        url = reverse("tweets_by_hashtag_export", kwargs={"hashtag": "python"}) + "?max_id=5&since_id=2"
+        self.assertEqual([int(obj["text"].split()[-1]) for obj in self._export(url)], [5, 4, 3])
+
+        response = self.client.get(url.replace("max_id=5", "max_id=last"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {"detail": "max_id must be an integer."})
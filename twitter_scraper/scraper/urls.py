@@ -1,8 +1,15 @@
 from django.urls import path
 
-from twitter_scraper.scraper.views import TweetsByHashTagView, TweetsByUsernameView
+from twitter_scraper.scraper.views import (
+    TweetsByHashTagExportView,
+    TweetsByHashTagView,
+    TweetsByUsernameExportView,
+    TweetsByUsernameView,
+)
 
 urlpatterns = [
     path("hashtags/<hashtag>/", TweetsByHashTagView.as_view(), name="tweets_by_hashtag"),
+    path("hashtags/<hashtag>/export/", TweetsByHashTagExportView.as_view(), name="tweets_by_hashtag_export"),
     path("users/<username>/", TweetsByUsernameView.as_view(), name="tweets_by_users"),
+    path("users/<username>/export/", TweetsByUsernameExportView.as_view(), name="tweets_by_users_export"),
 ]
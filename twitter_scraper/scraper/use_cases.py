@@ -1,31 +1,269 @@
 import collections
+import datetime
+import gzip
 import logging
 import traceback
+from collections.abc import Generator
+from pathlib import Path
 
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import Error as DjangoDbBaseError
 from pydantic import ValidationError as PydanticValidationError
 
 from twitter_scraper.infrastructure.decorators import memoize_generator
-from twitter_scraper.infrastructure.utils import enforce_sequence
+from twitter_scraper.infrastructure.freshness import Freshness
+from twitter_scraper.infrastructure.snowflakes import (
+    datetime_to_snowflake,
+    snowflake_to_datetime,
+)
+from twitter_scraper.infrastructure.utils import chunked, enforce_sequence
 from twitter_scraper.scraper.datastructures import TweetData
-from twitter_scraper.scraper.services import create_tweet_from_dict
+from twitter_scraper.scraper.services import (
+    TWEET_METRIC_FIELDS,
+    archive_and_delete_tweets,
+    bulk_create_tweets_from_dicts,
+    count_tweets_in_range,
+    create_tweet_from_dict,
+    delete_tweets,
+    find_stored_tweets,
+    forget_identities,
+    get_oldest_tweet_id,
+    get_query_age,
+    get_query_coverage,
+    normalize_tweet_query,
+    set_query_coverage,
+    set_query_refreshed,
+    update_tweet_metrics,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class ListingTweets:
-    def __init__(self, fetch_data_use_case, populate_use_case, query_func):
+    def __init__(
+        self,
+        fetch_data_use_case,
+        populate_use_case,
+        query_func,
+        single_flight=None,
+        task_queue=None,
+        name=None,
+        wait=0,
+        freshness=None,
+        revalidation_queue=None,
+        primary_pins=None,
+    ):
+        """
+        :param task_queue: runs the refreshes in the background when given, the listing returns the stored tweets
+        :param name: name of the refresh task in the task queue
+        :param wait: max seconds to wait for a queued refresh before querying the stored tweets
+        :param freshness: FreshnessPolicy applied to the last refresh of the query, refreshes every time if None
+        :param revalidation_queue: runs the refreshes of stale queries, defaults to the task queue
+        :param primary_pins: PrimaryPins making the refreshed queries read from the primary database for a while
+        """
         self.fetch_raw_tweets = fetch_data_use_case
         self.populate_tweets = populate_use_case
         self.query_tweets = query_func
+        self.single_flight = single_flight
+        self.task_queue = task_queue
+        self.name = name or query_func.__name__
+        self.wait = wait
+        self.freshness = freshness
+        self.revalidation_queue = revalidation_queue or task_queue
+        self.primary_pins = primary_pins
+        for queue in {task_queue, self.revalidation_queue} - {None}:
+            queue.register(self.name, self.refresh)
 
-    def __call__(self, **params):
+    @staticmethod
+    def _make_key(hashtag=None, username=None, **params):
+        # one refresh for the spellings of a query, e.g. Python and python
+        query = normalize_tweet_query(hashtag=hashtag, username=username)
+        return "&".join([query, *(f"{key}={value}" for key, value in sorted(params.items()))])
+
+    @staticmethod
+    def _depth(limit=None, offset=None, **params):
+        return (limit or 0) + (offset or 0)
+
+    @staticmethod
+    def _is_head(max_id=None, since_id=None, **params):
+        return max_id is None and since_id is None
+
+    def _refresh(self, **params):
         raw_objs = self.fetch_raw_tweets(**params)
         self.populate_tweets(raw_objs)
+        if isinstance(raw_objs, FetchedTweetGaps):
+            # covered once the fetched tweets are stored
+            raw_objs.save_coverage()
+        if self.freshness is not None and self._is_head(**params):
+            set_query_refreshed(normalize_tweet_query(**params), depth=self._depth(**params))
+        if self.primary_pins is not None:
+            self.primary_pins.pin(normalize_tweet_query(**params))
+
+    def refresh(self, **params):
+        if self.single_flight is None:
+            return self._refresh(**params)
+        # concurrent identical requests share one upstream fetch and ingest
+        _, shared = self.single_flight.do(self._make_key(**params), self._refresh, **params)
+        if shared:
+            logger.debug(f"Joined an in-flight refresh of {params}.")
+
+    def _submit(self, queue, **params):
+        return queue.submit(self.name, f"{self.name}?{self._make_key(**params)}", **params)
+
+    def get_freshness(self, **params):
+        if self.freshness is None or not self._is_head(**params):
+            # pages below a cursor are covered by the fetcher
+            return Freshness.expired
+        return self.freshness(get_query_age(normalize_tweet_query(**params), depth=self._depth(**params)))
+
+    def __call__(self, **params):
+        freshness = self.get_freshness(**params)
+        if freshness == Freshness.stale and self.revalidation_queue is not None:
+            self._submit(self.revalidation_queue, **params)
+        elif freshness != Freshness.fresh and self.task_queue is None:
+            self.refresh(**params)
+        elif freshness != Freshness.fresh:
+            task = self._submit(self.task_queue, **params)
+            if self.wait and not task.wait(timeout=self.wait):
+                logger.debug(f"Listing {params} without waiting for its refresh any longer.")
+        if self.primary_pins is not None and self.primary_pins.is_pinned(normalize_tweet_query(**params)):
+            # read your writes until the replicas catch up
+            return self.query_tweets(using=self.primary_pins.primary, **params)
         return self.query_tweets(**params)
 
 
+class FetchedTweetGaps(Generator):
+    def __init__(self, query):
+        """
+        The raw tweets fetched by FetchingTweetGaps. The coverage of its
+        completed searches is recorded by `save_coverage`, after the tweets
+        are stored.
+        """
+        self.query = query
+        self.intervals = None
+        self.raw_objs = iter(())
+
+    def send(self, value):
+        return self.raw_objs.send(value)
+
+    def throw(self, *args):
+        return self.raw_objs.throw(*args)
+
+    def covered(self, intervals):
+        # a copy, the next search changes the intervals in place
+        self.intervals = [list(interval) for interval in intervals]
+
+    def save_coverage(self):
+        if self.intervals is not None:
+            set_query_coverage(self.query, self.intervals)
+
+
+class FetchingTweetGaps:
+    def __init__(self, resource, count_stored=None):
+        """
+        Fetches only the tweet ids of a query that aren't covered yet: the
+        tweets newer than the newest covered one, then the gaps below it until
+        the newest `offset + limit` tweets of the query are covered. A page
+        below a cursor (max_id) is fetched below the covered interval of the
+        cursor until `limit` tweets under it are covered. Returns the fetched
+        tweets as FetchedTweetGaps, whose coverage is saved once they're stored.
+        :param resource: search resource supporting since_id/max_id
+        :param count_stored: function counting the stored tweets of a query between since_id and max_id,
+        at most `limit` of them
+        """
+        self.resource = resource
+        self.count_stored = count_stored
+
+    def _search(self, **params):
+        result = self.resource.search(**params)
+        tweet_ids = []
+        for raw_obj in result:
+            tweet_ids.append(raw_obj["tweet_id"])
+            yield raw_obj
+        return tweet_ids, result.complete
+
+    def _fetch_newer(self, intervals, needed, **params):
+        since_id = intervals[0][1] if intervals else None
+        tweet_ids, complete = yield from self._search(limit=needed, since_id=since_id, **params)
+        if not complete:
+            return False
+        if len(tweet_ids) >= needed:
+            # there may be more new tweets between since_id and the fetched ones
+            intervals.insert(0, [min(tweet_ids), max(tweet_ids), len(tweet_ids)])
+        elif intervals:
+            intervals[0][1] = max(tweet_ids, default=intervals[0][1])
+            intervals[0][2] += len(tweet_ids)
+        else:
+            intervals.insert(0, [0, max(tweet_ids, default=0), len(tweet_ids)])
+        return True
+
+    def _fetch_older(self, intervals, position, asked, **params):
+        newest = intervals[position]
+        older = intervals[position + 1] if len(intervals) > position + 1 else None
+        tweet_ids, complete = yield from self._search(
+            limit=asked, max_id=newest[0] - 1, since_id=older[1] if older else None, **params
+        )
+        if not complete:
+            return False
+        newest[2] += len(tweet_ids)
+        if len(tweet_ids) >= asked:
+            newest[0] = min(tweet_ids)
+        elif older:
+            # the gap is closed, join the interval below
+            newest[0] = older[0]
+            newest[2] += older[2]
+            intervals.remove(older)
+        else:
+            newest[0] = 0
+        return True
+
+    def _fetch_page(self, fetched, limit, max_id, **params):
+        intervals = get_query_coverage(fetched.query)
+        # the interval of the cursor, or the one ending at the last listed tweet
+        position = next(
+            (i for i, (min_id, max_id_, _) in enumerate(intervals) if min_id - 1 <= max_id <= max_id_), None
+        )
+        if position is None:
+            position = len([interval for interval in intervals if interval[1] > max_id])
+            # an empty interval right above the cursor, searched from max_id down
+            intervals.insert(position, [max_id + 1, max_id, 0])
+        if intervals[position][0] == 0:
+            return
+
+        stored = 0
+        if self.count_stored is not None:
+            stored = self.count_stored(limit=limit, since_id=intervals[position][0] - 1, max_id=max_id, **params)
+        if stored >= limit:
+            return
+        if (yield from self._fetch_older(intervals, position, limit - stored, **params)):
+            fetched.covered(intervals)
+
+    def _fetch(self, fetched, limit, offset, max_id, since_id, **params):
+        if since_id is not None:
+            # the newer tweets of a previous page were listed before
+            return
+        if max_id is not None:
+            yield from self._fetch_page(fetched, limit or 0, max_id, **params)
+            return
+
+        needed = (limit or 0) + (offset or 0)
+        intervals = get_query_coverage(fetched.query)
+
+        if not (yield from self._fetch_newer(intervals, needed, **params)):
+            return
+        fetched.covered(intervals)
+
+        while intervals and intervals[0][2] < needed and intervals[0][0] > 0:
+            if not (yield from self._fetch_older(intervals, 0, needed - intervals[0][2], **params)):
+                break
+            fetched.covered(intervals)
+
+    def __call__(self, limit=30, offset=0, max_id=None, since_id=None, **params):
+        fetched = FetchedTweetGaps(normalize_tweet_query(**params))
+        fetched.raw_objs = self._fetch(fetched, limit=limit, offset=offset, max_id=max_id, since_id=since_id, **params)
+        return fetched
+
+
 def fetch_tweets(resource, live=True, cache_timeout=10):
     @memoize_generator(unless=lambda: live, timeout=cache_timeout)
     def _fetcher(**params):
@@ -34,6 +272,11 @@ def fetch_tweets(resource, live=True, cache_timeout=10):
     return _fetcher
 
 
+def fetch_tweets_many(resource, queries, limit=30):
+    for objs in resource.get_many(queries=queries, limit=limit):
+        yield from objs
+
+
 def validate_tweets(raw_objs):
     raw_objs = enforce_sequence(raw_objs)
     for raw_obj in raw_objs:
@@ -45,17 +288,26 @@ def validate_tweets(raw_objs):
             continue
 
 
+def _concerns_identities(exc):
+    # a stale cached pk fails the validation of the relations, unlike a duplicate or an invalid tweet
+    return bool({"account", "hashtags"} & set(getattr(exc, "error_dict", {})))
+
+
 def create_tweets(validated_objs):
     validated_objs = enforce_sequence(validated_objs)
     for validated_obj in validated_objs:
         try:
             db_obj = create_tweet_from_dict(**validated_obj)
-            yield db_obj
-        except DjangoValidationError:
+            if db_obj is not None:
+                yield db_obj
+        except DjangoValidationError as exc:
             logger.debug(traceback.format_exc())
+            if _concerns_identities(exc):
+                forget_identities([validated_obj])
             continue
         except (DjangoDbBaseError, KeyError) as exc:
             logger.exception(exc)
+            forget_identities([validated_obj])
             continue
 
 
@@ -63,3 +315,99 @@ def populate_tweets(raw_objs):
     validated_objs = validate_tweets(raw_objs=raw_objs)
     generator = create_tweets(validated_objs=validated_objs)
     collections.deque(generator, maxlen=0)
+
+
+def bulk_create_tweets(validated_objs, chunk_size=500):
+    validated_objs = enforce_sequence(validated_objs)
+    for chunk in chunked(validated_objs, chunk_size):
+        try:
+            yield from bulk_create_tweets_from_dicts(chunk)
+        except (DjangoDbBaseError, KeyError) as exc:
+            # fall back to row by row so a single bad row doesn't drop the chunk
+            logger.exception(exc)
+            forget_identities(chunk)
+            yield from create_tweets(validated_objs=chunk)
+
+
+def _parse_metrics(raw_obj):
+    try:
+        metrics = {"tweet_id": int(raw_obj["tweet_id"])}
+        metrics.update({field: int(raw_obj[field]) for field in TWEET_METRIC_FIELDS})
+    except (KeyError, TypeError, ValueError):
+        return None
+    if any(value < 0 for value in metrics.values()):
+        return None
+    return metrics
+
+
+def prefilter_stored_tweets(raw_objs, chunk_size=500):
+    """
+    Updates the counters of the already stored tweets straight from the raw
+    objects, skipping their validation and ingestion. Yields the rest.
+    """
+    raw_objs = enforce_sequence(raw_objs)
+    for chunk in chunked(raw_objs, chunk_size):
+        parsed = [(raw_obj, _parse_metrics(raw_obj)) for raw_obj in chunk]
+        stored = find_stored_tweets([metrics["tweet_id"] for _, metrics in parsed if metrics is not None])
+
+        known = {}
+        for raw_obj, metrics in parsed:
+            if metrics is not None and metrics["tweet_id"] in stored:
+                known[metrics["tweet_id"]] = metrics
+                continue
+            yield raw_obj
+        if known:
+            update_tweet_metrics(list(known.values()), stored)
+
+
+def bulk_populate_tweets(raw_objs, chunk_size=500):
+    raw_objs = prefilter_stored_tweets(raw_objs=raw_objs, chunk_size=chunk_size)
+    validated_objs = validate_tweets(raw_objs=raw_objs)
+    generator = bulk_create_tweets(validated_objs=validated_objs, chunk_size=chunk_size)
+    collections.deque(generator, maxlen=0)
+
+
+def _partition_start(value, period_days):
+    days = (value.date() - datetime.date(1970, 1, 1)).days
+    start = datetime.date(1970, 1, 1) + datetime.timedelta(days=days - days % period_days)
+    return datetime.datetime.combine(start, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+
+def prune_tweets(before, period_days=1, archive_dir=None, max_partitions=None, dry_run=False):
+    """
+    Drops the stored tweets created before `before`, oldest first, one
+    partition at a time. A partition is the tweet id range of `period_days`
+    UTC days (tweet ids are snowflakes growing with time), only whole
+    partitions are dropped and each one in its own transaction, so the
+    pruning can be stopped and resumed at any point.
+    :param archive_dir: partitions are appended to gzipped JSON lines files in it, only the archived tweets are
+        dropped
+    :param max_partitions: max number of partitions dropped in this run
+    :param dry_run: only count the tweets of the partitions
+    :return: yields (partition start, partition end, number of tweets)
+    """
+    after = 0
+    partitions = 0
+    while max_partitions is None or partitions < max_partitions:
+        oldest_id = get_oldest_tweet_id(after=after)
+        if oldest_id is None:
+            return
+        start = _partition_start(snowflake_to_datetime(oldest_id), period_days)
+        end = start + datetime.timedelta(days=period_days)
+        if end > before:
+            return
+        start_id, end_id = datetime_to_snowflake(start), datetime_to_snowflake(end)
+
+        if dry_run:
+            count = count_tweets_in_range(start_id, end_id)
+        else:
+            if archive_dir is not None:
+                path = Path(archive_dir) / f"tweets-{start:%Y%m%d}.jsonl.gz"
+                # appended, a partition archived by an earlier run isn't lost
+                with gzip.open(path, "at") as file:
+                    count = archive_and_delete_tweets(start_id, end_id, file)
+            else:
+                count = delete_tweets(tweet_id__gte=start_id, tweet_id__lt=end_id)
+        after = end_id
+        partitions += 1
+        yield start, end, count
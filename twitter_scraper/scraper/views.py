@@ -1,23 +1,140 @@
+import hashlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
+from rest_framework.views import APIView
 
+from twitter_scraper.infrastructure.utils import chunked
 from twitter_scraper.scraper.apps import use_cases
 from twitter_scraper.scraper.paginators import TweetListPaginator
-from twitter_scraper.scraper.serializers import TweetSerializer
+from twitter_scraper.scraper.queries import (
+    count_tweets,
+    filter_by_hashtag,
+    filter_by_username,
+    tweet_rows,
+)
+from twitter_scraper.scraper.renderers import NDJSONRenderer
+from twitter_scraper.scraper.serializers import TweetRowSerializer, TweetSerializer
+from twitter_scraper.scraper.services import get_query_version, normalize_tweet_query
 
 
-class TweetsByHashTagView(ListAPIView):
+class TweetListView(ListAPIView):
     serializer_class = TweetSerializer
     pagination_class = TweetListPaginator
 
+    def get_query_params(self):
+        raise NotImplementedError
+
+    def get_count(self):
+        return count_tweets(**self.get_query_params())
+
+    def get_page_key(self, queryset):
+        """
+        :return: key of the page content and its Last-Modified (timestamp or None), from
+        the ingest version of the query and the newest tweet of the listing
+        """
+        # read before the page from its database, a lagging replica can't list older tweets under a newer version
+        version, changed_at = get_query_version(normalize_tweet_query(**self.get_query_params()), using=queryset.db)
+        newest_id = queryset.prefetch_related(None).values_list("tweet_id", flat=True).first()
+        # the URL holds the page params, the rendered links are absolute
+        page = f"{self.request.build_absolute_uri()}:{self.request.accepted_renderer.media_type}"
+        key = hashlib.md5(f"{version}:{newest_id}:{page}".encode()).hexdigest()
+        # HTTP dates have a resolution of seconds
+        return key, int(changed_at.timestamp()) if changed_at else None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        # one database for the version and the page, the router picks a replica on every read
+        queryset = queryset.using(queryset.db)
+        key, last_modified = self.get_page_key(queryset)
+        etag = quote_etag(key)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        # the browsable API renders the user and a CSRF token
+        page_cache = use_cases.page_cache if request.accepted_renderer.format == "json" else None
+        if response is None and page_cache is not None:
+            response = page_cache.get(key)
+        if response is None:
+            # same representation as serializer_class, built from values() rows
+            rows = tweet_rows(queryset)
+            page = self.paginate_queryset(rows)
+            response = self.get_paginated_response(TweetRowSerializer(page, using=rows.db).data)
+            if page_cache is not None:
+                page_cache.store(key, response)
+        # else the page is unchanged, neither listed nor serialized
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class TweetExportView(APIView):
+    """
+    Streams every stored tweet of the query as NDJSON, newest first, in the
+    representation of TweetSerializer. The rows are read through a database
+    cursor and written `chunk_size` at a time. Optional max_id/since_id
+    query params bound the tweet ids, an interrupted export resumes with
+    max_id set below the last received tweet.
+    """
+
+    renderer_classes = [NDJSONRenderer]
+    chunk_size = settings.TWEET_EXPORT_CHUNK_SIZE
+
+    def get_query_params(self):
+        raise NotImplementedError
+
+    def get_bounds(self):
+        bounds = {}
+        for key in ("max_id", "since_id"):
+            value = self.request.query_params.get(key)
+            if value is None:
+                continue
+            try:
+                bounds[key] = int(value)
+            except ValueError:
+                raise ParseError(f"{key} must be an integer.")
+        return bounds
+
+    def get(self, request, *args, **kwargs):
+        rows = tweet_rows(self.get_queryset())
+        renderer = request.accepted_renderer
+        lines = (
+            renderer.render(TweetRowSerializer(chunk, using=rows.db).data)
+            for chunk in chunked(rows.iterator(chunk_size=self.chunk_size), self.chunk_size)
+        )
+        return StreamingHttpResponse(lines, content_type=renderer.media_type)
+
+
+class HashtagQueryMixin:
+    def get_query_params(self):
+        return {"hashtag": self.kwargs["hashtag"]}
+
+
+class UsernameQueryMixin:
+    def get_query_params(self):
+        return {"username": self.kwargs["username"]}
+
+
+class TweetsByHashTagView(HashtagQueryMixin, TweetListView):
     def get_queryset(self):
-        limit = self.paginator.get_limit(request=self.request)
-        return use_cases.list_tweets_by_hashtag(hashtag=self.kwargs["hashtag"], limit=limit)
+        params = self.paginator.get_page_params(request=self.request)
+        return use_cases.list_tweets_by_hashtag(**self.get_query_params(), **params)
 
 
-class TweetsByUsernameView(ListAPIView):
-    serializer_class = TweetSerializer
-    pagination_class = TweetListPaginator
+class TweetsByUsernameView(UsernameQueryMixin, TweetListView):
+    def get_queryset(self):
+        params = self.paginator.get_page_params(request=self.request)
+        return use_cases.list_tweets_by_username(**self.get_query_params(), **params)
+
+
+class TweetsByHashTagExportView(HashtagQueryMixin, TweetExportView):
+    def get_queryset(self):
+        return filter_by_hashtag(**self.get_query_params(), **self.get_bounds())
+
 
+class TweetsByUsernameExportView(UsernameQueryMixin, TweetExportView):
     def get_queryset(self):
-        limit = self.paginator.get_limit(request=self.request)
-        return use_cases.list_tweets_by_username(username=self.kwargs["username"], limit=limit)
+        return filter_by_username(**self.get_query_params(), **self.get_bounds())